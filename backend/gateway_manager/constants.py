@@ -0,0 +1,10 @@
+"""
+Constants shared by the gRPC services and the utils, kept free of imports
+so either side can use them
+"""
+
+
+class LogType:
+    CONTROLLER = 0
+    SETTING = 1
+    GATEWAY_AGENT = 2
@@ -1,27 +1,83 @@
+import asyncio
 import json
 import logging
+from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
-from graphql import parse, validate
+from graphql import ExecutionResult, OperationType, execute, get_operation_ast, subscribe
 from gateway_project.schema import schema
+from .services.conf import get_setting
+from .services.document_cache import document_cache
+from .services.outbound_queue import CONTROL, DROP_OLDEST, IN_ORDER, LATEST, OutboundQueue
+from .services.task_registry import task_registry
+from .services.wire_format import JsonEncoder, create_encoder
 
 logger = logging.getLogger(__name__)
 
+GRAPHQL_TRANSPORT_WS = 'graphql-transport-ws'
+GRAPHQL_WS = 'graphql-ws'  # legacy subscriptions-transport-ws
+
+# close codes of the graphql-transport-ws protocol
+CLOSE_INVALID_MESSAGE = 4400
+CLOSE_UNAUTHORIZED = 4401
+CLOSE_SUBSCRIBER_EXISTS = 4409
+CLOSE_TOO_MANY_INIT_REQUESTS = 4429
+
+# what may be thinned out of each subscription's data when the client is slow
+SUBSCRIPTION_SEND_POLICIES = {
+    'gateway_system_info': LATEST,
+    'gateway_live_logs': DROP_OLDEST,
+    'all_gateways_system_info': IN_ORDER,
+}
+
+# cancelling runs the workers' cancel callbacks (closing gRPC streams can take
+# seconds on an unreachable gateway): off the loop every socket of this worker shares
+_cancel_task_off_loop = sync_to_async(task_registry.cancel, thread_sensitive=False)
+_cancel_channel_off_loop = sync_to_async(task_registry.cancel_channel, thread_sensitive=False)
+
+
 class GraphQLWebSocketConsumer(AsyncWebsocketConsumer):
+    """
+    GraphQL over WebSocket, speaking graphql-transport-ws when the client
+    offers it and the legacy graphql-ws protocol otherwise. Every operation
+    runs as its own asyncio task; subscriptions are driven by
+    graphql.subscribe over the schema's async generators.
+    """
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.subscriptions = {} 
-        self.gateway_groups = set()
+        self.subscriptions = {}
+        self.heartbeat_task = None
+        self.sender_task = None
+        self.outbound = OutboundQueue(max_pending=get_setting('WS_OUTBOUND_QUEUE_SIZE', 256))
+        self.protocol = GRAPHQL_WS
+        self.connection_acknowledged = False
+        # wire format, opted into with connection_init
+        self.encoder = JsonEncoder()
+        self.coalesce = False
 
     async def connect(self):
-        await self.accept(subprotocol="graphql-ws")
-        logger.info(f"WebSocket connection established: {self.channel_name}")
+        if GRAPHQL_TRANSPORT_WS in self.scope.get('subprotocols', []):
+            self.protocol = GRAPHQL_TRANSPORT_WS
+        await self.accept(subprotocol=self.protocol)
+        self.sender_task = asyncio.create_task(self.send_outbound())
+        self.heartbeat_task = asyncio.create_task(self.heartbeat())
+        logger.info(f"WebSocket connection established: {self.channel_name} ({self.protocol})")
 
     async def disconnect(self, close_code):
-        for group_name in self.gateway_groups:
-            await self.channel_layer.group_discard(group_name, self.channel_name)
-        
+        await self.release_all_subscriptions()
+        if self.heartbeat_task:
+            self.heartbeat_task.cancel()
+        if self.sender_task:
+            self.sender_task.cancel()
+        if self.outbound.dropped or self.outbound.replaced:
+            logger.warning(f"Slow client {self.channel_name}: {self.outbound.stats()}")
+
         logger.info(f"WebSocket disconnected: {self.channel_name}, code: {close_code}")
 
+    @property
+    def is_transport_ws(self):
+        return self.protocol == GRAPHQL_TRANSPORT_WS
+
     async def receive(self, text_data):
         try:
             message = json.loads(text_data) # json steing -> dictionary
@@ -36,143 +92,274 @@ class GraphQLWebSocketConsumer(AsyncWebsocketConsumer):
         try:
             message_type = message.get('type')
             logger.info(f"Handling message type: {message_type}")
-            
+
             if message_type == 'connection_init':
-                await self.send_message({'type': 'connection_ack'})
+                if self.connection_acknowledged and self.is_transport_ws:
+                    await self.close(code=CLOSE_TOO_MANY_INIT_REQUESTS)
+                    return
+                self.connection_acknowledged = True
+                await self.negotiate_wire_format(message.get('payload') or {})
                 logger.info("Connection acknowledged")
-                
-            elif message_type == 'start':
+
+            elif message_type == 'ping':
+                pong = {'type': 'pong'}
+                if message.get('payload') is not None:
+                    pong['payload'] = message['payload']
+                await self.send_message(pong)
+
+            elif message_type == 'pong':
+                pass
+
+            elif message_type in ('start', 'subscribe'):
+                if self.is_transport_ws and not self.connection_acknowledged:
+                    await self.close(code=CLOSE_UNAUTHORIZED)
+                    return
                 logger.info("Starting subscription...")
                 await self.handle_subscription_start(message)
-                
-            elif message_type == 'stop':
+
+            elif message_type in ('stop', 'complete'):
                 await self.handle_subscription_stop(message)
-                
+
             elif message_type == 'connection_terminate':
+                await self.release_all_subscriptions()
                 await self.close()
-                
+
+            elif self.is_transport_ws:
+                await self.close(code=CLOSE_INVALID_MESSAGE)
+
         except Exception as e:
             logger.error(f"Error in handle_message: {e}")
             await self.send_error(str(e))
 
     async def handle_subscription_start(self, message):
         subscription_id = message.get('id')
-        payload = message.get('payload', {})
+        payload = message.get('payload') or {}
         query = payload.get('query')
-        variables = payload.get('variables', {})
-        
+        variables = payload.get('variables') or {}
+        operation_name = payload.get('operationName')
+
         logger.info(f"Starting subscription {subscription_id} with query: {query}")
         logger.info(f"Variables: {variables}")
-        
+
         if not query or not subscription_id:
             await self.send_error("Missing query or subscription ID", subscription_id)
             return
 
-        try:
-            document = parse(query) # document node
-            validation_errors = validate(schema, document)
-            
-            if validation_errors:
-                logger.error(f"Validation errors: {validation_errors}")
-                await self.send_error(f"Validation errors: {validation_errors}", subscription_id)
+        if subscription_id in self.subscriptions:
+            if self.is_transport_ws:
+                await self.close(code=CLOSE_SUBSCRIBER_EXISTS)
                 return
+            # graphql-ws clients restart an operation by reusing its id
+            await self.handle_subscription_stop({'id': subscription_id})
 
-            # store
-            self.subscriptions[subscription_id] = {
-                'query': query,
-                'variables': variables,
-                'document': document
-            }
+        # dashboards send the same few documents over and over: parse and validate once
+        document, errors = document_cache.get(schema.graphql_schema, query)
+        if errors:
+            logger.error(f"Validation errors: {errors}")
+            await self.send_error([error.formatted for error in errors], subscription_id)
+            return
 
-            # execute
-            context = {
-                'consumer': self, 
-                'subscription_id': subscription_id,
-                'channel_name': self.channel_name
-            }
-            
-            logger.info(f"Executing subscription with context: {context}")
-            
-            result = await schema.execute_async(
-                document,
-                variable_values=variables,
-                context_value=context
-            )
-
-            if result.errors:
+        # store; the resolvers bind field and gateway_id once they know them
+        subscription = self.subscriptions[subscription_id] = {
+            'events': asyncio.Queue()
+        }
+        subscription['task'] = asyncio.create_task(
+            self.run_operation(subscription_id, document, variables, operation_name)
+        )
+
+    async def run_operation(self, subscription_id, document, variables, operation_name):
+        context = {
+            'consumer': self,
+            'subscription_id': subscription_id,
+            'channel_name': self.channel_name
+        }
+
+        try:
+            operation = get_operation_ast(document, operation_name)
+            if operation is not None and operation.operation == OperationType.SUBSCRIPTION:
+                result = await subscribe(
+                    schema.graphql_schema,
+                    document,
+                    context_value=context,
+                    variable_values=variables,
+                    operation_name=operation_name
+                )
+            else:
+                # queries and mutations answer once, then complete; their
+                # resolvers use the sync ORM, so they run in the sync thread
+                result = await sync_to_async(execute)(
+                    schema.graphql_schema,
+                    document,
+                    context_value=context,
+                    variable_values=variables,
+                    operation_name=operation_name
+                )
+                if asyncio.iscoroutine(result):
+                    result = await result
+                await self.send_result(subscription_id, result)
+                result = None
+
+            if isinstance(result, ExecutionResult):
+                # the subscription could not be set up
                 logger.error(f"Execution errors: {result.errors}")
-                await self.send_error(f"Execution errors: {result.errors}", subscription_id)
+                await self.send_error([error.formatted for error in result.errors or []], subscription_id)
                 return
 
-            if result.data:
-                logger.info(f"Sending initial data for subscription {subscription_id}: {result.data}")
-                await self.send_message({
-                    'type': 'data',
-                    'id': subscription_id,
-                    'payload': {'data': result.data}
-                })
-            else:
-                logger.warning(f"No initial data for subscription {subscription_id}")
+            if result is not None:
+                # one result per event, queued for the sender before the next one is pulled
+                try:
+                    async for item in result:
+                        await self.send_result(subscription_id, item)
+                finally:
+                    await result.aclose()
+
+            await self.send_message({'type': 'complete', 'id': subscription_id})
 
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
-            logger.error(f"Subscription start error: {e}", exc_info=True)
+            logger.error(f"Subscription {subscription_id} error: {e}", exc_info=True)
             await self.send_error(str(e), subscription_id)
+        finally:
+            await self.release_subscription(subscription_id)
 
     async def handle_subscription_stop(self, message):
         subscription_id = message.get('id')
-        if subscription_id in self.subscriptions:
-            del self.subscriptions[subscription_id]
+        subscription = self.subscriptions.get(subscription_id)
+        if subscription is not None:
+            task = subscription['task']
+            task.cancel()
+            # lets the generators clean up before the next message is handled
+            await asyncio.wait([task])
+            # data still waiting for the socket is of no use to the client anymore
+            self.outbound.discard(subscription_id)
             logger.info(f"Stopped subscription {subscription_id}")
 
-    async def send_message(self, message):
-        logger.debug(f"Sending WebSocket message: {message}")
-        await self.send(text_data=json.dumps(message))
+    async def release_subscription(self, subscription_id):
+        subscription = self.subscriptions.pop(subscription_id, None)
+        if subscription is None:
+            return
+        await _cancel_task_off_loop(self.channel_name, subscription_id)
+
+    # called by the subscription generators; returns the queue their events arrive on
+    def bind_subscription(self, subscription_id, field, gateway_id=None):
+        subscription = self.subscriptions.get(subscription_id)
+        if subscription is None:
+            return asyncio.Queue()
+        subscription['field'] = field
+        subscription['gateway_id'] = str(gateway_id) if gateway_id is not None else None
+        return subscription['events']
+
+    # stops every operation and background worker (pollers, log streams) started for this socket
+    async def release_all_subscriptions(self):
+        tasks = [subscription['task'] for subscription in self.subscriptions.values()]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks)
+
+        cancelled = await _cancel_channel_off_loop(self.channel_name)
+        self.subscriptions.clear()
+        if tasks or cancelled:
+            logger.info(f"Stopped {len(tasks)} subscription(s) for {self.channel_name}")
+
+    # keeps this socket's workers from being reclaimed as orphans
+    async def heartbeat(self):
+        interval = task_registry.orphan_timeout / 3
+        while True:
+            await asyncio.sleep(interval)
+            task_registry.touch(self.channel_name)
+
+    # connection_init may ask for {"encoding": "json-keys" | "msgpack", "coalesce": true};
+    # the ack tells which of them are used from then on
+    async def negotiate_wire_format(self, options):
+        ack = {'type': 'connection_ack'}
+        encoder = create_encoder(options.get('encoding')) if isinstance(options, dict) else None
+        coalesce = isinstance(options, dict) and bool(options.get('coalesce'))
+        if encoder is not None or coalesce:
+            ack['payload'] = {
+                'encoding': (encoder or self.encoder).name,
+                'coalesce': coalesce
+            }
+
+        # written ahead of the queue in plain JSON: the client switches formats once it reads the ack
+        await self.send(text_data=json.dumps(ack))
+        if encoder is not None:
+            self.encoder = encoder
+        self.coalesce = coalesce
+
+    # queued, never awaited on the socket: a slow client only fills its own outbound queue
+    async def send_message(self, message, policy=CONTROL, key=None, weight=1):
+        if policy == IN_ORDER:
+            # deltas can't be merged or dropped: hold the producer back instead
+            await self.outbound.wait_sent(key)
+        self.outbound.put(message, policy, key, weight)
+
+    async def send_outbound(self):
+        tick = get_setting('WS_COALESCE_TICK_MS', 50) / 1000
+        while True:
+            items = [await self.outbound.get()]
+            if self.coalesce:
+                # let this tick's updates gather (and merge) into a single frame
+                await asyncio.sleep(tick)
+                items.extend(self.outbound.pop_all())
+
+            messages = []
+            for item in items:
+                if item.dropped:
+                    item.message['payload'].setdefault('extensions', {})['dropped'] = item.dropped
+                messages.append(item.message)
+            logger.debug(f"Sending WebSocket message(s): {messages}")
+
+            frame = self.encoder.encode(messages if self.coalesce else messages[0])
+            try:
+                if self.encoder.binary:
+                    await self.send(bytes_data=frame)
+                else:
+                    await self.send(text_data=frame)
+            except Exception as e:
+                logger.error(f"Error sending to {self.channel_name}: {e}")
+                return
+
+    async def send_result(self, subscription_id, result):
+        payload = {'data': result.data}
+        if result.errors:
+            payload['errors'] = [error.formatted for error in result.errors]
+
+        field = self.subscriptions.get(subscription_id, {}).get('field')
+        await self.send_message(
+            {
+                'type': 'next' if self.is_transport_ws else 'data',
+                'id': subscription_id,
+                'payload': payload
+            },
+            policy=SUBSCRIPTION_SEND_POLICIES.get(field, CONTROL),
+            key=subscription_id,
+            weight=_result_weight(result)
+        )
 
     async def send_error(self, error_message, subscription_id=None):
+        errors = error_message if isinstance(error_message, list) else [{'message': error_message}]
+
+        if self.is_transport_ws:
+            if not subscription_id:
+                # graphql-transport-ws has no connection level error message
+                await self.close(code=CLOSE_INVALID_MESSAGE)
+                return
+            await self.send_message({'type': 'error', 'id': subscription_id, 'payload': errors})
+            return
+
         error_msg = {
             'type': 'error',
-            'payload': {'message': error_message}
+            'payload': errors[0] if len(errors) == 1 else errors
         }
         if subscription_id:
             error_msg['id'] = subscription_id
-            
+
         await self.send_message(error_msg)
 
-    async def send_subscription_data(self, event):
-        subscription_id = event.get('subscription_id') 
-        data = event.get('data')
-        
-        logger.debug(f"Sending subscription data for {subscription_id}: {data}")
-        
-        if subscription_id and data:
-            await self.send_message({
-                'type': 'data',
-                'id': subscription_id,
-                'payload': data
-            })
-
-    # any message sent to one group, will be sent to all this group members
-    async def join_gateway_group(self, gateway_id):
-        group_name = f"gateway_{gateway_id}_monitoring"
-        await self.channel_layer.group_add(group_name, self.channel_name)
-        self.gateway_groups.add(group_name)
-        logger.info(f"Joined gateway monitoring group: {group_name}")
-
-    async def leave_gateway_group(self, gateway_id):
-        group_name = f"gateway_{gateway_id}_monitoring"
-        await self.channel_layer.group_discard(group_name, self.channel_name)
-        self.gateway_groups.discard(group_name)
-        logger.info(f"Left gateway monitoring group: {group_name}")
-
-    # message handlers
-    async def gateway_system_info(self, event):
-        logger.debug(f"Received gateway_system_info event: {event}")
-        await self.send_subscription_data(event)
-
-    async def gateway_live_logs(self, event):
-        logger.debug(f"Received gateway_live_logs event: {event}")
-        await self.send_subscription_data(event)
-
-    async def gateway_status_change(self, event):
-        logger.debug(f"Received gateway_status_change event: {event}")
-        await self.send_subscription_data(event)
\ No newline at end of file
+
+# number of entries in a result, so dropped log batches are reported in lines
+def _result_weight(result):
+    entries = sum(len(value) for value in (result.data or {}).values() if isinstance(value, list))
+    return entries or 1
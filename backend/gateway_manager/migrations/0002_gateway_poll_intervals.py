@@ -0,0 +1,22 @@
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gateway_manager', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gateway',
+            name='poll_min_interval',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(0.1)]),
+        ),
+        migrations.AddField(
+            model_name='gateway',
+            name='poll_max_interval',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(0.1)]),
+        ),
+    ]
@@ -15,6 +15,9 @@ class Gateway(models.Model) :
 
     # extra field
     is_active = models.BooleanField(default=True)
+    # bounds of the adaptive poll period in seconds (null = GATEWAY_POLL_MIN/MAX_INTERVAL)
+    poll_min_interval = models.FloatField(blank=True, null=True, validators=[MinValueValidator(0.1)])
+    poll_max_interval = models.FloatField(blank=True, null=True, validators=[MinValueValidator(0.1)])
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -37,6 +40,10 @@ class Gateway(models.Model) :
         except ValueError:
             raise ValidationError("Invalid address")
 
+        if self.poll_min_interval is not None and self.poll_max_interval is not None \
+                and self.poll_min_interval > self.poll_max_interval:
+            raise ValidationError("Minimum poll interval is greater than the maximum")
+
         # duplicated??
         if Gateway.objects.filter(
             address=self.address,
@@ -3,7 +3,11 @@ from graphene_django import DjangoObjectType
 from django.core.exceptions import ValidationError
 from django.db import models
 from .models import Gateway
+from .services.log_archive import log_archive
+from .services.log_search import log_search_index
+from .services.metrics_history import metrics_history
 from .subscriptions import Subscription
+from .utils.log_parser import LogLineParser
 
 
 # gateway type
@@ -25,6 +29,26 @@ class GatewayPage(graphene.ObjectType):
     gateways = graphene.List(GatewayType)
     total_count = graphene.Int()
 
+class MetricsHistoryType(graphene.ObjectType):
+    gateway_id = graphene.ID()
+    step = graphene.Float(description="Bucket size in seconds, null when not downsampled")
+    timestamps = graphene.List(graphene.Float, description="Unix timestamps (bucket start when downsampled)")
+    cpu_usage = graphene.List(graphene.Float, description="CPU usage percent per point")
+    memory_usage = graphene.List(graphene.Float, description="Memory usage percent per point")
+
+class ArchivedLogType(graphene.ObjectType):
+    gateway_id = graphene.ID()
+    log_type = graphene.Int()
+    received_at = graphene.Float(description="Unix timestamp the line was received by the backend")
+    timestamp = graphene.String(description="Timestamp written by the agent, if any")
+    log_level = graphene.String()
+    service_type = graphene.String()
+    message = graphene.String()
+
+class LogSearchPage(graphene.ObjectType):
+    results = graphene.List(ArchivedLogType)
+    has_next_page = graphene.Boolean()
+
 
 # input type for mutation - all required field
 class GatewayInput(graphene.InputObjectType):
@@ -32,6 +56,8 @@ class GatewayInput(graphene.InputObjectType):
     address = graphene.String(required=True, description="IP address of the Gateway")
     port = graphene.Int(required=True, description="Port number of the Gateway")
     desc = graphene.String(description="Optional description for the Gateway")
+    poll_min_interval = graphene.Float(description="Shortest poll period in seconds (default from settings)")
+    poll_max_interval = graphene.Float(description="Longest poll period in seconds (default from settings)")
 
 
 # input type for update - optional field
@@ -41,6 +67,8 @@ class GatewayUpdateInput(graphene.InputObjectType):
     port = graphene.Int(description="New port number of the Gateway")
     desc = graphene.String(description="New description for the Gateway")
     is_active = graphene.Boolean(description="New active/inactive status of the Gateway")
+    poll_min_interval = graphene.Float(description="New shortest poll period in seconds")
+    poll_max_interval = graphene.Float(description="New longest poll period in seconds")
 
 class Query(graphene.ObjectType):
     all_gateways = graphene.Field(
@@ -76,6 +104,35 @@ class Query(graphene.ObjectType):
         description="filter gateways by active status, port range, address with pagination"
     )
 
+    gateway_metrics_history = graphene.Field(
+        MetricsHistoryType,
+        gateway_id=graphene.ID(required=True, description="Unique identifier for the Gateway"),
+        since=graphene.Float(description="Only samples at or after this unix timestamp"),
+        step=graphene.Float(description="Average samples into buckets of this many seconds"),
+        description="recent cpu/memory samples collected by the monitoring pollers"
+    )
+
+    gateway_logs = graphene.List(
+        ArchivedLogType,
+        gateway_id=graphene.ID(required=True, description="Unique identifier for the Gateway"),
+        from_=graphene.Float(name="from", description="Only lines received at or after this unix timestamp"),
+        to=graphene.Float(description="Only lines received at or before this unix timestamp"),
+        first=graphene.Int(default_value=1000, description="Maximum number of lines (at most 10000)"),
+        log_type=graphene.Int(description="Only this log type, all archived types when omitted"),
+        description="archived log lines read from the on-disk log archive"
+    )
+
+    search_gateway_logs = graphene.Field(
+        LogSearchPage,
+        query=graphene.String(required=True, description="Text to search for (case insensitive)"),
+        gateway_ids=graphene.List(graphene.ID, description="Only these gateways, all when omitted"),
+        from_=graphene.Float(name="from", description="Only lines received at or after this unix timestamp"),
+        to=graphene.Float(description="Only lines received at or before this unix timestamp"),
+        first=graphene.Int(default_value=100, description="Page size (at most 1000)"),
+        offset=graphene.Int(default_value=0, description="Number of hits to skip"),
+        description="full text search over the log archive, newest lines first"
+    )
+
     def resolve_all_gateways(self, info, is_active=None, first=None, offset=None):
         queryset = Gateway.objects.all()
         if is_active is not None:
@@ -146,6 +203,54 @@ class Query(graphene.ObjectType):
         
         return GatewayPage(gateways=sliced_queryset, total_count=total_count)
 
+    def resolve_gateway_metrics_history(self, info, gateway_id, since=None, step=None):
+        history = metrics_history.history(gateway_id, since=since, step=step)
+        return MetricsHistoryType(gateway_id=gateway_id, step=step, **history)
+
+    def resolve_gateway_logs(self, info, gateway_id, from_=None, to=None, first=1000, log_type=None):
+        lines = log_archive.read(
+            gateway_id,
+            start=from_,
+            end=to,
+            first=max(0, min(first, 10000)),
+            log_type=log_type
+        )
+        return _archived_log_types(
+            (gateway_id, line_log_type, received_at, line) for received_at, line_log_type, line in lines
+        )
+
+    def resolve_search_gateway_logs(self, info, query, gateway_ids=None, from_=None, to=None, first=100, offset=0):
+        hits, has_next_page = log_search_index.search(
+            query,
+            gateway_ids=gateway_ids,
+            start=from_,
+            end=to,
+            first=max(0, min(first, 1000)),
+            offset=max(0, offset)
+        )
+        return LogSearchPage(results=_archived_log_types(hits), has_next_page=has_next_page)
+
+
+def _archived_log_types(lines):
+    # lines of (gateway_id, log_type, received_at, line); parsed like the live stream
+    parsers = {}
+    result = []
+    for gateway_id, log_type, received_at, line in lines:
+        parser = parsers.get(log_type)
+        if parser is None:
+            parser = parsers[log_type] = LogLineParser(log_type)
+        entry = parser.parse(line)
+        result.append(ArchivedLogType(
+            gateway_id=gateway_id,
+            log_type=log_type,
+            received_at=received_at,
+            timestamp=entry['timestamp'],
+            log_level=entry['log_level'],
+            service_type=entry['service_type'],
+            message=line
+        ))
+    return result
+
 # Mutation Classes
 class CreateGateway(graphene.Mutation):
     class Arguments:
@@ -161,7 +266,9 @@ class CreateGateway(graphene.Mutation):
                 name=input.name,
                 address=input.address,
                 port=input.port,
-                desc=input.get('desc', '')
+                desc=input.get('desc', ''),
+                poll_min_interval=input.get('poll_min_interval'),
+                poll_max_interval=input.get('poll_max_interval')
             )
             gateway.full_clean()
             gateway.save()
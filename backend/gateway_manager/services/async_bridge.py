@@ -0,0 +1,61 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Coroutine, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncBridge:
+    """
+    One long-lived event loop thread that sync code hands its coroutines
+    to, so no event loop is set up per call.
+    """
+
+    def __init__(self, name: str = "async_bridge"):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._bridge_lock = threading.Lock()
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        with self._bridge_lock:
+            if self._loop is None or self._loop.is_closed():
+                loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._run,
+                    args=(loop,),
+                    daemon=True,
+                    name=self.name
+                )
+                self._loop = loop
+                self._thread.start()
+                logger.info(f"Started async bridge loop {self.name}")
+            return self._loop
+
+    def _run(self, loop: asyncio.AbstractEventLoop):
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+
+    def submit(self, coroutine: Coroutine) -> Future:
+        return asyncio.run_coroutine_threadsafe(coroutine, self._ensure_started())
+
+    def run(self, coroutine: Coroutine, timeout: Optional[float] = None) -> Any:
+        if self._thread is threading.current_thread():
+            coroutine.close()
+            raise RuntimeError("AsyncBridge.run() called from the bridge loop itself")
+        return self.submit(coroutine).result(timeout)
+
+    def stop(self):
+        with self._bridge_lock:
+            loop, self._loop = self._loop, None
+            thread, self._thread = self._thread, None
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout=5)
+            loop.close()
+
+
+# Singleton
+async_bridge = AsyncBridge()
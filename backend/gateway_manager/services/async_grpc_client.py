@@ -0,0 +1,270 @@
+import asyncio
+import copy
+import grpc
+import logging
+import time
+import weakref
+from typing import Optional, Dict, Any, AsyncIterator
+
+from ..constants import LogType
+from ..protobuf import gateway_agent_pb2, gateway_agent_pb2_grpc
+from .conf import get_setting
+from .grpc_client import CHANNEL_OPTIONS, SystemInfoCache, grpc_manager, offline_system_info
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncGatewayGRPCClient:
+    """
+    grpc.aio counterpart of GatewayGRPCClient.
+    One channel per gateway and event loop, shared by every coroutine of
+    that loop.
+    """
+
+    def __init__(self, gateway_address: str, gateway_port: int, timeout: int=10):
+        self.gateway_address = gateway_address
+        self.gateway_port = gateway_port
+        self.timeout = timeout
+        self.connection_string = f"{gateway_address}:{gateway_port}"
+        # aio channels can't be shared across event loops
+        self._channels: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, grpc.aio.Channel]" = \
+            weakref.WeakKeyDictionary()
+
+    async def get_channel(self, timeout: Optional[float] = None) -> grpc.aio.Channel:
+        loop = asyncio.get_running_loop()
+
+        channel = self._channels.get(loop)
+        if channel is None or channel.get_state() == grpc.ChannelConnectivity.SHUTDOWN:
+            channel = self._channels[loop] = grpc.aio.insecure_channel(
+                self.connection_string,
+                options=CHANNEL_OPTIONS
+            )
+            logger.info(f"Opened async channel to {self.connection_string}")
+
+        if channel.get_state(try_to_connect=True) != grpc.ChannelConnectivity.READY:
+            try:
+                await asyncio.wait_for(
+                    channel.channel_ready(),
+                    timeout=self.timeout if timeout is None else timeout
+                )
+            except Exception as e:
+                # only this caller gives up: the channel keeps reconnecting for the others
+                logger.error(f"Connection error to {self.connection_string}: {e}")
+                raise
+
+        return channel
+
+    async def _unary(self, method: str, field: str, timeout: Optional[float] = None) -> Optional[str]:
+        timeout = self.timeout if timeout is None else timeout
+        channel = await self.get_channel(timeout=timeout)
+        stub = gateway_agent_pb2_grpc.GatewayAgentStub(channel)
+        response = await getattr(stub, method)(gateway_agent_pb2.NullRequest(), timeout=timeout)
+        return getattr(response, field)
+
+    async def get_uptime(self) -> Optional[str]:
+        try:
+            return await self._unary('Uptime', 'uptime')
+        except Exception as e:
+            logger.error(f"Error getting uptime from {self.connection_string}: {e}")
+            return None
+
+    async def get_cpu_usage(self) -> Optional[str]:
+        try:
+            return await self._unary('CpuUsage', 'cpu_usage')
+        except Exception as e:
+            logger.error(f"Error getting CPU usage from {self.connection_string}: {e}")
+            return None
+
+    async def get_memory_usage(self) -> Optional[str]:
+        try:
+            return await self._unary('MemoryUsage', 'memory_usage')
+        except Exception as e:
+            logger.error(f"Error getting memory usage from {self.connection_string}: {e}")
+            return None
+
+    async def get_system_info(self, deadline: Optional[float] = None) -> Dict[str, Any]:
+        info = offline_system_info(self.gateway_address, self.gateway_port)
+
+        expires_at = time.monotonic() + (self.timeout if deadline is None else deadline)
+
+        def remaining() -> float:
+            return max(0.0, expires_at - time.monotonic())
+
+        try:
+            await self.get_channel(timeout=remaining())
+        except Exception as e:
+            info['error'] = str(e) or "Gateway unreachable"
+            return info
+
+        fields = [('Uptime', 'uptime'), ('CpuUsage', 'cpu_usage'), ('MemoryUsage', 'memory_usage')]
+        results = await asyncio.gather(
+            *(self._unary(method, field, timeout=remaining()) for method, field in fields),
+            return_exceptions=True
+        )
+
+        for (_, field), result in zip(fields, results):
+            if isinstance(result, grpc.aio.AioRpcError):
+                info['errors'][field] = result.details()
+            elif isinstance(result, BaseException):
+                info['errors'][field] = str(result) or result.__class__.__name__
+            else:
+                info[field] = result
+
+        if any([info['uptime'], info['cpu_usage'], info['memory_usage']]):
+            info['status'] = 'online'
+        if info['errors']:
+            logger.warning(f"Partial system info from {self.connection_string}: {info['errors']}")
+            if info['status'] == 'offline':
+                info['error'] = "; ".join(f"{field}: {error}" for field, error in info['errors'].items())
+
+        return info
+
+    async def read_live_logs_stream(
+        self,
+        log_type: int = LogType.GATEWAY_AGENT,
+        traffic_log_index: str = "",
+        line_count: int = 100
+    ) -> AsyncIterator[str]:
+        # errors are raised (grpc.aio.AioRpcError), not yielded as text
+        channel = await self.get_channel()
+        stub = gateway_agent_pb2_grpc.GatewayAgentStub(channel)
+        request = gateway_agent_pb2.LiveLogsRequest(
+            type=log_type,
+            traffic_log_index=traffic_log_index,
+            line_count=line_count
+        )
+
+        logger.info(f"Starting async live logs stream for {self.connection_string}")
+        call = stub.ReadLiveLogs(request)
+        try:
+            async for response in call:
+                yield response.log
+        finally:
+            call.cancel()
+
+    async def test_connection(self) -> bool:
+        return await self.get_uptime() is not None
+
+    async def close(self):
+        # channels of other loops can't be closed from this one, they go with their loop
+        channels, self._channels = self._channels, weakref.WeakKeyDictionary()
+        channel = channels.get(asyncio.get_running_loop())
+        if channel is not None:
+            try:
+                await channel.close()
+            except Exception as e:
+                logger.warning(f"Error closing async channel to {self.connection_string}: {e}")
+
+
+class AsyncGatewayGRPCManager:
+    """
+    Awaitable gateway RPCs for code running on an event loop. Snapshots go
+    through `cache` when given, so the loop and the sync pollers reuse each
+    other's fresh results; concurrent misses for a gateway share one load.
+    """
+
+    def __init__(self, max_concurrency: int = 500, cache: Optional[SystemInfoCache] = None):
+        self.clients: Dict[str, AsyncGatewayGRPCClient] = {}
+        self.max_concurrency = max_concurrency
+        self.cache = cache
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def get_client(self, gateway_address: str, gateway_port: int) -> AsyncGatewayGRPCClient:
+        connection_string = f"{gateway_address}:{gateway_port}"
+
+        # only touched from event loop threads, no lock needed
+        if connection_string not in self.clients:
+            self.clients[connection_string] = AsyncGatewayGRPCClient(
+                gateway_address=gateway_address,
+                gateway_port=gateway_port
+            )
+            logger.info(f"Created new async gRPC client for {connection_string}")
+
+        return self.clients[connection_string]
+
+    async def get_system_info(
+        self,
+        gateway_address: str,
+        gateway_port: int,
+        deadline: Optional[float] = None
+    ) -> Dict[str, Any]:
+        key = f"{gateway_address}:{gateway_port}"
+        if self.cache is not None:
+            cached = self.cache.peek(key)
+            if cached is not None:
+                return cached
+
+        loop = asyncio.get_running_loop()
+        load = self._inflight.get(key)
+        if load is None or load.get_loop() is not loop:
+            load = self._inflight[key] = asyncio.ensure_future(
+                self._load_system_info(key, gateway_address, gateway_port, deadline)
+            )
+        # shielded: a cancelled caller mustn't cancel the load the others are waiting on
+        return copy.deepcopy(await asyncio.shield(load))
+
+    async def _load_system_info(self, key, gateway_address, gateway_port, deadline):
+        try:
+            info = await self.get_client(gateway_address, gateway_port).get_system_info(deadline=deadline)
+            if self.cache is not None:
+                self.cache.put(key, info)
+            return info
+        finally:
+            if self._inflight.get(key) is asyncio.current_task():
+                del self._inflight[key]
+
+    async def get_all_gateways_info(self, gateways, deadline: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def get_gateway_info(gateway):
+            async with semaphore:
+                return str(gateway.id), await self.get_system_info(gateway.address, gateway.port, deadline)
+
+        results = {}
+        outcomes = await asyncio.gather(*(get_gateway_info(g) for g in gateways), return_exceptions=True)
+        for gateway, outcome in zip(gateways, outcomes):
+            if isinstance(outcome, BaseException):
+                # still listed, so fleet views don't lose the gateway for a tick
+                logger.error(f"Error getting info of gateway {gateway.id}: {outcome}")
+                results[str(gateway.id)] = offline_system_info(gateway.address, gateway.port, str(outcome))
+                continue
+            gateway_id, info = outcome
+            results[gateway_id] = info
+
+        return results
+
+    async def test_gateway_connection(self, gateway_address: str, gateway_port: int) -> bool:
+        try:
+            return await self.get_client(gateway_address, gateway_port).test_connection()
+        except Exception as e:
+            logger.error(f"Error testing connection to {gateway_address}:{gateway_port}: {e}")
+            return False
+
+    def read_live_logs_stream(
+        self,
+        gateway_address: str,
+        gateway_port: int,
+        log_type: int = LogType.GATEWAY_AGENT,
+        traffic_log_index: str = "",
+        line_count: int = 100
+    ) -> AsyncIterator[str]:
+        client = self.get_client(gateway_address, gateway_port)
+        return client.read_live_logs_stream(
+            log_type=log_type,
+            traffic_log_index=traffic_log_index,
+            line_count=line_count
+        )
+
+    async def cleanup(self):
+        clients = list(self.clients.values())
+        self.clients.clear()
+        for client in clients:
+            await client.close()
+        logger.info("Cleaned up all async gRPC connections")
+
+
+# Singleton: shares the sync manager's snapshot cache
+async_grpc_manager = AsyncGatewayGRPCManager(
+    max_concurrency=get_setting('GRPC_ASYNC_MAX_CONCURRENCY', 500),
+    cache=grpc_manager.system_info_cache
+)
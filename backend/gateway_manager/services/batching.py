@@ -0,0 +1,99 @@
+import heapq
+import itertools
+import threading
+import time
+from typing import Any, Callable, List, Optional
+
+
+class BatchFlushScheduler:
+    """Single timer thread that flushes every LogBatcher whose delay has elapsed."""
+
+    def __init__(self):
+        self._heap: List[tuple] = []
+        self._order = itertools.count()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def schedule(self, batcher: 'LogBatcher', deadline: float):
+        with self._condition:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name="log_batch_flusher")
+                self._thread.start()
+            heapq.heappush(self._heap, (deadline, next(self._order), batcher))
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._heap:
+                    self._condition.wait()
+                deadline, _, batcher = self._heap[0]
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+                heapq.heappop(self._heap)
+
+            batcher.flush_due()
+
+
+batch_flush_scheduler = BatchFlushScheduler()
+
+
+class LogBatcher:
+    """
+    Collects items and hands them to `flush` as one list, either once
+    `max_lines` are pending or `max_delay` seconds after the first one.
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[List[Any]], None],
+        max_lines: int = 100,
+        max_delay: float = 0.1,
+        scheduler: BatchFlushScheduler = batch_flush_scheduler
+    ):
+        self._flush = flush
+        self.max_lines = max_lines
+        self.max_delay = max_delay
+        self.scheduler = scheduler
+        self._items: List[Any] = []
+        self._deadline: Optional[float] = None
+        self._items_lock = threading.Lock()
+        # held while a batch is taken and sent, keeps batches in order
+        self._flush_lock = threading.Lock()
+        self.closed = False
+
+    def add(self, item: Any):
+        with self._items_lock:
+            if self.closed:
+                return
+            self._items.append(item)
+            full = len(self._items) >= self.max_lines
+            if not full and self._deadline is None:
+                self._deadline = time.monotonic() + self.max_delay
+                self.scheduler.schedule(self, self._deadline)
+
+        if full:
+            self.flush()
+
+    def flush_due(self):
+        with self._items_lock:
+            if self._deadline is None or self._deadline > time.monotonic():
+                return
+        self.flush()
+
+    def flush(self):
+        with self._flush_lock:
+            with self._items_lock:
+                items, self._items = self._items, []
+                self._deadline = None
+            if items:
+                self._flush(items)
+
+    def close(self):
+        # pending items are dropped, nobody is listening anymore
+        with self._items_lock:
+            self.closed = True
+            self._items = []
+            self._deadline = None
@@ -0,0 +1,10 @@
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+
+def get_setting(name: str, default):
+    # services are also used outside a configured Django project (unit tests, scripts)
+    try:
+        return getattr(settings, name, default)
+    except ImproperlyConfigured:
+        return default
@@ -0,0 +1,85 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+from graphql import DocumentNode, GraphQLError, GraphQLSchema, parse, validate
+
+from .conf import get_setting
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentCache:
+    """
+    LRU of parsed and validated GraphQL documents, keyed by a hash of the
+    query text. Only documents that passed validation are kept, so a hit
+    skips both parse and validate. Documents are never mutated by
+    execution and are shared between requests.
+    """
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self._documents: "OrderedDict[Hashable, DocumentNode]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(schema: GraphQLSchema, query: str, rules: Optional[Sequence]) -> Hashable:
+        digest = hashlib.sha256(query.encode('utf-8')).digest()
+        return digest, id(schema), tuple(rules) if rules is not None else None
+
+    def get(
+        self,
+        schema: GraphQLSchema,
+        query: str,
+        rules: Optional[Sequence] = None,
+        max_errors: Optional[int] = None
+    ) -> Tuple[Optional[DocumentNode], List[GraphQLError]]:
+        """
+        (document, errors) for `query`. The document is None when the query
+        does not parse; errors holds the parse or validation errors.
+        """
+        key = self._key(schema, query, rules)
+
+        with self._cache_lock:
+            document = self._documents.get(key)
+            if document is not None:
+                self._documents.move_to_end(key)
+                self.hits += 1
+                return document, []
+            self.misses += 1
+
+        try:
+            document = parse(query)
+        except GraphQLError as e:
+            return None, [e]
+
+        errors = validate(schema, document, rules, max_errors=max_errors)
+        if not errors and self.max_size > 0:
+            with self._cache_lock:
+                self._documents[key] = document
+                self._documents.move_to_end(key)
+                while len(self._documents) > self.max_size:
+                    self._documents.popitem(last=False)
+
+        return document, errors
+
+    def stats(self) -> Dict[str, int]:
+        with self._cache_lock:
+            return {
+                'size': len(self._documents),
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+    def clear(self):
+        with self._cache_lock:
+            self._documents.clear()
+
+
+# Singleton: shared by the HTTP view and the WebSocket consumer
+document_cache = DocumentCache(max_size=get_setting('GRAPHQL_DOCUMENT_CACHE_SIZE', 256))
@@ -0,0 +1,161 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, List, NamedTuple, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+GatewayFields = Dict[str, Any]
+
+
+class FleetSnapshot(NamedTuple):
+    timestamp: float
+    gateways: Dict[str, GatewayFields]  # gateway id -> fields
+    is_active: Optional[bool] = None    # the filter the gateways were loaded with
+
+
+class FleetDelta(NamedTuple):
+    changed: Dict[str, GatewayFields]     # changed or new gateways, all their fields
+    changed_fields: Dict[str, List[str]]  # names of the fields that differ, per changed gateway
+    removed: List[str]
+
+
+def fleet_delta(
+    previous: Optional[Dict[str, GatewayFields]],
+    current: Dict[str, GatewayFields],
+    ignore: Sequence[str] = ('timestamp',)
+) -> FleetDelta:
+    """
+    What changed from `previous` to `current`. Without a previous state
+    every gateway and every field counts as changed.
+    """
+    changed = {}
+    changed_fields = {}
+    for gateway_id, fields in current.items():
+        before = previous.get(gateway_id) if previous is not None else None
+        names = [
+            name for name, value in fields.items()
+            if name not in ignore and (before is None or before.get(name) != value)
+        ]
+        if names:
+            changed[gateway_id] = fields
+            changed_fields[gateway_id] = names
+
+    removed = [gateway_id for gateway_id in previous if gateway_id not in current] if previous else []
+    return FleetDelta(changed, changed_fields, removed)
+
+
+class FleetPoller:
+    """
+    One poll loop for the whole fleet, shared by every fleet subscriber.
+    Each tick reloads the gateway list, so added, removed and toggled
+    gateways are picked up, fetches all of them at once and hands the
+    snapshot to every subscriber's sink. Every loaded gateway is in the
+    snapshot: one fetch_all returned nothing for is described from
+    `unreachable(gateway)`. Starts with the first subscriber and stops with
+    the last one.
+    """
+
+    def __init__(
+        self,
+        load_gateways: Callable[[Optional[bool]], List[Any]],
+        fetch_all: Callable[[List[Any]], Dict[str, Dict[str, Any]]],
+        describe: Callable[[Any, Dict[str, Any]], GatewayFields],
+        unreachable: Callable[[Any], Dict[str, Any]],
+        interval: float = 5.0
+    ):
+        self.load_gateways = load_gateways
+        self.fetch_all = fetch_all
+        self.describe = describe
+        self.unreachable = unreachable
+        self.interval = interval
+        self.latest: Optional[FleetSnapshot] = None
+        self._subscribers: Dict[Hashable, tuple] = {}  # subscriber -> (sink, is_active)
+        self._stop_event: Optional[threading.Event] = None
+        self._poller_lock = threading.Lock()
+
+    def subscribe(
+        self,
+        subscriber: Hashable,
+        sink: Callable[[FleetSnapshot], None],
+        is_active: Optional[bool] = None
+    ) -> Optional[FleetSnapshot]:
+        """
+        Returns the latest snapshot, if it covers the subscriber's filter, so
+        the subscriber needn't wait a tick.
+        """
+        with self._poller_lock:
+            self._subscribers[subscriber] = (sink, is_active)
+            if self._stop_event is None:
+                self._stop_event = threading.Event()
+                threading.Thread(
+                    target=self._run,
+                    args=(self._stop_event,),
+                    daemon=True,
+                    name="poll_fleet"
+                ).start()
+                logger.info("Started fleet poller")
+            logger.info(f"Fleet poller now has {len(self._subscribers)} subscriber(s)")
+            latest = self.latest
+
+        if latest is None or latest.is_active not in (None, is_active):
+            # loaded for the other subscribers' filter: it may lack gateways this one wants
+            return None
+        return latest if is_active is None else self._filter(latest, is_active)
+
+    def unsubscribe(self, subscriber: Hashable):
+        with self._poller_lock:
+            self._subscribers.pop(subscriber, None)
+            if not self._subscribers and self._stop_event is not None:
+                self._stop_event.set()
+                self._stop_event = None
+                self.latest = None
+                logger.info("Stopping fleet poller")
+
+    def subscriber_count(self) -> int:
+        with self._poller_lock:
+            return len(self._subscribers)
+
+    def _wanted_is_active(self) -> Optional[bool]:
+        # only poll inactive gateways (or active ones) when somebody watches them
+        with self._poller_lock:
+            wanted = {is_active for _, is_active in self._subscribers.values()}
+        return wanted.pop() if len(wanted) == 1 else None
+
+    @staticmethod
+    def _filter(snapshot: FleetSnapshot, is_active: bool) -> FleetSnapshot:
+        return FleetSnapshot(snapshot.timestamp, {
+            gateway_id: fields for gateway_id, fields in snapshot.gateways.items()
+            if fields.get('is_active') == is_active
+        }, is_active)
+
+    def poll(self, is_active: Optional[bool] = None) -> FleetSnapshot:
+        gateways = self.load_gateways(is_active)
+        infos = self.fetch_all(gateways)
+        # a gateway missing for a tick would look removed, then added again
+        return FleetSnapshot(time.time(), {
+            str(gateway.id): self.describe(gateway, infos.get(str(gateway.id)) or self.unreachable(gateway))
+            for gateway in gateways
+        }, is_active)
+
+    def _run(self, stop_event: threading.Event):
+        while not stop_event.is_set():
+            try:
+                snapshot = self.poll(self._wanted_is_active())
+                with self._poller_lock:
+                    if stop_event.is_set():
+                        break
+                    self.latest = snapshot
+                    subscribers = list(self._subscribers.values())
+
+                for sink, is_active in subscribers:
+                    try:
+                        sink(snapshot if is_active is None else self._filter(snapshot, is_active))
+                    except Exception as e:
+                        logger.error(f"Fleet subscriber failed: {e}")
+            except Exception as e:
+                logger.error(f"Error in fleet poller: {e}")
+
+            stop_event.wait(self.interval)
+
+        logger.info("Fleet poller stopped")
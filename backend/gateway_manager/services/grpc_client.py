@@ -1,61 +1,283 @@
+import copy
 import grpc
 import logging
 import threading
 import time
-from typing import Optional, Dict, Any, Generator
+from typing import Optional, Dict, Any, Generator, Callable, Tuple
 from contextlib import contextmanager
-from concurrent.futures import ThreadPoolExecutor
-from django.conf import settings
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 
+from ..constants import LogType
 from ..protobuf import gateway_agent_pb2, gateway_agent_pb2_grpc
+from .conf import get_setting
 
 logger = logging.getLogger(__name__)
 
-class LogType:
-    CONTROLLER = 0
-    SETTING = 1
-    GATEWAY_AGENT = 2
+CHANNEL_OPTIONS = [
+    ('grpc.keepalive_time_ms', 30000),
+    ('grpc.keepalive_timeout_ms', 5000),
+    ('grpc.keepalive_permit_without_calls', True), # live log -> long stream
+    ('grpc.http2.max_pings_without_data', 0),
+    ('grpc.http2.min_time_between_pings_ms', 10000), # Dos
+    ('grpc.http2.min_ping_interval_without_data_ms', 300000)
+]
+
+
+def offline_system_info(gateway_address: str, gateway_port: int, error: Optional[str] = None) -> Dict[str, Any]:
+    """System info of a gateway nothing could be read from (yet)."""
+    return {
+        'gateway_address': gateway_address,
+        'gateway_port': gateway_port,
+        'connection_string': f"{gateway_address}:{gateway_port}",
+        'uptime': None,
+        'cpu_usage': None,
+        'memory_usage': None,
+        'status': 'offline',
+        'timestamp': time.time(),
+        'error': error,
+        'errors': {}
+    }
+
+
+class GatewayChannelPool:
+    """
+    Long-lived gRPC channels keyed by gateway connection string.
+    Channels are reused across calls and evicted when idle. Nothing
+    watches them in the background (grpc runs a polling thread per
+    subscribed channel): a new channel is waited for once, and one whose
+    RPCs come back UNAVAILABLE is dropped and reopened by the next call.
+    """
+
+    def __init__(self, idle_timeout: float = 300, sweep_interval: float = 60):
+        self.idle_timeout = idle_timeout
+        self.sweep_interval = sweep_interval
+        self._channels: Dict[str, Dict[str, Any]] = {}
+        self._pool_lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.reconnects = 0
+
+    def _open(self, connection_string: str) -> Dict[str, Any]:
+        channel = grpc.insecure_channel(connection_string, options=CHANNEL_OPTIONS)
+        entry = {
+            'channel': channel,
+            'last_used': time.monotonic(),
+        }
+        logger.info(f"Opened pooled channel to {connection_string}")
+        return entry
+
+    def _close(self, connection_string: str, entry: Dict[str, Any]):
+        try:
+            entry['channel'].close()
+        except Exception as e:
+            logger.warning(f"Error closing pooled channel to {connection_string}: {e}")
+
+    def _sweep_idle_locked(self, now: float):
+        if now - self._last_sweep < self.sweep_interval:
+            return
+        self._last_sweep = now
+
+        for connection_string, entry in list(self._channels.items()):
+            if now - entry['last_used'] > self.idle_timeout:
+                del self._channels[connection_string]
+                self._close(connection_string, entry)
+                self.evictions += 1
+                logger.info(f"Evicted idle channel to {connection_string}")
+
+    def acquire(self, connection_string: str, timeout: float) -> grpc.Channel:
+        now = time.monotonic()
+        with self._pool_lock:
+            self._sweep_idle_locked(now)
+
+            entry = self._channels.get(connection_string)
+            opened = entry is None
+            if opened:
+                self.misses += 1
+                entry = self._open(connection_string)
+                self._channels[connection_string] = entry
+            else:
+                self.hits += 1
+
+            entry['last_used'] = now
+            channel = entry['channel']
+
+        # only a new channel is waited for; RPCs on a known one report its health
+        if opened:
+            try:
+                grpc.channel_ready_future(channel).result(timeout=timeout)
+            except Exception:
+                # drop the broken channel, the next call reconnects from scratch
+                self.invalidate(connection_string, channel)
+                raise
+
+        return channel
+
+    def report_error(self, connection_string: str, channel: grpc.Channel, error: BaseException):
+        """Drops `channel` when an RPC on it found the gateway unreachable."""
+        if isinstance(error, grpc.RpcError) and hasattr(error, 'code') \
+                and error.code() == grpc.StatusCode.UNAVAILABLE:
+            logger.info(f"Channel to {connection_string} is unavailable, reopening on next use")
+            self.invalidate(connection_string, channel)
+
+    def invalidate(self, connection_string: str, channel: Optional[grpc.Channel] = None):
+        with self._pool_lock:
+            entry = self._channels.get(connection_string)
+            if entry is None or (channel is not None and entry['channel'] is not channel):
+                return
+            del self._channels[connection_string]
+            self.reconnects += 1
+        self._close(connection_string, entry)
+
+    def evict_idle(self):
+        with self._pool_lock:
+            self._last_sweep = 0
+            self._sweep_idle_locked(time.monotonic())
+
+    def stats(self) -> Dict[str, int]:
+        with self._pool_lock:
+            return {
+                'size': len(self._channels),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'reconnects': self.reconnects,
+            }
+
+    def close_all(self):
+        with self._pool_lock:
+            entries = list(self._channels.items())
+            self._channels.clear()
+        for connection_string, entry in entries:
+            self._close(connection_string, entry)
+
+
+class SystemInfoCache:
+    """
+    Latest system info snapshot per gateway, valid for `ttl` seconds.
+    Concurrent misses for the same gateway share a single in-flight load.
+    Callers get deep copies (snapshots nest an `errors` dict), so none of
+    them can change what the others or the cache see.
+    """
+
+    def __init__(self, ttl: float = 2.0):
+        self.ttl = ttl
+        self._entries: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._inflight: Dict[str, Future] = {}
+        self._cache_lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, key: str, loader: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        with self._cache_lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] <= self.ttl:
+                self.hits += 1
+                return copy.deepcopy(entry[1])
+
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                self.misses += 1
+                future = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return copy.deepcopy(future.result())
+
+        try:
+            value = loader()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            # the leader keeps the loaded dict, the cache and followers share a private copy
+            cached = copy.deepcopy(value)
+            with self._cache_lock:
+                self._entries[key] = (time.monotonic(), cached)
+            future.set_result(cached)
+        finally:
+            with self._cache_lock:
+                self._inflight.pop(key, None)
+
+        return value
+
+    def peek(self, key: str) -> Optional[Dict[str, Any]]:
+        """The cached snapshot if still fresh, without loading one."""
+        with self._cache_lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] <= self.ttl:
+                self.hits += 1
+                return copy.deepcopy(entry[1])
+            return None
+
+    def put(self, key: str, value: Dict[str, Any]):
+        """Store a snapshot loaded elsewhere (e.g. by the asyncio manager)."""
+        value = copy.deepcopy(value)
+        with self._cache_lock:
+            self._entries[key] = (time.monotonic(), value)
+
+    def invalidate(self, key: str):
+        with self._cache_lock:
+            self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._cache_lock:
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+            }
+
+    def clear(self):
+        with self._cache_lock:
+            self._entries.clear()
+
 
 class GatewayGRPCClient:
-    def __init__(self, gateway_address: str, gateway_port: int, timeout: int=10):
+    def __init__(
+        self,
+        gateway_address: str,
+        gateway_port: int,
+        timeout: int=10,
+        channel_pool: Optional[GatewayChannelPool] = None
+    ):
         self.gateway_address = gateway_address
         self.gateway_port = gateway_port
         self.timeout = timeout
         self.connection_string = f"{gateway_address}:{gateway_port}"
-        self.FIXED_CONNECTIONS_STRING="192.168.117.131:2425"
+        self.channel_pool = channel_pool if channel_pool is not None else GatewayChannelPool()
         self._streaming_connections = {}
+        self._streaming_ready: Dict[str, grpc.Future] = {}  # stream_id -> readiness of a channel still connecting
         self._connection_lock = threading.Lock() # Only one thread can change the dictionary at a time.
 
     @contextmanager
-    def get_channel(self):
-        channel = None
+    def get_channel(self, timeout: Optional[float] = None):
+        # pooled channel: stays open after the call, the pool owns its lifetime
         try:
-            channel = grpc.insecure_channel(
-                self.FIXED_CONNECTIONS_STRING,
-                options=[
-                    ('grpc.keepalive_time_ms', 30000),
-                    ('grpc.keepalive_timeout_ms', 5000),
-                    ('grpc.keepalive_permit_without_calls', True), # live log -> long stream
-                    ('grpc.http2.max_pings_without_data', 0),
-                    ('grpc.http2.min_time_between_pings_ms', 10000), # Dos
-                    ('grpc.http2.min_ping_interval_without_data_ms', 300000)
-                ]
+            channel = self.channel_pool.acquire(
+                self.connection_string,
+                timeout=self.timeout if timeout is None else timeout
             )
-            
-            grpc.channel_ready_future(channel).result(timeout=self.timeout)
-            logger.debug(f"Connected to gateway at {self.FIXED_CONNECTIONS_STRING}")
-            
-            yield channel
-            
+            logger.debug(f"Connected to gateway at {self.connection_string}")
         except grpc.RpcError as e:
-            logger.error(f"gRPC Error connecting to {self.FIXED_CONNECTIONS_STRING}: {e}")
+            logger.error(f"gRPC Error connecting to {self.connection_string}: {e}")
             raise
         except Exception as e:
-            logger.error(f"Connection error to {self.FIXED_CONNECTIONS_STRING}: {e}")
+            logger.error(f"Connection error to {self.connection_string}: {e}")
+            raise
+
+        try:
+            yield channel
+        except grpc.RpcError as e:
+            self.channel_pool.report_error(self.connection_string, channel, e)
             raise
-        finally:
-            if channel:
-                channel.close()
 
     def get_uptime(self) -> Optional[str]:
         try:
@@ -63,10 +285,10 @@ class GatewayGRPCClient:
                 stub = gateway_agent_pb2_grpc.GatewayAgentStub(channel)
                 request = gateway_agent_pb2.NullRequest()
                 response = stub.Uptime(request, timeout=self.timeout)
-                logger.debug(f"Uptime received from {self.FIXED_CONNECTIONS_STRING}: {response.uptime}")
+                logger.debug(f"Uptime received from {self.connection_string}: {response.uptime}")
                 return response.uptime
         except Exception as e:
-            logger.error(f"Error getting uptime from {self.FIXED_CONNECTIONS_STRING}: {e}")
+            logger.error(f"Error getting uptime from {self.connection_string}: {e}")
             return None
     
     def get_cpu_usage(self) -> Optional[str]:
@@ -75,10 +297,10 @@ class GatewayGRPCClient:
                 stub = gateway_agent_pb2_grpc.GatewayAgentStub(channel)
                 request = gateway_agent_pb2.NullRequest()
                 response = stub.CpuUsage(request, timeout=self.timeout)
-                logger.debug(f"CPU usage received from {self.FIXED_CONNECTIONS_STRING}: {response.cpu_usage}")
+                logger.debug(f"CPU usage received from {self.connection_string}: {response.cpu_usage}")
                 return response.cpu_usage
         except Exception as e:
-            logger.error(f"Error getting CPU usage from {self.FIXED_CONNECTIONS_STRING}: {e}")
+            logger.error(f"Error getting CPU usage from {self.connection_string}: {e}")
             return None 
 
     def get_memory_usage(self) -> Optional[str]:
@@ -87,24 +309,17 @@ class GatewayGRPCClient:
                 stub = gateway_agent_pb2_grpc.GatewayAgentStub(channel)
                 request = gateway_agent_pb2.NullRequest()
                 response = stub.MemoryUsage(request, timeout=self.timeout)
-                logger.debug(f"Memory usage received from {self.FIXED_CONNECTIONS_STRING}: {response.memory_usage}")
+                logger.debug(f"Memory usage received from {self.connection_string}: {response.memory_usage}")
                 return response.memory_usage
         except Exception as e:
-            logger.error(f"Error getting memory usage from {self.FIXED_CONNECTIONS_STRING}: {e}")
+            logger.error(f"Error getting memory usage from {self.connection_string}: {e}")
             return None
         
-    def get_system_info(self) -> Dict[str, Any]:
-        info = {
-            'gateway_address': self.gateway_address,
-            'gateway_port': self.gateway_port,
-            'connection_string': self.connection_string,
-            'uptime': None,
-            'cpu_usage': None,
-            'memory_usage': None,
-            'status': 'offline',
-            'timestamp': time.time(),
-            'error': None
-        }
+    def get_system_info(self, concurrent: bool = False, deadline: Optional[float] = None) -> Dict[str, Any]:
+        info = offline_system_info(self.gateway_address, self.gateway_port)
+
+        if concurrent:
+            return self._get_system_info_concurrent(info, deadline)
         
         try:
             info['uptime'] = self.get_uptime()
@@ -115,61 +330,115 @@ class GatewayGRPCClient:
                 info['status'] = 'online'
                 
         except Exception as e:
-            logger.error(f"Error getting system info from {self.FIXED_CONNECTIONS_STRING}: {e}")
+            logger.error(f"Error getting system info from {self.connection_string}: {e}")
             info['error'] = str(e)
         
         return info
 
+    def _get_system_info_concurrent(self, info: Dict[str, Any], deadline: Optional[float]) -> Dict[str, Any]:
+        # all three unary calls in flight at once, sharing a single deadline
+        expires_at = time.monotonic() + (self.timeout if deadline is None else deadline)
+
+        def remaining() -> float:
+            return max(0.0, expires_at - time.monotonic())
+
+        try:
+            with self.get_channel(timeout=remaining()) as channel:
+                stub = gateway_agent_pb2_grpc.GatewayAgentStub(channel)
+                request = gateway_agent_pb2.NullRequest()
+                calls = {
+                    'uptime': stub.Uptime.future(request, timeout=remaining()),
+                    'cpu_usage': stub.CpuUsage.future(request, timeout=remaining()),
+                    'memory_usage': stub.MemoryUsage.future(request, timeout=remaining()),
+                }
+
+                for field, call in calls.items():
+                    try:
+                        info[field] = getattr(call.result(timeout=remaining()), field)
+                    except grpc.FutureTimeoutError:
+                        call.cancel()
+                        info['errors'][field] = "Deadline exceeded"
+                    except grpc.RpcError as e:
+                        self.channel_pool.report_error(self.connection_string, channel, e)
+                        info['errors'][field] = e.details() if hasattr(e, 'details') else str(e)
+                    except Exception as e:
+                        info['errors'][field] = str(e)
+
+        except Exception as e:
+            logger.error(f"Error getting system info from {self.connection_string}: {e}")
+            info['error'] = str(e) or "Gateway unreachable"
+            return info
+
+        if any([info['uptime'], info['cpu_usage'], info['memory_usage']]):
+            info['status'] = 'online'
+        if info['errors']:
+            logger.warning(f"Partial system info from {self.connection_string}: {info['errors']}")
+            if info['status'] == 'offline':
+                info['error'] = "; ".join(f"{field}: {error}" for field, error in info['errors'].items())
+        
+        return info
+
     # streaming
     def create_streaming_connection(self, stream_id: str) -> Optional[grpc.Channel]:
+        with self._connection_lock:
+            if stream_id in self._streaming_connections:
+                return self._streaming_connections[stream_id]
+
+            # dedicated channel: closing it is how a single stream gets cancelled
+            channel = grpc.insecure_channel(
+                self.connection_string,
+                options=CHANNEL_OPTIONS + [
+                    ('grpc.max_receive_message_length', 1024 * 1024 * 4),  # 4MB
+                ]
+            )
+            # registered while connecting, so close_streaming_connection can abort the wait
+            ready = self._streaming_ready[stream_id] = grpc.channel_ready_future(channel)
+            self._streaming_connections[stream_id] = channel
+
+        # waited for without the lock: closing other streams of this gateway mustn't block on it
         try:
-            with self._connection_lock:
-                if stream_id in self._streaming_connections:
-                    return self._streaming_connections[stream_id]
-                
-                channel = grpc.insecure_channel(
-                    self.FIXED_CONNECTIONS_STRING,
-                    options=[
-                        ('grpc.keepalive_time_ms', 30000),
-                        ('grpc.keepalive_timeout_ms', 5000),
-                        ('grpc.keepalive_permit_without_calls', True),
-                        ('grpc.http2.max_pings_without_data', 0),
-                        ('grpc.http2.min_time_between_pings_ms', 10000),
-                        ('grpc.http2.min_ping_interval_without_data_ms', 300000),
-                        ('grpc.max_receive_message_length', 1024 * 1024 * 4),  # 4MB
-                    ]
-                )
-                grpc.channel_ready_future(channel).result(timeout=self.timeout)
-                
-                self._streaming_connections[stream_id] = channel
-                logger.info(f"Created streaming connection {stream_id} to {self.FIXED_CONNECTIONS_STRING}")
-                return channel
-                
+            ready.result(timeout=self.timeout)
         except Exception as e:
-            logger.error(f"Error creating streaming connection to {self.FIXED_CONNECTIONS_STRING}: {e}")
+            logger.error(f"Error creating streaming connection to {self.connection_string}: {e}")
+            with self._connection_lock:
+                if self._streaming_connections.get(stream_id) is channel:
+                    del self._streaming_connections[stream_id]
+                    self._streaming_ready.pop(stream_id, None)
+            channel.close()
             return None
+
+        with self._connection_lock:
+            if self._streaming_ready.get(stream_id) is ready:
+                del self._streaming_ready[stream_id]
+            if self._streaming_connections.get(stream_id) is not channel:
+                # closed while connecting
+                return None
+        logger.info(f"Created streaming connection {stream_id} to {self.connection_string}")
+        return channel
     
     def close_streaming_connection(self, stream_id: str):
         with self._connection_lock:
-            if stream_id in self._streaming_connections:
-                channel = self._streaming_connections.pop(stream_id)
-                channel.close()
-                logger.info(f"Closed streaming connection {stream_id} to {self.FIXED_CONNECTIONS_STRING}")
+            channel = self._streaming_connections.pop(stream_id, None)
+            ready = self._streaming_ready.pop(stream_id, None)
+        if ready is not None:
+            ready.cancel()
+        if channel is not None:
+            channel.close()
+            logger.info(f"Closed streaming connection {stream_id} to {self.connection_string}")
     
-    def read_live_logs_stream(
+    def iter_live_logs(
         self, 
         stream_id: str,
         log_type: int = LogType.GATEWAY_AGENT, 
         traffic_log_index: str = "", 
         line_count: int = 100
     ) -> Generator[str, None, None]:
-        channel = None
+        """Like read_live_logs_stream, but failures are raised instead of yielded as "Error: ..." lines."""
+        channel = self.create_streaming_connection(stream_id)
+        if not channel:
+            raise ConnectionError(f"Could not establish streaming connection to {self.connection_string}")
+
         try:
-            channel = self.create_streaming_connection(stream_id)
-            if not channel:
-                yield "Error: Could not establish streaming connection"
-                return
-            
             stub = gateway_agent_pb2_grpc.GatewayAgentStub(channel)
             request = gateway_agent_pb2.LiveLogsRequest(
                 type=log_type,
@@ -177,22 +446,32 @@ class GatewayGRPCClient:
                 line_count=line_count
             )
             
-            logger.info(f"Starting live logs stream {stream_id} for {self.FIXED_CONNECTIONS_STRING}")
+            logger.info(f"Starting live logs stream {stream_id} for {self.connection_string}")
             
             for response in stub.ReadLiveLogs(request):
                 yield response.log
+        finally:
+            self.close_streaming_connection(stream_id)
                 
+    def read_live_logs_stream(
+        self, 
+        stream_id: str,
+        log_type: int = LogType.GATEWAY_AGENT, 
+        traffic_log_index: str = "", 
+        line_count: int = 100
+    ) -> Generator[str, None, None]:
+        try:
+            yield from self.iter_live_logs(stream_id, log_type, traffic_log_index, line_count)
+        except ConnectionError:
+            yield "Error: Could not establish streaming connection"
         except grpc.RpcError as e:
-            error_msg = f"gRPC streaming error for {self.FIXED_CONNECTIONS_STRING}: {e}"
+            error_msg = f"gRPC streaming error for {self.connection_string}: {e}"
             logger.error(error_msg)
             yield f"Error: {error_msg}"
         except Exception as e:
-            error_msg = f"Streaming error for {self.FIXED_CONNECTIONS_STRING}: {e}"
+            error_msg = f"Streaming error for {self.connection_string}: {e}"
             logger.error(error_msg)
             yield f"Error: {error_msg}"
-        finally:
-            if stream_id:
-                self.close_streaming_connection(stream_id)
 
     def test_connection(self) -> bool:
         try:
@@ -203,14 +482,22 @@ class GatewayGRPCClient:
     
     def close_all_streaming_connections(self):
         with self._connection_lock:
-            for stream_id in list(self._streaming_connections.keys()):
-                self.close_streaming_connection(stream_id)
+            stream_ids = list(self._streaming_connections.keys())
+        # close_streaming_connection takes the (non re-entrant) lock itself
+        for stream_id in stream_ids:
+            self.close_streaming_connection(stream_id)
 
 
 class GatewayGRPCManager:
     def __init__(self):
         self.clients: Dict[str, GatewayGRPCClient] = {}
         self._manager_lock = threading.Lock()
+        self.channel_pool = GatewayChannelPool(
+            idle_timeout=get_setting('GRPC_CHANNEL_IDLE_TIMEOUT', 300)
+        )
+        self.system_info_cache = SystemInfoCache(
+            ttl=get_setting('GATEWAY_SYSTEM_INFO_CACHE_TTL', 2)
+        )
 
         self.executor = ThreadPoolExecutor(max_workers=10, thread_name_prefix="grpc_manager")
     
@@ -221,33 +508,54 @@ class GatewayGRPCManager:
             if connection_string not in self.clients:
                 self.clients[connection_string] = GatewayGRPCClient(
                     gateway_address=gateway_address,
-                    gateway_port=gateway_port
+                    gateway_port=gateway_port,
+                    channel_pool=self.channel_pool
                 )
                 logger.info(f"Created new gRPC client for {connection_string}")
             
             return self.clients[connection_string]
     
 
-    def get_all_gateways_info(self, gateways) -> Dict[str, Dict[str, Any]]:
-            results = {}
-            
-            def get_gateway_info(gateway):
-                client = self.get_client(gateway.address, gateway.port)
-                return str(gateway.id), client.get_system_info()
-            
-            futures = []
-            for gateway in gateways:
-                future = self.executor.submit(get_gateway_info, gateway)
-                futures.append(future)
-            
-            for future in futures:
-                try:
-                    gateway_id, info = future.result(timeout=30)  # 30 second timeout
-                    results[gateway_id] = info
-                except Exception as e:
-                    logger.error(f"Error getting gateway info: {e}")
-            
-            return results
+    def get_system_info(self, gateway_address: str, gateway_port: int) -> Dict[str, Any]:
+        client = self.get_client(gateway_address, gateway_port)
+        return self.system_info_cache.get(
+            f"{gateway_address}:{gateway_port}",
+            lambda: client.get_system_info(concurrent=True)
+        )
+
+    def refresh_system_info(self, gateway_address: str, gateway_port: int) -> Dict[str, Any]:
+        """Fetch a fresh snapshot whatever the cache holds, and cache it for the other readers."""
+        info = self.get_client(gateway_address, gateway_port).get_system_info(concurrent=True)
+        self.system_info_cache.put(f"{gateway_address}:{gateway_port}", info)
+        return info
+
+    def get_all_gateways_info(self, gateways, timeout: float = 30) -> Dict[str, Dict[str, Any]]:
+        """
+        System info of every gateway, fetched in parallel within one
+        shared `timeout`. A gateway whose fetch failed or is still
+        running gets an offline entry carrying the error.
+        """
+        futures = {
+            self.executor.submit(self.get_system_info, gateway.address, gateway.port): gateway
+            for gateway in gateways
+        }
+        done, _ = wait(futures, timeout=timeout)
+
+        results = {}
+        for future, gateway in futures.items():
+            if future not in done:
+                # queued fetches are dropped, a running one finishes unobserved
+                future.cancel()
+                error = f"Timed out after {timeout}s"
+            else:
+                error = future.exception()
+                if error is None:
+                    results[str(gateway.id)] = future.result()
+                    continue
+            logger.error(f"Error getting info of gateway {gateway.id}: {error}")
+            results[str(gateway.id)] = offline_system_info(gateway.address, gateway.port, str(error))
+
+        return results
     
     def test_gateway_connection(self, gateway_address: str, gateway_port: int) -> bool:
         try:
@@ -257,6 +565,12 @@ class GatewayGRPCManager:
             logger.error(f"Error testing connection to {gateway_address}:{gateway_port}: {e}")
             return False
         
+    def get_pool_stats(self) -> Dict[str, int]:
+        return self.channel_pool.stats()
+
+    def get_cache_stats(self) -> Dict[str, int]:
+        return self.system_info_cache.stats()
+
 
     def start_live_logs_stream(
         self, 
@@ -275,6 +589,23 @@ class GatewayGRPCManager:
             line_count=line_count
         )
     
+    def iter_live_logs_stream(
+        self,
+        gateway_address: str,
+        gateway_port: int,
+        stream_id: str,
+        log_type: int = LogType.GATEWAY_AGENT,
+        traffic_log_index: str = "",
+        line_count: int = 100
+    ) -> Generator[str, None, None]:
+        client = self.get_client(gateway_address, gateway_port)
+        return client.iter_live_logs(
+            stream_id=stream_id,
+            log_type=log_type,
+            traffic_log_index=traffic_log_index,
+            line_count=line_count
+        )
+
     def stop_live_logs_stream(self, gateway_address: str, gateway_port: int, stream_id: str):
         connection_string = f"{gateway_address}:{gateway_port}"
         if connection_string in self.clients:
@@ -286,6 +617,8 @@ class GatewayGRPCManager:
             for client in self.clients.values():
                 client.close_all_streaming_connections()
             self.clients.clear()
+        self.channel_pool.close_all()
+        self.system_info_cache.clear()
         
         self.executor.shutdown(wait=True) # shutdown threading pool, wait until all thread complited :)
         logger.info("Cleaned up all gRPC connections")
@@ -295,4 +628,4 @@ class GatewayGRPCManager:
 grpc_manager = GatewayGRPCManager()
 
 import atexit
-atexit.register(grpc_manager.cleanup)
\ No newline at end of file
+atexit.register(grpc_manager.cleanup)
@@ -0,0 +1,403 @@
+import heapq
+import json
+import logging
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from itertools import islice
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from .conf import get_setting
+
+logger = logging.getLogger(__name__)
+
+# one record per compressed block: first_ts, last_ts, offset in segment, compressed length
+INDEX_RECORD = struct.Struct('<ddQI')
+SEGMENT_SUFFIX = '.seg'
+INDEX_SUFFIX = '.idx'
+
+ArchivedLine = Tuple[float, int, str]  # (received_at, log_type, line)
+
+
+class ArchivedBlock(NamedTuple):
+    gateway_id: str
+    log_type: int
+    segment_path: str
+    offset: int
+    length: int
+    first_ts: float
+    last_ts: float
+
+
+class LogArchiveWriter:
+    """
+    Appends one gateway/log type's lines to segment files as zlib
+    compressed blocks of up to `block_lines` lines, or of whatever arrived
+    within `block_delay` seconds. Each block gets a fixed-size record in
+    the segment's .idx file, written after the block so it never points at
+    partial data. A new segment starts once the current one is full.
+    Only used from the archive's writer thread.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        gateway_id: str,
+        log_type: int,
+        segment_bytes: int,
+        block_lines: int = 500,
+        block_delay: float = 1.0,
+        on_rotate=None,
+        on_block=None
+    ):
+        self.directory = directory
+        self.gateway_id = gateway_id
+        self.log_type = log_type
+        self.segment_bytes = segment_bytes
+        self.block_lines = block_lines
+        self.block_delay = block_delay
+        self.on_rotate = on_rotate
+        self.on_block = on_block
+        self.segment_path: Optional[str] = None
+        self._segment_size = 0
+        self._pending: List[Tuple[float, str]] = []
+        self.flush_deadline: Optional[float] = None  # monotonic
+        self._writer_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def append(self, line: str, received_at: Optional[float] = None):
+        self._pending.append((received_at if received_at is not None else time.time(), line))
+        if len(self._pending) >= self.block_lines:
+            self.flush()
+        elif self.flush_deadline is None:
+            self.flush_deadline = time.monotonic() + self.block_delay
+
+    def flush(self):
+        records, self._pending, self.flush_deadline = self._pending, [], None
+        if records:
+            self._write_block(records)
+
+    def _write_block(self, records: List[Tuple[float, str]]):
+        payload = zlib.compress(
+            '\n'.join(json.dumps(record) for record in records).encode('utf-8')
+        )
+        timestamps = [record[0] for record in records]
+
+        with self._writer_lock:
+            if self.segment_path is None or self._segment_size >= self.segment_bytes:
+                self._open_segment(timestamps[0])
+
+            with open(self.segment_path, 'ab') as segment:
+                offset = segment.tell()
+                segment.write(payload)
+            with open(self.segment_path[:-len(SEGMENT_SUFFIX)] + INDEX_SUFFIX, 'ab') as index:
+                index.write(INDEX_RECORD.pack(min(timestamps), max(timestamps), offset, len(payload)))
+            self._segment_size = offset + len(payload)
+            block = ArchivedBlock(
+                self.gateway_id, self.log_type, self.segment_path,
+                offset, len(payload), min(timestamps), max(timestamps)
+            )
+
+        if self.on_block:
+            self.on_block(block, [line for _, line in records])
+
+    def _open_segment(self, first_ts: float):
+        previous = self.segment_path
+        self.segment_path = os.path.join(self.directory, f"{int(first_ts * 1000):015d}{SEGMENT_SUFFIX}")
+        self._segment_size = os.path.getsize(self.segment_path) if os.path.exists(self.segment_path) else 0
+        if previous is not None:
+            logger.info(f"Rotated log archive segment {previous} -> {self.segment_path}")
+            if self.on_rotate:
+                self.on_rotate()
+
+
+def _read_index(index_path: str) -> List[Tuple[float, float, int, int]]:
+    with open(index_path, 'rb') as index:
+        size = os.fstat(index.fileno()).st_size
+        # a record may still be in the middle of being appended
+        usable = size - size % INDEX_RECORD.size
+        if not usable:
+            return []
+        with mmap.mmap(index.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return list(INDEX_RECORD.iter_unpack(mapped[:usable]))
+
+
+def _read_segment(
+    segment_path: str,
+    log_type: int,
+    start: Optional[float],
+    end: Optional[float]
+) -> Iterator[ArchivedLine]:
+    index_path = segment_path[:-len(SEGMENT_SUFFIX)] + INDEX_SUFFIX
+    if not os.path.exists(index_path):
+        return
+    blocks = [
+        block for block in _read_index(index_path)
+        if (start is None or block[1] >= start) and (end is None or block[0] <= end)
+    ]
+    if not blocks:
+        return
+
+    with open(segment_path, 'rb') as segment, \
+            mmap.mmap(segment.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        for _, _, offset, length in blocks:
+            for received_at, line in _decode_block(mapped[offset:offset + length]):
+                if (start is None or received_at >= start) and (end is None or received_at <= end):
+                    yield received_at, log_type, line
+
+
+def _decode_block(payload: bytes) -> List[Tuple[float, str]]:
+    return [json.loads(raw) for raw in zlib.decompress(payload).decode('utf-8').split('\n')]
+
+
+def read_block(block: ArchivedBlock) -> List[Tuple[float, str]]:
+    """(received_at, line) records of one archived block."""
+    with open(block.segment_path, 'rb') as segment, \
+            mmap.mmap(segment.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        return _decode_block(mapped[block.offset:block.offset + block.length])
+
+
+class LogArchive:
+    """
+    Optional on-disk archive of streamed log lines, laid out as
+    <directory>/<gateway_id>/<log_type>/<first_ms>.seg (+ .idx).
+    Disabled when no directory is configured.
+
+    append() only queues the line: compression, segment and index writes,
+    listeners and retention all run on the archive's own writer thread, so
+    a slow disk never holds up live log delivery. When `max_pending` lines
+    are waiting, new ones are dropped (and counted) rather than buffered
+    without bound. Retention runs every `retention_interval` seconds and
+    whenever a segment rotates.
+    """
+
+    def __init__(
+        self,
+        directory: str = '',
+        segment_bytes: int = 64 * 1024 * 1024,
+        retention_seconds: float = 7 * 24 * 3600,
+        block_lines: int = 500,
+        block_delay: float = 1.0,
+        retention_interval: float = 3600,
+        max_pending: int = 100000
+    ):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.retention_seconds = retention_seconds
+        self.block_lines = block_lines
+        self.block_delay = block_delay
+        self.retention_interval = retention_interval
+        self._writers: Dict[Tuple[str, int], LogArchiveWriter] = {}
+        self._listeners = []
+        self._archive_lock = threading.Lock()
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self._thread: Optional[threading.Thread] = None
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory)
+
+    def add_listener(self, listener):
+        """
+        `listener.on_block(block, lines)` is called for every written block,
+        `listener.on_segment_removed(segment_path)` when retention deletes one.
+        """
+        self._listeners.append(listener)
+
+    def _on_block(self, block: ArchivedBlock, lines: List[str]):
+        for listener in self._listeners:
+            try:
+                listener.on_block(block, lines)
+            except Exception as e:
+                logger.error(f"Log archive listener failed for {block.segment_path}: {e}")
+
+    def _gateway_dir(self, gateway_id) -> str:
+        return os.path.join(self.directory, str(gateway_id))
+
+    def writer(self, gateway_id, log_type: int) -> LogArchiveWriter:
+        key = (str(gateway_id), log_type)
+        with self._archive_lock:
+            writer = self._writers.get(key)
+            if writer is None:
+                writer = self._writers[key] = LogArchiveWriter(
+                    os.path.join(self._gateway_dir(gateway_id), str(log_type)),
+                    str(gateway_id),
+                    log_type,
+                    segment_bytes=self.segment_bytes,
+                    block_lines=self.block_lines,
+                    block_delay=self.block_delay,
+                    on_rotate=self.enforce_retention,
+                    on_block=self._on_block
+                )
+            return writer
+
+    def append(self, gateway_id, log_type: int, line: str, received_at: Optional[float] = None):
+        if not self.enabled:
+            return
+        self.start()
+        try:
+            self._queue.put_nowait((
+                str(gateway_id), log_type, line,
+                received_at if received_at is not None else time.time()
+            ))
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                logger.warning(f"Log archive is falling behind, {self.dropped} line(s) dropped so far")
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Write everything appended so far; False if it didn't finish in time."""
+        if not self.enabled or self._thread is None:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def start(self):
+        """Start the writer thread; append() does so on first use."""
+        with self._archive_lock:
+            if self._thread is None and self.enabled:
+                self._thread = threading.Thread(target=self._run, daemon=True, name="log_archive_writer")
+                self._thread.start()
+
+    def _run(self):
+        next_retention = time.monotonic()
+        while True:
+            now = time.monotonic()
+            if now >= next_retention:
+                self._safely(self.enforce_retention)
+                next_retention = now + self.retention_interval
+
+            with self._archive_lock:
+                writers = list(self._writers.values())
+            deadlines = [writer.flush_deadline for writer in writers if writer.flush_deadline is not None]
+            try:
+                item = self._queue.get(timeout=max(0.0, min(deadlines + [next_retention]) - now))
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, threading.Event):
+                for writer in writers:
+                    self._safely(writer.flush)
+                item.set()
+            elif item is not None:
+                gateway_id, log_type, line, received_at = item
+                self._safely(self.writer(gateway_id, log_type).append, line, received_at)
+
+            now = time.monotonic()
+            for writer in writers:
+                if writer.flush_deadline is not None and writer.flush_deadline <= now:
+                    self._safely(writer.flush)
+
+    def _safely(self, action, *args):
+        try:
+            action(*args)
+        except Exception as e:
+            logger.error(f"Log archive writer failed: {e}")
+
+    def _segments(self, gateway_id, log_type: int) -> List[str]:
+        directory = os.path.join(self._gateway_dir(gateway_id), str(log_type))
+        if not os.path.isdir(directory):
+            return []
+        return sorted(
+            os.path.join(directory, name) for name in os.listdir(directory)
+            if name.endswith(SEGMENT_SUFFIX)
+        )
+
+    def gateway_ids(self) -> List[str]:
+        if not self.enabled or not os.path.isdir(self.directory):
+            return []
+        return sorted(os.listdir(self.directory))
+
+    def iter_blocks(self) -> Iterator[ArchivedBlock]:
+        """Every block on disk, from the .idx files."""
+        for gateway_id in self.gateway_ids():
+            for log_type in self._log_types(gateway_id):
+                for segment_path in self._segments(gateway_id, log_type):
+                    index_path = segment_path[:-len(SEGMENT_SUFFIX)] + INDEX_SUFFIX
+                    if not os.path.exists(index_path):
+                        continue
+                    for first_ts, last_ts, offset, length in _read_index(index_path):
+                        yield ArchivedBlock(gateway_id, log_type, segment_path, offset, length, first_ts, last_ts)
+
+    def _log_types(self, gateway_id) -> List[int]:
+        directory = self._gateway_dir(gateway_id)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(int(name) for name in os.listdir(directory) if name.isdigit())
+
+    def _read_log_type(self, gateway_id, log_type: int, start, end) -> Iterator[ArchivedLine]:
+        segments = self._segments(gateway_id, log_type)
+        for i, segment_path in enumerate(segments):
+            # a segment holds lines from its own start up to the next segment's start
+            if end is not None and _segment_start(segment_path) > end:
+                break
+            if start is not None and i + 1 < len(segments) and _segment_start(segments[i + 1]) < start:
+                continue
+            yield from _read_segment(segment_path, log_type, start, end)
+
+    def read(
+        self,
+        gateway_id,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        first: int = 1000,
+        log_type: Optional[int] = None
+    ) -> List[ArchivedLine]:
+        if not self.enabled:
+            return []
+        # a server that only serves reads still needs its retention sweeps
+        self.start()
+        log_types = [log_type] if log_type is not None else self._log_types(gateway_id)
+        lines = heapq.merge(
+            *(self._read_log_type(gateway_id, lt, start, end) for lt in log_types),
+            key=lambda archived: archived[0]
+        )
+        return list(islice(lines, first))
+
+    def enforce_retention(self, now: Optional[float] = None) -> int:
+        if not self.enabled or not os.path.isdir(self.directory):
+            return 0
+        cutoff = (now if now is not None else time.time()) - self.retention_seconds
+        with self._archive_lock:
+            active = {writer.segment_path for writer in self._writers.values()}
+
+        removed = 0
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if not name.endswith(SEGMENT_SUFFIX):
+                    continue
+                segment_path = os.path.join(root, name)
+                index_path = segment_path[:-len(SEGMENT_SUFFIX)] + INDEX_SUFFIX
+                if segment_path in active or not os.path.exists(index_path):
+                    continue
+                blocks = _read_index(index_path)
+                if blocks and max(block[1] for block in blocks) < cutoff:
+                    os.remove(segment_path)
+                    os.remove(index_path)
+                    removed += 1
+                    for listener in self._listeners:
+                        listener.on_segment_removed(segment_path)
+
+        if removed:
+            logger.info(f"Removed {removed} expired log archive segment(s)")
+        return removed
+
+
+def _segment_start(segment_path: str) -> float:
+    return int(os.path.basename(segment_path)[:-len(SEGMENT_SUFFIX)]) / 1000
+
+
+# Singleton: disabled unless LOG_ARCHIVE_DIR is set
+log_archive = LogArchive(
+    directory=get_setting('LOG_ARCHIVE_DIR', ''),
+    segment_bytes=get_setting('LOG_ARCHIVE_SEGMENT_MB', 64) * 1024 * 1024,
+    retention_seconds=get_setting('LOG_ARCHIVE_RETENTION_DAYS', 7) * 24 * 3600,
+    block_lines=get_setting('LOG_ARCHIVE_BLOCK_LINES', 500),
+    retention_interval=get_setting('LOG_ARCHIVE_RETENTION_CHECK_INTERVAL', 3600)
+)
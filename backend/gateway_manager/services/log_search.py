@@ -0,0 +1,302 @@
+import logging
+import os
+import re
+import threading
+from array import array
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from .conf import get_setting
+from .log_archive import ArchivedBlock, LogArchive, log_archive, read_block
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r'[0-9a-z_]{2,64}')
+WORD_PATTERN = re.compile(r'[0-9a-z_]+')
+MIN_TOKEN, MAX_TOKEN = 2, 64
+GRAM = 3  # partial words are looked up by the trigrams of the terms they can be part of
+
+
+def tokenize(text: str) -> Set[str]:
+    return set(TOKEN_PATTERN.findall(text.lower()))
+
+
+def trigrams(word: str) -> Set[str]:
+    return {word[i:i + GRAM] for i in range(len(word) - GRAM + 1)}
+
+
+def query_terms(query: str) -> List[Tuple[str, Optional[Callable[[str], bool]]]]:
+    """
+    What the query's words say about the indexed terms of a matching line,
+    as (word, term predicate) pairs. Only a word with separators on both
+    sides inside the query is a whole term of the line; the first word may
+    be the end of a longer one, the last its start, and a query without
+    separators can sit anywhere inside one. Words no index term can vouch
+    for (shorter than 2 or longer than 64 characters) are left out, and so
+    are partial words too short to have a trigram to look them up by.
+    """
+    query = query.lower()
+    terms = []
+    for match in WORD_PATTERN.finditer(query):
+        word = match.group()
+        if not MIN_TOKEN <= len(word) <= MAX_TOKEN:
+            continue
+        open_start = match.start() == 0
+        open_end = match.end() == len(query)
+        if (open_start or open_end) and len(word) < GRAM:
+            continue
+        if open_start and open_end:
+            terms.append((word, lambda term, word=word: word in term))
+        elif open_start:
+            terms.append((word, lambda term, word=word: term.endswith(word)))
+        elif open_end:
+            terms.append((word, lambda term, word=word: term.startswith(word)))
+        else:
+            terms.append((word, None))
+    return terms
+
+
+class LogSearchHit(NamedTuple):
+    gateway_id: str
+    log_type: int
+    received_at: float
+    line: str
+
+
+class LogSearchIndex:
+    """
+    In-memory inverted index over archived log blocks: every term maps to
+    the ids of the blocks containing it (ascending, as blocks are added).
+    Queries narrow the blocks down with the postings of their words (see
+    query_terms), then only the candidate blocks are decompressed to
+    confirm and extract the lines containing the query. Partial words find
+    their terms through a trigram index of the term dictionary. A query
+    the index can't narrow down at all reads at most `max_scan_blocks`
+    blocks, newest first.
+
+    Blocks written by this process are indexed as they are written. A
+    background thread indexes the rest of the archive and re-reads the
+    on-disk .idx files every `refresh_interval` seconds, picking up blocks
+    written, and segments removed, by other processes.
+    """
+
+    def __init__(self, archive: LogArchive, refresh_interval: float = 30, max_scan_blocks: int = 200):
+        self.archive = archive
+        self.refresh_interval = refresh_interval
+        self.max_scan_blocks = max_scan_blocks
+        self._blocks: List[Optional[ArchivedBlock]] = []
+        self._block_ids: Dict[Tuple[str, int], int] = {}  # (segment_path, offset) -> block id
+        self._postings: Dict[str, array] = {}
+        self._trigrams: Dict[str, Set[str]] = {}  # trigram -> indexed terms containing it
+        self._dead_blocks = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._index_lock = threading.RLock()
+        archive.add_listener(self)
+
+    def __len__(self) -> int:
+        with self._index_lock:
+            return len(self._blocks) - self._dead_blocks
+
+    # archive listener
+    def on_block(self, block: ArchivedBlock, lines: Iterable[str]):
+        terms: Set[str] = set()
+        for line in lines:
+            terms.update(TOKEN_PATTERN.findall(line.lower()))
+
+        with self._index_lock:
+            key = (block.segment_path, block.offset)
+            if key in self._block_ids:
+                return
+            block_id = len(self._blocks)
+            self._blocks.append(block)
+            self._block_ids[key] = block_id
+            for term in terms:
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = array('I')
+                    self._add_trigrams_locked(term)
+                postings.append(block_id)
+
+    def _add_trigrams_locked(self, term: str):
+        for gram in trigrams(term):
+            terms = self._trigrams.get(gram)
+            if terms is None:
+                terms = self._trigrams[gram] = set()
+            terms.add(term)
+
+    def on_segment_removed(self, segment_path: str):
+        with self._index_lock:
+            for block_id, block in enumerate(self._blocks):
+                if block is not None and block.segment_path == segment_path:
+                    self._blocks[block_id] = None
+                    del self._block_ids[(block.segment_path, block.offset)]
+                    self._dead_blocks += 1
+            if self._dead_blocks > len(self._blocks) // 2:
+                self._compact()
+
+    def _compact(self):
+        # renumber the live blocks and drop postings of removed ones
+        new_ids = {}
+        blocks = []
+        for block_id, block in enumerate(self._blocks):
+            if block is not None:
+                new_ids[block_id] = len(blocks)
+                blocks.append(block)
+
+        postings = {}
+        for term, block_ids in self._postings.items():
+            remaining = array('I', (new_ids[block_id] for block_id in block_ids if block_id in new_ids))
+            if remaining:
+                postings[term] = remaining
+
+        self._blocks = blocks
+        self._block_ids = {(block.segment_path, block.offset): i for i, block in enumerate(blocks)}
+        self._postings = postings
+        self._trigrams = {}
+        for term in postings:
+            self._add_trigrams_locked(term)
+        self._dead_blocks = 0
+
+    def start(self):
+        """Start indexing the archive in the background; search() does so on first use."""
+        with self._index_lock:
+            if self._thread is None and self.archive.enabled:
+                self._thread = threading.Thread(target=self._run, daemon=True, name="index_log_archive")
+                self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Error indexing the log archive: {e}")
+            if self._stop_event.wait(self.refresh_interval):
+                break
+
+    def refresh(self) -> int:
+        """Index the blocks on disk that aren't indexed yet and forget removed segments."""
+        segment_paths = set()
+        indexed = 0
+        for block in self.archive.iter_blocks():
+            segment_paths.add(block.segment_path)
+            with self._index_lock:
+                if (block.segment_path, block.offset) in self._block_ids:
+                    continue
+            try:
+                self.on_block(block, [line for _, line in read_block(block)])
+                indexed += 1
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not index log block {block.segment_path}@{block.offset}: {e}")
+
+        with self._index_lock:
+            gone = {
+                block.segment_path for block in self._blocks
+                if block is not None and block.segment_path not in segment_paths
+            }
+        for segment_path in gone:
+            if not os.path.exists(segment_path):
+                self.on_segment_removed(segment_path)
+
+        if indexed:
+            logger.info(f"Indexed {indexed} archived log block(s)")
+        return indexed
+
+    def _candidate_blocks(
+        self,
+        terms: List[Tuple[str, Optional[Callable[[str], bool]]]],
+        gateway_ids: Optional[Set[str]],
+        start: Optional[float],
+        end: Optional[float]
+    ) -> List[ArchivedBlock]:
+        with self._index_lock:
+            block_ids = None
+            for word, matches in terms:
+                if matches is None:
+                    candidates = set(self._postings.get(word, ()))
+                else:
+                    # a partial word: every indexed term it could be part of
+                    candidates = set()
+                    for term in self._terms_containing_locked(word):
+                        if matches(term):
+                            candidates.update(self._postings[term])
+                block_ids = candidates if block_ids is None else block_ids & candidates
+                if not block_ids:
+                    return []
+
+            if block_ids is None:
+                # nothing in the query narrows it down: scan every block
+                blocks = list(self._blocks)
+            else:
+                blocks = [self._blocks[block_id] for block_id in block_ids]
+
+        return [
+            block for block in blocks
+            if block is not None
+            and (gateway_ids is None or block.gateway_id in gateway_ids)
+            and (start is None or block.last_ts >= start)
+            and (end is None or block.first_ts <= end)
+        ]
+
+    def _terms_containing_locked(self, word: str) -> Set[str]:
+        # the terms having all of the word's trigrams, smallest set first
+        sets = sorted((self._trigrams.get(gram, set()) for gram in trigrams(word)), key=len)
+        return sets[0].intersection(*sets[1:])
+
+    def search(
+        self,
+        query: str,
+        gateway_ids: Optional[Iterable] = None,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        first: int = 100,
+        offset: int = 0
+    ) -> Tuple[List[LogSearchHit], bool]:
+        """
+        Lines containing `query` (case insensitive), newest blocks first.
+        Returns one page of hits and whether more hits follow it. Without a
+        word the index can look up, only the newest `max_scan_blocks` blocks
+        in the gateway and time scope are searched.
+        """
+        if not query or not self.archive.enabled:
+            return [], False
+        self.start()
+        terms = query_terms(query)
+
+        needle = query.lower()
+        wanted = None if gateway_ids is None else {str(gateway_id) for gateway_id in gateway_ids}
+        blocks = self._candidate_blocks(terms, wanted, start, end)
+        blocks.sort(key=lambda block: block.last_ts, reverse=True)
+        if not terms and len(blocks) > self.max_scan_blocks:
+            # a full scan would decompress the whole archive on the request's thread
+            logger.info(f"Log search for {query!r} limited to the newest {self.max_scan_blocks} of {len(blocks)} blocks")
+            blocks = blocks[:self.max_scan_blocks]
+
+        hits: List[LogSearchHit] = []
+        limit = offset + first + 1
+        for block in blocks:
+            try:
+                records = read_block(block)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not read log block {block.segment_path}@{block.offset}: {e}")
+                continue
+            for received_at, line in reversed(records):
+                if needle not in line.lower():
+                    continue
+                if (start is not None and received_at < start) or (end is not None and received_at > end):
+                    continue
+                hits.append(LogSearchHit(block.gateway_id, block.log_type, received_at, line))
+            if len(hits) >= limit:
+                break
+
+        return hits[offset:offset + first], len(hits) > offset + first
+
+
+# Singleton: fed by log_archive as blocks are written, and from disk in the background
+log_search_index = LogSearchIndex(
+    log_archive,
+    refresh_interval=get_setting('LOG_SEARCH_REFRESH_INTERVAL', 30),
+    max_scan_blocks=get_setting('LOG_SEARCH_MAX_SCAN_BLOCKS', 200)
+)
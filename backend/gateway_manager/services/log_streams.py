@@ -0,0 +1,457 @@
+import logging
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from ..constants import LogType
+from ..utils.log_parser import LogLineParser
+from .conf import get_setting
+from .grpc_client import grpc_manager
+from .log_archive import LogArchive, log_archive
+
+logger = logging.getLogger(__name__)
+
+StreamKey = Tuple[str, int, str]  # (gateway_id, log_type, traffic_log_index)
+LogEntry = Dict[str, Any]  # parsed line plus the raw 'line', its 'seq' and the stream 'epoch'
+LogSink = Callable[[LogEntry], None]
+ResumeState = Tuple[str, int, Sequence[LogEntry]]  # (epoch, last seq, backlog)
+
+
+class LogRateLimiter:
+    """
+    Per-subscriber limit on delivered lines: keep 1 in `sample_every` lines,
+    then a token bucket of `max_per_second` (0 = unlimited) refilled
+    continuously. Dropped lines are counted so they can be reported.
+    """
+
+    def __init__(
+        self,
+        max_per_second: float = 0,
+        burst: Optional[float] = None,
+        sample_every: int = 1,
+        report_interval: float = 1.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_per_second = max_per_second
+        self.burst = burst if burst is not None else max(max_per_second, 1)
+        self.sample_every = max(sample_every, 1)
+        self.report_interval = report_interval
+        self.clock = clock
+        self.dropped = 0
+        self.total_dropped = 0
+        self._tokens = self.burst
+        self._refilled_at = clock()
+        self._seen = 0
+        self._reported_at = 0.0
+        self._report_pending = False
+        self._limiter_lock = threading.Lock()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.max_per_second <= 0 and self.sample_every == 1
+
+    def allow(self) -> bool:
+        with self._limiter_lock:
+            self._seen += 1
+            if self._seen % self.sample_every != 0:
+                return self._drop_locked()
+
+            if self.max_per_second > 0:
+                now = self.clock()
+                self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.max_per_second)
+                self._refilled_at = now
+                if self._tokens < 1:
+                    return self._drop_locked()
+                self._tokens -= 1
+            return True
+
+    def _drop_locked(self) -> bool:
+        self.dropped += 1
+        self.total_dropped += 1
+        return False
+
+    def report_due(self) -> bool:
+        # at most one report in flight and one per report_interval
+        with self._limiter_lock:
+            if not self.dropped or self._report_pending:
+                return False
+            if self.clock() - self._reported_at < self.report_interval:
+                return False
+            self._report_pending = True
+            return True
+
+    def take_dropped(self) -> int:
+        with self._limiter_lock:
+            dropped, self.dropped = self.dropped, 0
+            self._report_pending = False
+            self._reported_at = self.clock()
+            return dropped
+
+
+class ReplayFilter:
+    """
+    Drops the lines a reconnected ReadLiveLogs stream replays. The agent
+    resends its last N lines, so the new stream starts with some suffix of
+    the lines already seen; incoming lines are held while they still line
+    up with such a suffix, and the longest full overlap is discarded.
+    """
+
+    def __init__(self, seen: Sequence[str]):
+        self.seen = list(seen)
+        self.done = not self.seen
+        self._candidates: Optional[List[int]] = None
+        self._held: List[str] = []
+        self._overlap = 0
+
+    def feed(self, line: str) -> List[str]:
+        if self.done:
+            return [line]
+
+        k = len(self._held)
+        if self._candidates is None:
+            candidates = [i for i, seen in enumerate(self.seen) if seen == line]
+        else:
+            candidates = [i for i in self._candidates if i + k < len(self.seen) and self.seen[i + k] == line]
+
+        if not candidates:
+            return self._finish([line])
+
+        self._held.append(line)
+        self._candidates = []
+        for i in candidates:
+            if i + k + 1 == len(self.seen):
+                # this alignment reached the end of what was seen: all held lines are replays
+                self._overlap = len(self._held)
+            else:
+                self._candidates.append(i)
+
+        if not self._candidates:
+            return self._finish([])
+        return []
+
+    def _finish(self, extra: List[str]) -> List[str]:
+        self.done = True
+        fresh = self._held[self._overlap:] + extra
+        self._held = []
+        return fresh
+
+
+class LiveLogUpstream:
+    """
+    A single ReadLiveLogs stream whose lines are parsed once and fanned out
+    to every subscriber. Each line gets a sequence number, recent lines are
+    kept so late joiners get a backlog, and a dropped stream is reopened
+    with backoff, skipping the lines the agent replays.
+
+    Sequence numbers are only comparable within one epoch: numbering that
+    starts from scratch (no resume state) starts a new epoch. A subscriber
+    resuming from a seq the backlog can't continue gets a `restarted`
+    entry, then the last lines like a new subscriber.
+    """
+
+    def __init__(
+        self,
+        key: StreamKey,
+        gateway_address: str,
+        gateway_port: int,
+        line_count: int,
+        on_finished: Callable[['LiveLogUpstream'], None],
+        archive: Optional[LogArchive] = None,
+        resume_from: Optional[ResumeState] = None,
+        reconnect_delay: float = 1.0,
+        max_reconnect_delay: float = 30.0,
+        resume_lines: int = 100,
+        backlog_lines: int = 1000
+    ):
+        self.key = key
+        self.gateway_address = gateway_address
+        self.gateway_port = gateway_port
+        # the first ReadLiveLogs call can't ask for more than the backlog keeps
+        self.line_count = min(line_count, backlog_lines)
+        self.on_finished = on_finished
+        self.archive = archive
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.resume_lines = resume_lines
+        # per instance: a torn down stream's cleanup must not close its successor's channel
+        self.stream_id = "logs_{}_{}_{}_{}".format(*key, uuid.uuid4().hex[:8])
+        self.subscribers: Dict[Hashable, LogSink] = {}
+        # shared by every subscriber whatever its line_count, so sized by the cap
+        self.backlog = deque(maxlen=max(backlog_lines, 1))
+        self.parser = LogLineParser(key[1])
+        self.epoch = uuid.uuid4().hex[:12]
+        self.last_seq = 0
+        self.reconnects = 0
+        if resume_from is not None:
+            # continue where a previous stream of the same key stopped
+            self.epoch, self.last_seq, entries = resume_from
+            self.backlog.extend(entries)
+        self._fanout_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run,
+            daemon=True,
+            name=f"logs_{self.stream_id}"
+        )
+
+    def start(self):
+        self._thread.start()
+        logger.info(f"Started shared log stream {self.stream_id}")
+
+    def stop(self):
+        self._stop_event.set()
+        # closing the dedicated channel ends the blocking ReadLiveLogs iteration
+        grpc_manager.stop_live_logs_stream(self.gateway_address, self.gateway_port, self.stream_id)
+        logger.info(f"Stopping shared log stream {self.stream_id}")
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop_event.is_set()
+
+    def add_subscriber(
+        self,
+        subscriber: Hashable,
+        sink: LogSink,
+        after_seq: Optional[int] = None,
+        line_count: Optional[int] = None,
+        epoch: Optional[str] = None
+    ):
+        with self._fanout_lock:
+            if after_seq is not None and not self._can_resume_locked(after_seq, epoch):
+                self._deliver(subscriber, sink, {
+                    'restarted': True,
+                    'epoch': self.epoch,
+                    'seq': self.last_seq,
+                    'after_seq': after_seq
+                })
+                after_seq = None
+
+            if after_seq is not None:
+                entries = [entry for entry in self.backlog if entry['seq'] > after_seq]
+            else:
+                count = self.line_count if line_count is None else line_count
+                entries = list(self.backlog)[-count:] if count > 0 else []
+            for entry in entries:
+                self._deliver(subscriber, sink, entry)
+            self.subscribers[subscriber] = sink
+
+    def _can_resume_locked(self, after_seq: int, epoch: Optional[str]) -> bool:
+        if epoch is not None and epoch != self.epoch:
+            return False
+        if after_seq > self.last_seq:
+            # numbered by a stream that is gone
+            return False
+        # the line right after after_seq must still be in the backlog
+        oldest = self.backlog[0]['seq'] if self.backlog else self.last_seq + 1
+        return oldest <= after_seq + 1
+
+    def remove_subscriber(self, subscriber: Hashable) -> int:
+        with self._fanout_lock:
+            self.subscribers.pop(subscriber, None)
+            return len(self.subscribers)
+
+    def resume_state(self) -> ResumeState:
+        with self._fanout_lock:
+            return self.epoch, self.last_seq, tuple(self.backlog)
+
+    def publish(self, line: str):
+        entry = self.parser.parse(line)
+        entry['line'] = line
+        if self.archive is not None:
+            self.archive.append(self.key[0], self.key[1], line)
+        with self._fanout_lock:
+            self.last_seq += 1
+            entry['seq'] = self.last_seq
+            entry['epoch'] = self.epoch
+            self.backlog.append(entry)
+            for subscriber, sink in list(self.subscribers.items()):
+                self._deliver(subscriber, sink, entry)
+
+    def _deliver(self, subscriber: Hashable, sink: LogSink, entry: LogEntry):
+        try:
+            sink(entry)
+        except Exception as e:
+            logger.error(f"Error delivering log line to {subscriber}: {e}")
+
+    def _run(self):
+        attempt = 0
+        try:
+            while not self.stopped:
+                if self._stream_once():
+                    attempt = 0
+                if self.stopped:
+                    break
+
+                attempt += 1
+                self.reconnects += 1
+                delay = min(self.max_reconnect_delay, self.reconnect_delay * 2 ** (attempt - 1))
+                delay *= random.uniform(0.8, 1.2)
+                logger.warning(f"Log stream {self.stream_id} dropped, reconnecting in {delay:.1f}s (attempt {attempt})")
+                if self._stop_event.wait(delay):
+                    break
+
+        finally:
+            self.on_finished(self)
+            logger.info(f"Shared log stream {self.stream_id} finished")
+
+    def _stream_once(self) -> bool:
+        """One ReadLiveLogs call; True if it delivered at least one new line."""
+        gateway_id, log_type, traffic_log_index = self.key
+        with self._fanout_lock:
+            seen = [entry['line'] for entry in self.backlog]
+        # when resuming only ask for the overlap needed to find where we left off
+        line_count = min(self.resume_lines, len(seen)) if seen else self.line_count
+        replay_filter = ReplayFilter(seen[-line_count:] if seen else ())
+        delivered = False
+
+        try:
+            # open the stream channel up front so stop() can always close it
+            client = grpc_manager.get_client(self.gateway_address, self.gateway_port)
+            if client.create_streaming_connection(self.stream_id) is None:
+                raise ConnectionError(f"Could not connect to {client.connection_string}")
+            if self.stopped:
+                return False
+
+            log_generator = grpc_manager.iter_live_logs_stream(
+                self.gateway_address,
+                self.gateway_port,
+                self.stream_id,
+                log_type,
+                traffic_log_index,
+                line_count
+            )
+
+            for log_line in log_generator:
+                if self.stopped:
+                    break
+                for fresh_line in replay_filter.feed(log_line):
+                    self.publish(fresh_line)
+                    delivered = True
+
+        except Exception as e:
+            if not self.stopped:
+                logger.error(f"Error in shared log stream {self.stream_id}: {e}")
+
+        finally:
+            grpc_manager.stop_live_logs_stream(self.gateway_address, self.gateway_port, self.stream_id)
+
+        return delivered
+
+
+class LiveLogMultiplexer:
+    """
+    Keeps one upstream ReadLiveLogs stream per (gateway, log_type,
+    traffic_log_index) and tears it down when its last subscriber leaves.
+    """
+
+    def __init__(
+        self,
+        archive: Optional[LogArchive] = None,
+        reconnect_delay: float = 1.0,
+        max_reconnect_delay: float = 30.0,
+        resume_lines: int = 100,
+        backlog_lines: int = 1000,
+        max_resume_states: int = 256
+    ):
+        self.archive = archive
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.resume_lines = resume_lines
+        self.backlog_lines = backlog_lines
+        self.max_resume_states = max_resume_states
+        self._upstreams: Dict[StreamKey, LiveLogUpstream] = {}
+        # epoch, sequence and last lines of streams that were torn down, so a
+        # new stream of the same key keeps numbering and skips what was sent
+        self._resume_states: Dict[StreamKey, ResumeState] = OrderedDict()
+        self._multiplexer_lock = threading.Lock()
+
+    def subscribe(
+        self,
+        gateway,
+        subscriber: Hashable,
+        sink: LogSink,
+        log_type: int = LogType.GATEWAY_AGENT,
+        traffic_log_index: str = "",
+        line_count: int = 100,
+        after_seq: Optional[int] = None,
+        epoch: Optional[str] = None
+    ) -> StreamKey:
+        key = (str(gateway.id), log_type, traffic_log_index or "")
+
+        with self._multiplexer_lock:
+            upstream = self._upstreams.get(key)
+            if upstream is None or upstream.stopped:
+                upstream = LiveLogUpstream(
+                    key=key,
+                    gateway_address=gateway.address,
+                    gateway_port=gateway.port,
+                    line_count=line_count,
+                    on_finished=self._on_finished,
+                    archive=self.archive,
+                    resume_from=self._resume_states.pop(key, None),
+                    reconnect_delay=self.reconnect_delay,
+                    max_reconnect_delay=self.max_reconnect_delay,
+                    resume_lines=self.resume_lines,
+                    backlog_lines=self.backlog_lines
+                )
+                self._upstreams[key] = upstream
+                upstream.add_subscriber(subscriber, sink, after_seq, line_count, epoch)
+                upstream.start()
+            else:
+                upstream.add_subscriber(subscriber, sink, after_seq, line_count, epoch)
+
+            logger.info(f"Log stream {upstream.stream_id} now has {len(upstream.subscribers)} subscriber(s)")
+        return key
+
+    def unsubscribe(self, key: StreamKey, subscriber: Hashable):
+        with self._multiplexer_lock:
+            upstream = self._upstreams.get(key)
+            if upstream is None:
+                return
+            if upstream.remove_subscriber(subscriber) == 0:
+                del self._upstreams[key]
+                self._remember_locked(upstream)
+            else:
+                upstream = None
+
+        if upstream is not None:
+            upstream.stop()
+
+    def _on_finished(self, upstream: LiveLogUpstream):
+        # the stream gave up: the next subscriber opens a fresh one
+        with self._multiplexer_lock:
+            if self._upstreams.get(upstream.key) is upstream:
+                del self._upstreams[upstream.key]
+                self._remember_locked(upstream)
+
+    def _remember_locked(self, upstream: LiveLogUpstream):
+        if not upstream.last_seq:
+            return
+        self._resume_states[upstream.key] = upstream.resume_state()
+        self._resume_states.move_to_end(upstream.key)
+        while len(self._resume_states) > self.max_resume_states:
+            self._resume_states.popitem(last=False)
+
+    def get_upstream(self, key: StreamKey) -> Optional[LiveLogUpstream]:
+        with self._multiplexer_lock:
+            return self._upstreams.get(key)
+
+    def stop_all(self):
+        with self._multiplexer_lock:
+            upstreams = list(self._upstreams.values())
+            self._upstreams.clear()
+        for upstream in upstreams:
+            upstream.stop()
+
+
+# Singleton: streamed lines are also archived when LOG_ARCHIVE_DIR is set
+log_multiplexer = LiveLogMultiplexer(
+    archive=log_archive if log_archive.enabled else None,
+    reconnect_delay=get_setting('LIVE_LOGS_RECONNECT_DELAY', 1.0),
+    max_reconnect_delay=get_setting('LIVE_LOGS_MAX_RECONNECT_DELAY', 30.0),
+    resume_lines=get_setting('LIVE_LOGS_RESUME_LINES', 100),
+    backlog_lines=get_setting('LIVE_LOGS_BACKLOG_LINES', 1000)
+)
@@ -0,0 +1,124 @@
+import logging
+import math
+import threading
+from array import array
+from typing import Any, Dict, List, Optional
+
+from ..utils.parsers import parse_cpu_usage, parse_memory_usage
+from .conf import get_setting
+
+logger = logging.getLogger(__name__)
+
+NAN = float('nan')
+
+
+class MetricsRingBuffer:
+    """
+    Fixed-size history of (timestamp, cpu %, memory %) samples stored in
+    flat float arrays; missing values are kept as NaN. Timestamps only go
+    forward: a sample no newer than the last one (the same cached snapshot
+    seen twice) is ignored.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.timestamps = array('d', [0.0]) * capacity
+        self.cpu = array('d', [NAN]) * capacity
+        self.memory = array('d', [NAN]) * capacity
+        self._next = 0
+        self._size = 0
+        self._buffer_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, timestamp: float, cpu: Optional[float], memory: Optional[float]) -> bool:
+        with self._buffer_lock:
+            if self._size and timestamp <= self.timestamps[(self._next - 1) % self.capacity]:
+                return False
+            i = self._next
+            self.timestamps[i] = timestamp
+            self.cpu[i] = NAN if cpu is None else cpu
+            self.memory[i] = NAN if memory is None else memory
+            self._next = (i + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+            return True
+
+    def samples(self, since: Optional[float] = None) -> List[tuple]:
+        with self._buffer_lock:
+            start = (self._next - self._size) % self.capacity
+            indexes = [(start + k) % self.capacity for k in range(self._size)]
+            rows = [(self.timestamps[i], self.cpu[i], self.memory[i]) for i in indexes]
+
+        if since is not None:
+            rows = [row for row in rows if row[0] >= since]
+        return rows
+
+    def downsample(self, since: Optional[float] = None, step: Optional[float] = None) -> Dict[str, List]:
+        rows = self.samples(since)
+
+        if step and step > 0:
+            buckets: Dict[float, List[tuple]] = {}
+            for row in rows:
+                buckets.setdefault(math.floor(row[0] / step) * step, []).append(row)
+            rows = [
+                (bucket, _mean(r[1] for r in bucket_rows), _mean(r[2] for r in bucket_rows))
+                for bucket, bucket_rows in buckets.items()
+            ]
+
+        return {
+            'timestamps': [row[0] for row in rows],
+            'cpu_usage': [_or_none(row[1]) for row in rows],
+            'memory_usage': [_or_none(row[2]) for row in rows],
+        }
+
+
+def _mean(values) -> float:
+    values = [v for v in values if not math.isnan(v)]
+    return sum(values) / len(values) if values else NAN
+
+
+def _or_none(value: float) -> Optional[float]:
+    return None if math.isnan(value) else round(value, 2)
+
+
+class MetricsHistoryStore:
+    """Recent parsed system info samples per gateway, filled by the pollers only."""
+
+    def __init__(self, capacity: int = 720):
+        self.capacity = capacity
+        self._buffers: Dict[str, MetricsRingBuffer] = {}
+        self._store_lock = threading.Lock()
+
+    def get_buffer(self, gateway_id) -> Optional[MetricsRingBuffer]:
+        with self._store_lock:
+            return self._buffers.get(str(gateway_id))
+
+    def record(self, gateway_id, system_info: Dict[str, Any]) -> bool:
+        gateway_id = str(gateway_id)
+        with self._store_lock:
+            buffer = self._buffers.get(gateway_id)
+            if buffer is None:
+                buffer = self._buffers[gateway_id] = MetricsRingBuffer(self.capacity)
+
+        return buffer.append(
+            system_info.get('timestamp'),
+            parse_cpu_usage(system_info.get('cpu_usage')),
+            parse_memory_usage(system_info.get('memory_usage'))
+        )
+
+    def history(self, gateway_id, since: Optional[float] = None, step: Optional[float] = None) -> Dict[str, List]:
+        buffer = self.get_buffer(gateway_id)
+        if buffer is None:
+            return {'timestamps': [], 'cpu_usage': [], 'memory_usage': []}
+        return buffer.downsample(since, step)
+
+    def discard(self, gateway_id):
+        with self._store_lock:
+            self._buffers.pop(str(gateway_id), None)
+
+
+# Singleton: sized in samples, so the time covered follows the (adaptive) poll interval
+metrics_history = MetricsHistoryStore(
+    capacity=get_setting('GATEWAY_METRICS_HISTORY_SIZE', 720)
+)
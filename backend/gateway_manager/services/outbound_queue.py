@@ -0,0 +1,136 @@
+import asyncio
+from collections import OrderedDict, deque
+from itertools import count
+from typing import Any, Deque, Dict, Hashable, List, NamedTuple, Optional
+
+# how a pending message may be thinned out when the socket can't keep up
+CONTROL = 'control'          # acks, pongs, errors, completes: never dropped
+LATEST = 'latest'            # only the newest unsent message per key is kept
+DROP_OLDEST = 'drop_oldest'  # the oldest go first once max_pending are waiting
+IN_ORDER = 'in_order'        # never dropped; the producer waits for its previous one (see wait_sent)
+
+
+class OutboundItem(NamedTuple):
+    message: Dict[str, Any]
+    policy: str
+    key: Optional[Hashable]
+    dropped: int  # weight of the DROP_OLDEST messages of this key dropped before this one
+
+
+class OutboundQueue:
+    """
+    Messages waiting to be written to one socket, in the order they were
+    queued. A LATEST message replaces the unsent one with the same key in
+    place; DROP_OLDEST messages are capped at `max_pending` and make room by
+    dropping their oldest, counted per key. IN_ORDER messages can't be
+    merged or dropped (deltas), so their producer awaits wait_sent() before
+    queueing the next one. Memory stays bounded by max_pending plus one
+    message per LATEST or IN_ORDER key, however slow the client.
+    Only used from the socket's event loop.
+    """
+
+    def __init__(self, max_pending: int = 256):
+        self.max_pending = max_pending
+        self._entries: "OrderedDict[int, list]" = OrderedDict()  # entry id -> [message, policy, key, weight]
+        self._latest: Dict[Hashable, int] = {}
+        self._droppable: Deque[int] = deque()
+        self._dropped: Dict[Hashable, int] = {}
+        self._in_order: Dict[Hashable, int] = {}  # key -> pending IN_ORDER messages
+        self._sent_waiters: Dict[Hashable, List[asyncio.Future]] = {}
+        self._ids = count()
+        self._ready = asyncio.Event()
+
+        self.replaced = 0
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def put(self, message: Dict[str, Any], policy: str = CONTROL, key: Optional[Hashable] = None, weight: int = 1):
+        if policy == LATEST:
+            entry_id = self._latest.get(key)
+            if entry_id is not None:
+                self._entries[entry_id][0] = message
+                self.replaced += 1
+                return
+            entry_id = self._latest[key] = next(self._ids)
+        else:
+            entry_id = next(self._ids)
+            if policy == DROP_OLDEST:
+                while len(self._droppable) >= max(self.max_pending, 1):
+                    self._drop_oldest()
+                self._droppable.append(entry_id)
+            elif policy == IN_ORDER:
+                self._in_order[key] = self._in_order.get(key, 0) + 1
+
+        self._entries[entry_id] = [message, policy, key, weight]
+        self._ready.set()
+
+    def _drop_oldest(self):
+        _, _, key, weight = self._entries.pop(self._droppable.popleft())
+        self._dropped[key] = self._dropped.get(key, 0) + weight
+        self.dropped += 1
+
+    def _pop(self) -> OutboundItem:
+        entry_id, (message, policy, key, _) = self._entries.popitem(last=False)
+        dropped = 0
+        if policy == LATEST:
+            del self._latest[key]
+        elif policy == DROP_OLDEST:
+            # both are in queue order, so it is the oldest droppable one
+            self._droppable.popleft()
+            dropped = self._dropped.pop(key, 0)
+        elif policy == IN_ORDER:
+            self._taken_in_order(key)
+        return OutboundItem(message, policy, key, dropped)
+
+    def _taken_in_order(self, key: Hashable):
+        self._in_order[key] -= 1
+        if self._in_order[key] <= 0:
+            del self._in_order[key]
+            for waiter in self._sent_waiters.pop(key, []):
+                if not waiter.done():
+                    waiter.set_result(None)
+
+    async def wait_sent(self, key: Hashable):
+        """Wait until no IN_ORDER message of `key` is pending."""
+        while key in self._in_order:
+            waiter = asyncio.get_running_loop().create_future()
+            self._sent_waiters.setdefault(key, []).append(waiter)
+            await waiter
+
+    async def get(self) -> OutboundItem:
+        while not self._entries:
+            self._ready.clear()
+            await self._ready.wait()
+        return self._pop()
+
+    def pop_all(self) -> List[OutboundItem]:
+        """Everything pending right now, without waiting."""
+        items = []
+        while self._entries:
+            items.append(self._pop())
+        return items
+
+    def discard(self, key: Hashable) -> int:
+        """Drop every pending message of `key` except control ones."""
+        entry_ids = [
+            entry_id for entry_id, entry in self._entries.items()
+            if entry[1] != CONTROL and entry[2] == key
+        ]
+        for entry_id in entry_ids:
+            policy = self._entries.pop(entry_id)[1]
+            if policy == DROP_OLDEST:
+                self._droppable.remove(entry_id)
+            elif policy == IN_ORDER:
+                self._taken_in_order(key)
+        self._latest.pop(key, None)
+        self._dropped.pop(key, None)
+        return len(entry_ids)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'pending': len(self._entries),
+            'replaced': self.replaced,
+            'dropped': self.dropped,
+        }
@@ -0,0 +1,286 @@
+import logging
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, List, NamedTuple, Optional
+
+from .grpc_client import grpc_manager
+
+logger = logging.getLogger(__name__)
+
+
+def fetch_system_info(gateway_address: str, gateway_port: int) -> Dict[str, Any]:
+    # past the cache: its TTL is longer than the shortest poll interval
+    return grpc_manager.refresh_system_info(gateway_address, gateway_port)
+
+
+class Change(NamedTuple):
+    publish: bool  # the sample becomes the new reference and goes out
+    differs: bool  # it moved past a deadband or changed a field; not set on first samples and heartbeats
+
+
+class ChangeDetector:
+    """
+    Decides whether a sample is worth publishing, by comparing it with the
+    last one published for the same key. Fields with a deadband count as
+    changed once they move by more than it; any other field on any
+    difference. Fields missing from the sample are not compared. After
+    `heartbeat` seconds without a publish the next sample goes out anyway.
+    """
+
+    def __init__(self, deadbands: Optional[Dict[str, float]] = None, heartbeat: float = 60.0):
+        self.deadbands = deadbands or {}
+        self.heartbeat = heartbeat
+        self._published: Dict[Hashable, tuple] = {}  # key -> (sample, monotonic time)
+        self._lock = threading.Lock()
+
+        self.published = 0
+        self.suppressed = 0
+
+    def changed(self, key: Hashable, sample: Dict[str, Any], now: Optional[float] = None) -> bool:
+        """True when `sample` should be published; it then becomes the reference."""
+        return self.check(key, sample, now).publish
+
+    def check(self, key: Hashable, sample: Dict[str, Any], now: Optional[float] = None) -> Change:
+        """Like changed(), also telling whether the sample really differs from the reference."""
+        now = time.monotonic() if now is None else now
+
+        with self._lock:
+            previous = self._published.get(key)
+            differs = previous is not None and self._differs(previous[0], sample)
+            if previous is not None and now - previous[1] < self.heartbeat and not differs:
+                self.suppressed += 1
+                return Change(publish=False, differs=False)
+
+            self._published[key] = (dict(sample), now)
+            self.published += 1
+            return Change(publish=True, differs=differs)
+
+    def _differs(self, previous: Dict[str, Any], sample: Dict[str, Any]) -> bool:
+        for name, value in sample.items():
+            before = previous.get(name)
+            deadband = self.deadbands.get(name)
+            if deadband is not None and value is not None and before is not None:
+                if abs(value - before) > deadband:
+                    return True
+            elif value != before:
+                return True
+        return False
+
+    def forget(self, key: Hashable):
+        with self._lock:
+            self._published.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'published': self.published, 'suppressed': self.suppressed}
+
+
+class AdaptiveInterval:
+    """
+    Poll period of one gateway. It shrinks while samples keep changing and
+    grows while they don't, within [min_interval, max_interval]. Failed
+    polls back off exponentially from the current period, up to
+    max_backoff. Every delay is spread by +-jitter (a fraction) so pollers
+    started together drift apart. Without bounds the period stays fixed.
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        min_interval: Optional[float] = None,
+        max_interval: Optional[float] = None,
+        max_backoff: Optional[float] = None,
+        speedup: float = 0.5,
+        slowdown: float = 1.5,
+        jitter: float = 0.0,
+        rng: Callable[[], float] = random.random
+    ):
+        self.min_interval = interval if min_interval is None else min_interval
+        self.max_interval = interval if max_interval is None else max(max_interval, self.min_interval)
+        self.max_backoff = self.max_interval if max_backoff is None else max(max_backoff, self.max_interval)
+        self.speedup = speedup
+        self.slowdown = slowdown
+        self.jitter = jitter
+        self._rng = rng
+        self.interval = self._clamp(interval)
+        self.failures = 0
+
+    def _clamp(self, interval: float) -> float:
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def _jittered(self, delay: float) -> float:
+        return delay * (1 + self.jitter * (2 * self._rng() - 1))
+
+    def succeeded(self, changed: bool) -> float:
+        """Delay before the next poll after a successful one."""
+        self.failures = 0
+        self.interval = self._clamp(self.interval * (self.speedup if changed else self.slowdown))
+        return self._jittered(self.interval)
+
+    def failed(self) -> float:
+        """Delay before the next poll after a failed one."""
+        self.failures += 1
+        backoff = min(self.interval * 2 ** min(self.failures, 32), self.max_backoff)
+        return self._jittered(backoff)
+
+
+class GatewayPoller:
+    """
+    One poll loop for one gateway, shared by all of its subscribers.
+    `on_result` returns whether the sample changed, which paces the loop
+    through `schedule`; a fetch that fails or finds the gateway offline
+    backs it off.
+    """
+
+    def __init__(
+        self,
+        gateway_id: str,
+        gateway_address: str,
+        gateway_port: int,
+        interval: float,
+        fetch: Callable[[str, int], Dict[str, Any]],
+        on_result: Callable[[str, Dict[str, Any]], Any],
+        schedule: Optional[AdaptiveInterval] = None
+    ):
+        self.gateway_id = gateway_id
+        self.gateway_address = gateway_address
+        self.gateway_port = gateway_port
+        self.interval = interval
+        self.fetch = fetch
+        self.on_result = on_result
+        self.schedule = schedule or AdaptiveInterval(interval)
+        self.subscribers: Dict[Hashable, Optional[Callable[[Any], None]]] = {}  # subscriber -> sink
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run,
+            daemon=True,
+            name=f"poll_gateway_{gateway_id}"
+        )
+
+    def start(self):
+        self._thread.start()
+        logger.info(f"Started poller for gateway {self.gateway_id}")
+
+    def stop(self):
+        self._stop_event.set()
+        logger.info(f"Stopping poller for gateway {self.gateway_id}")
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread.is_alive() and not self._stop_event.is_set()
+
+    def _run(self):
+        delay = self.interval
+        while not self._stop_event.wait(delay):
+            try:
+                system_info = self.fetch(self.gateway_address, self.gateway_port)
+                if self._stop_event.is_set():
+                    break
+                changed = self.on_result(self.gateway_id, system_info)
+                if system_info.get('status') == 'online':
+                    delay = self.schedule.succeeded(bool(changed))
+                else:
+                    delay = self.schedule.failed()
+            except Exception as e:
+                logger.error(f"Error in poller for gateway {self.gateway_id}: {e}")
+                delay = self.schedule.failed()
+
+        logger.info(f"Poller for gateway {self.gateway_id} stopped")
+
+
+class GatewayPollingScheduler:
+    """
+    Reference-counted pollers: the first subscriber of a gateway starts its
+    poll loop, the last one to leave stops it. Each result is handed to
+    `on_result` once, no matter how many subscribers are watching; what it
+    publishes reaches the subscribers of this process through sinks().
+    Pollers adapt their period within the min/max bounds, which a gateway
+    can override with its own poll_min_interval / poll_max_interval.
+    """
+
+    def __init__(
+        self,
+        on_result: Callable[[str, Dict[str, Any]], Any],
+        interval: float = 5.0,
+        fetch: Callable[[str, int], Dict[str, Any]] = fetch_system_info,
+        min_interval: Optional[float] = None,
+        max_interval: Optional[float] = None,
+        max_backoff: Optional[float] = None,
+        jitter: float = 0.0
+    ):
+        self.on_result = on_result
+        self.interval = interval
+        self.fetch = fetch
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self._pollers: Dict[str, GatewayPoller] = {}
+        self._scheduler_lock = threading.Lock()
+
+    def subscribe(self, gateway, subscriber: Hashable, sink: Optional[Callable[[Any], None]] = None) -> GatewayPoller:
+        gateway_id = str(gateway.id)
+
+        with self._scheduler_lock:
+            poller = self._pollers.get(gateway_id)
+            if poller is None:
+                poller = GatewayPoller(
+                    gateway_id=gateway_id,
+                    gateway_address=gateway.address,
+                    gateway_port=gateway.port,
+                    interval=self.interval,
+                    fetch=self.fetch,
+                    on_result=self.on_result,
+                    schedule=self._schedule_for(gateway)
+                )
+                self._pollers[gateway_id] = poller
+                poller.start()
+
+            poller.subscribers[subscriber] = sink
+            logger.info(f"Gateway {gateway_id} now has {len(poller.subscribers)} subscriber(s)")
+            return poller
+
+    def _schedule_for(self, gateway) -> AdaptiveInterval:
+        min_interval = getattr(gateway, 'poll_min_interval', None)
+        max_interval = getattr(gateway, 'poll_max_interval', None)
+        return AdaptiveInterval(
+            self.interval,
+            min_interval=self.min_interval if min_interval is None else min_interval,
+            max_interval=self.max_interval if max_interval is None else max_interval,
+            max_backoff=self.max_backoff,
+            jitter=self.jitter
+        )
+
+    def unsubscribe(self, gateway_id, subscriber: Hashable):
+        gateway_id = str(gateway_id)
+
+        with self._scheduler_lock:
+            poller = self._pollers.get(gateway_id)
+            if poller is None:
+                return
+
+            poller.subscribers.pop(subscriber, None)
+            if not poller.subscribers:
+                del self._pollers[gateway_id]
+                poller.stop()
+
+    def get_poller(self, gateway_id) -> Optional[GatewayPoller]:
+        with self._scheduler_lock:
+            return self._pollers.get(str(gateway_id))
+
+    def sinks(self, gateway_id) -> List[Callable[[Any], None]]:
+        with self._scheduler_lock:
+            poller = self._pollers.get(str(gateway_id))
+            return [sink for sink in poller.subscribers.values() if sink is not None] if poller else []
+
+    def subscriber_count(self, gateway_id) -> int:
+        poller = self.get_poller(gateway_id)
+        return len(poller.subscribers) if poller else 0
+
+    def stop_all(self):
+        with self._scheduler_lock:
+            pollers = list(self._pollers.values())
+            self._pollers.clear()
+        for poller in pollers:
+            poller.stop()
@@ -0,0 +1,190 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .conf import get_setting
+
+logger = logging.getLogger(__name__)
+
+TaskKey = Tuple[str, str]  # (channel_name, subscription_id)
+
+
+class SubscriptionTask:
+    """Handle of one background worker serving a WebSocket subscription."""
+
+    def __init__(self, key: TaskKey, name: str):
+        self.key = key
+        self.name = name
+        self.started_at = time.monotonic()
+        self._stop_event = threading.Event()
+        self._callbacks: List[Callable[[], None]] = []
+        self._task_lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._stop_event.is_set()
+
+    def wait(self, timeout: float) -> bool:
+        return self._stop_event.wait(timeout)
+
+    def add_cancel_callback(self, callback: Callable[[], None]):
+        with self._task_lock:
+            if not self._stop_event.is_set():
+                self._callbacks.append(callback)
+                return
+        # already cancelled: run right away so late resources are released too
+        self._run_callback(callback)
+
+    def cancel(self):
+        with self._task_lock:
+            if self._stop_event.is_set():
+                return
+            self._stop_event.set()
+            callbacks, self._callbacks = self._callbacks, []
+
+        for callback in callbacks:
+            self._run_callback(callback)
+        logger.info(f"Cancelled subscription task {self.name}")
+
+    def _run_callback(self, callback: Callable[[], None]):
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f"Error cancelling subscription task {self.name}: {e}")
+
+
+class SubscriptionTaskRegistry:
+    """
+    Tracks background workers by (channel_name, subscription_id) so that
+    stop/disconnect can cancel them. Consumers heartbeat their channel with
+    `touch`; tasks of channels silent for `orphan_timeout` are reclaimed,
+    by a reaper thread that runs every `reap_interval` seconds while any
+    task is registered, whether or not new traffic comes in.
+    """
+
+    def __init__(self, orphan_timeout: float = 300, reap_interval: Optional[float] = None):
+        self.orphan_timeout = orphan_timeout
+        self.reap_interval = orphan_timeout / 10 if reap_interval is None else reap_interval
+        self._tasks: Dict[TaskKey, SubscriptionTask] = {}
+        self._last_seen: Dict[str, float] = {}
+        self._registry_lock = threading.Lock()
+        self._last_reap = time.monotonic()
+        self._reaper: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    def register(self, channel_name: str, subscription_id: str, name: str) -> SubscriptionTask:
+        key = (channel_name, str(subscription_id))
+        task = SubscriptionTask(key, name)
+
+        with self._registry_lock:
+            previous = self._tasks.get(key)
+            self._tasks[key] = task
+            self._last_seen[channel_name] = time.monotonic()
+            if self._reaper is None and not self._stop_event.is_set():
+                self._reaper = threading.Thread(
+                    target=self._reap_periodically,
+                    daemon=True,
+                    name="reap_orphan_tasks"
+                )
+                self._reaper.start()
+
+        # a restarted subscription id replaces its old worker
+        if previous is not None:
+            previous.cancel()
+
+        self.reap_orphans()
+        return task
+
+    def unregister(self, task: SubscriptionTask):
+        with self._registry_lock:
+            if self._tasks.get(task.key) is task:
+                del self._tasks[task.key]
+                self._forget_channel_locked(task.key[0])
+
+    def release(self, task: SubscriptionTask):
+        """Cancel `task`, leaving alone a newer task that reuses its subscription id."""
+        self.unregister(task)
+        task.cancel()
+
+    def get(self, channel_name: str, subscription_id: str) -> Optional[SubscriptionTask]:
+        with self._registry_lock:
+            return self._tasks.get((channel_name, str(subscription_id)))
+
+    def cancel(self, channel_name: str, subscription_id: str) -> bool:
+        with self._registry_lock:
+            task = self._tasks.pop((channel_name, str(subscription_id)), None)
+            self._forget_channel_locked(channel_name)
+
+        if task is None:
+            return False
+        task.cancel()
+        return True
+
+    def cancel_channel(self, channel_name: str) -> int:
+        with self._registry_lock:
+            tasks = [task for key, task in self._tasks.items() if key[0] == channel_name]
+            for task in tasks:
+                del self._tasks[task.key]
+            self._last_seen.pop(channel_name, None)
+
+        for task in tasks:
+            task.cancel()
+        return len(tasks)
+
+    def touch(self, channel_name: str):
+        with self._registry_lock:
+            if any(key[0] == channel_name for key in self._tasks):
+                self._last_seen[channel_name] = time.monotonic()
+        self.reap_orphans()
+
+    def reap_orphans(self, force: bool = False) -> int:
+        now = time.monotonic()
+        if not force and now - self._last_reap < self.orphan_timeout / 10:
+            return 0
+        self._last_reap = now
+
+        with self._registry_lock:
+            stale = {
+                channel_name for channel_name, last_seen in self._last_seen.items()
+                if now - last_seen > self.orphan_timeout
+            }
+
+        reaped = sum(self.cancel_channel(channel_name) for channel_name in stale)
+        if reaped:
+            logger.warning(f"Reclaimed {reaped} orphaned subscription task(s)")
+        return reaped
+
+    def _reap_periodically(self):
+        while not self._stop_event.wait(self.reap_interval):
+            try:
+                self.reap_orphans(force=True)
+            except Exception as e:
+                logger.error(f"Error reaping orphaned subscription tasks: {e}")
+
+            # idle registries don't keep a thread around; the next register starts a new one
+            with self._registry_lock:
+                if not self._tasks:
+                    self._reaper = None
+                    return
+
+        with self._registry_lock:
+            self._reaper = None
+
+    def stop(self):
+        """Stop the reaper thread for good."""
+        self._stop_event.set()
+
+    def _forget_channel_locked(self, channel_name: str):
+        if not any(key[0] == channel_name for key in self._tasks):
+            self._last_seen.pop(channel_name, None)
+
+    def __len__(self) -> int:
+        with self._registry_lock:
+            return len(self._tasks)
+
+
+# Singleton
+task_registry = SubscriptionTaskRegistry(
+    orphan_timeout=get_setting('SUBSCRIPTION_ORPHAN_TIMEOUT', 300)
+)
@@ -0,0 +1,88 @@
+import json
+import string
+from typing import Any, Dict, List, Optional, Union
+
+import msgpack
+
+Frame = Union[str, bytes]
+
+KEY_DIGITS = string.digits + string.ascii_lowercase
+
+
+def _short_key(index: int) -> str:
+    digits = []
+    while True:
+        index, digit = divmod(index, len(KEY_DIGITS))
+        digits.append(KEY_DIGITS[digit])
+        if not index:
+            return ''.join(reversed(digits))
+
+
+class JsonEncoder:
+    """Plain JSON text frames, what every graphql-ws client expects."""
+
+    name = 'json'
+    binary = False
+
+    def encode(self, body: Any) -> Frame:
+        return json.dumps(body)
+
+
+class KeyDictionaryEncoder:
+    """
+    JSON text frames with object keys replaced by short ids from a key
+    table kept per connection. The first frame using a key carries it:
+    {"k": [new keys, in id order], "d": body}; the client appends them to
+    its own table. Ids are base 36 positions in that table.
+    """
+
+    name = 'json-keys'
+    binary = False
+
+    def __init__(self):
+        self._ids: Dict[str, str] = {}
+
+    def encode(self, body: Any) -> Frame:
+        new_keys: List[str] = []
+
+        def pack(value):
+            if isinstance(value, dict):
+                packed = {}
+                for key, item in value.items():
+                    key_id = self._ids.get(key)
+                    if key_id is None:
+                        key_id = self._ids[key] = _short_key(len(self._ids))
+                        new_keys.append(key)
+                    packed[key_id] = pack(item)
+                return packed
+            if isinstance(value, (list, tuple)):
+                return [pack(item) for item in value]
+            return value
+
+        frame = {'d': pack(body)}
+        if new_keys:
+            frame['k'] = new_keys
+        return json.dumps(frame, separators=(',', ':'))
+
+
+class MsgpackEncoder:
+    """MessagePack binary frames."""
+
+    name = 'msgpack'
+    binary = True
+
+    def encode(self, body: Any) -> Frame:
+        return msgpack.packb(body, use_bin_type=True)
+
+
+ENCODERS = {
+    JsonEncoder.name: JsonEncoder,
+    KeyDictionaryEncoder.name: KeyDictionaryEncoder,
+    MsgpackEncoder.name: MsgpackEncoder,
+}
+
+
+def create_encoder(name: Optional[str]):
+    """A new encoder for one connection, None for an unknown name."""
+    encoder_class = ENCODERS.get(name)
+    return encoder_class() if encoder_class else None
@@ -1,14 +1,181 @@
-import graphene
 import asyncio
+import graphene
 import logging
-import threading
-from channels.layers import get_channel_layer
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from graphene.utils.str_converters import to_camel_case
 from .models import Gateway
-from .services.grpc_client import grpc_manager
+from .services.async_bridge import async_bridge
+from .services.async_grpc_client import async_grpc_manager
+from .services.conf import get_setting
+from .services.fleet import FleetPoller, fleet_delta
+from .services.grpc_client import grpc_manager, offline_system_info
+from .services.batching import LogBatcher
+from .services.log_streams import LogRateLimiter, log_multiplexer
+from .services.metrics_history import metrics_history
+from .services.polling import ChangeDetector, GatewayPollingScheduler
+from .services.task_registry import task_registry
+from .utils.log_parser import build_log_filter
 from .utils.parsers import parse_cpu_usage, parse_memory_usage, parse_uptime
 
 logger = logging.getLogger(__name__)
 
+# placeholder in a filtered log batch, replaced by a {dropped: k} entry once the batch is done
+DROPPED_MARKER = object()
+
+
+def _system_info_fields(gateway_id, system_info):
+    cpu_percent = parse_cpu_usage(system_info.get('cpu_usage'))
+    memory_percent = parse_memory_usage(system_info.get('memory_usage'))
+    uptime_formatted = parse_uptime(system_info.get('uptime'))
+
+    return {
+        'gateway_id': str(gateway_id),
+        'gateway_address': system_info['gateway_address'],
+        'gateway_port': system_info['gateway_port'],
+        'uptime': uptime_formatted,
+        'cpu_usage': f"{cpu_percent}%" if cpu_percent is not None else None,
+        'memory_usage': f"{memory_percent}%" if memory_percent is not None else None,
+        'status': system_info['status'],
+        'timestamp': system_info['timestamp'],
+        'error': system_info.get('error')
+    }
+
+
+def _publish_system_info(gateway_id, system_info):
+    # every subscription runs in the process of its socket, next to the poller: handed
+    # over directly (a channel layer group would reach the sockets of every worker,
+    # each with a poller of its own); each one resolves the client's selection set on it
+    data = _system_info_fields(gateway_id, system_info)
+    for sink in polling_scheduler.sinks(gateway_id):
+        sink(data)
+    logger.debug(f"Sent system info update for gateway {gateway_id}")
+
+
+def _change_sample(system_info):
+    # uptime is left out: it grows on every poll
+    return {
+        'cpu_usage': parse_cpu_usage(system_info.get('cpu_usage')),
+        'memory_usage': parse_memory_usage(system_info.get('memory_usage')),
+        'status': system_info.get('status'),
+        'error': system_info.get('error'),
+    }
+
+
+def _handle_system_info(gateway_id, system_info):
+    # the one place samples are recorded (readers of cached snapshots would duplicate them);
+    # history keeps every sample, subscribers only hear about the ones that changed
+    metrics_history.record(gateway_id, system_info)
+    change = change_detector.check(str(gateway_id), _change_sample(system_info))
+    if change.publish:
+        _publish_system_info(gateway_id, system_info)
+    # the poller polls faster while this keeps coming back true: first samples
+    # and heartbeats are published, but nothing moved
+    return change.differs
+
+
+def _stop_polling(gateway_id, subscriber):
+    polling_scheduler.unsubscribe(gateway_id, subscriber)
+    if not polling_scheduler.subscriber_count(gateway_id):
+        # a poller started later publishes its first sample whatever it is
+        change_detector.forget(str(gateway_id))
+
+
+# Singleton: only samples that moved past a deadband (or are due a heartbeat) are published
+change_detector = ChangeDetector(
+    deadbands={
+        'cpu_usage': get_setting('GATEWAY_CPU_DEADBAND', 2.0),
+        'memory_usage': get_setting('GATEWAY_MEMORY_DEADBAND', 2.0),
+    },
+    heartbeat=get_setting('GATEWAY_PUBLISH_HEARTBEAT', 60)
+)
+
+# Singleton: one poll loop per watched gateway
+polling_scheduler = GatewayPollingScheduler(
+    on_result=_handle_system_info,
+    interval=get_setting('GATEWAY_POLL_INTERVAL', 5),
+    min_interval=get_setting('GATEWAY_POLL_MIN_INTERVAL', 1),
+    max_interval=get_setting('GATEWAY_POLL_MAX_INTERVAL', 30),
+    max_backoff=get_setting('GATEWAY_POLL_MAX_BACKOFF', 300),
+    jitter=get_setting('GATEWAY_POLL_JITTER', 0.2)
+)
+
+
+def _load_fleet(is_active=None):
+    queryset = Gateway.objects.all()
+    if is_active is not None:
+        queryset = queryset.filter(is_active=is_active)
+    gateways = list(queryset)
+    # runs on the long-lived poll thread, which no request cycle ever cleans up after
+    close_old_connections()
+    return gateways
+
+
+def _fleet_gateway_fields(gateway, system_info):
+    fields = _system_info_fields(gateway.id, system_info)
+    fields['name'] = gateway.name
+    fields['is_active'] = gateway.is_active
+    return fields
+
+
+def _fetch_fleet(gateways):
+    # on the bridge loop every gateway is in flight at once (up to GRPC_ASYNC_MAX_CONCURRENCY),
+    # each with its own deadline, so unreachable ones can't hold back the healthy ones
+    return async_bridge.run(async_grpc_manager.get_all_gateways_info(
+        gateways,
+        deadline=get_setting('GATEWAY_FLEET_FETCH_DEADLINE', 5)
+    ))
+
+
+# Singleton: one poll loop for every fleet-wide subscription
+fleet_poller = FleetPoller(
+    load_gateways=_load_fleet,
+    fetch_all=_fetch_fleet,
+    describe=_fleet_gateway_fields,
+    unreachable=lambda gateway: offline_system_info(gateway.address, gateway.port, "No system info received"),
+    interval=get_setting('GATEWAY_POLL_INTERVAL', 5)
+)
+
+
+def _build_rate_limiter(max_lines_per_second=None, sample_every=None):
+    server_limit = get_setting('LIVE_LOGS_MAX_LINES_PER_SECOND', 200)
+    limit = max_lines_per_second if max_lines_per_second and max_lines_per_second > 0 else server_limit
+    if server_limit > 0:
+        limit = min(limit, server_limit)
+
+    rate_limiter = LogRateLimiter(
+        max_per_second=limit,
+        sample_every=sample_every or 1,
+        report_interval=get_setting('LIVE_LOGS_DROPPED_REPORT_INTERVAL', 1.0)
+    )
+    return None if rate_limiter.unlimited else rate_limiter
+
+
+def _dropped_marker(gateway_id, dropped):
+    return {
+        'gateway_id': str(gateway_id),
+        'timestamp': "",
+        'log_level': "WARNING",
+        'service_type': "SYSTEM",
+        'message': f"{dropped} log line(s) dropped by rate limit",
+        'line_number': 0,
+        'dropped': dropped
+    }
+
+
+def _restarted_marker(gateway_id, entry):
+    return {
+        'gateway_id': str(gateway_id),
+        'timestamp': "",
+        'log_level': "WARNING",
+        'service_type': "SYSTEM",
+        'message': f"Log stream restarted, lines after seq {entry['after_seq']} are not available",
+        'line_number': 0,
+        'stream_epoch': entry['epoch'],
+        'restarted': True
+    }
+
+
 class SystemInfoType(graphene.ObjectType):
     gateway_id = graphene.ID()
     gateway_address = graphene.String()
@@ -27,7 +194,27 @@ class LiveLogType(graphene.ObjectType):
     log_level = graphene.String()
     service_type = graphene.String()
     message = graphene.String()
-    line_number = graphene.Int()
+    line_number = graphene.Int(description="Same as seq")
+    seq = graphene.Int(description="Sequence number of the line in its gateway log stream, use as afterSeq to resume")
+    dropped = graphene.Int(description="Set on marker entries: lines skipped by the rate limit since the last marker")
+    stream_epoch = graphene.String(description="Seqs are only comparable within one epoch, pass it back with afterSeq")
+    restarted = graphene.Boolean(
+        description="Set on marker entries: afterSeq could not be honoured, the last lineCount lines follow"
+    )
+
+class FleetGatewayInfoType(SystemInfoType):
+    name = graphene.String()
+    is_active = graphene.Boolean()
+    changed_fields = graphene.List(
+        graphene.String,
+        description="Fields that changed since the previous update; the others are null"
+    )
+
+class FleetSystemInfoType(graphene.ObjectType):
+    full_snapshot = graphene.Boolean(description="True when gateways holds every watched gateway, false for a delta")
+    gateways = graphene.List(FleetGatewayInfoType)
+    removed_gateway_ids = graphene.List(graphene.ID, description="Gateways that left the watched set")
+    timestamp = graphene.Float()
 
 class Subscription(graphene.ObjectType):
     gateway_system_info = graphene.Field(
@@ -36,288 +223,366 @@ class Subscription(graphene.ObjectType):
         description="Subscribe to real time system info from specific gateway!"
     )
 
-    gateway_live_logs = graphene.Field(
+    gateway_live_logs = graphene.List(
         LiveLogType,
         gateway_id=graphene.ID(required=True),
         log_type=graphene.Int(default_value=2),
         line_count=graphene.Int(default_value=100),
-        description="Subscribe to live logs from specific gateway!"
+        min_level=graphene.String(description="Only lines at or above this level (TRACE, DEBUG, INFO, WARNING, ERROR, FATAL)"),
+        contains=graphene.String(description="Only lines containing this text (case sensitive)"),
+        regex=graphene.String(description="Only lines matching this regular expression"),
+        max_lines_per_second=graphene.Float(description="Rate limit for this subscription, capped by the server limit"),
+        sample_every=graphene.Int(description="Keep only 1 in N lines"),
+        traffic_log_index=graphene.String(default_value="", description="Traffic log to read, passed to the agent"),
+        after_seq=graphene.Int(description="Resubscribe: only lines after this seq instead of the last lineCount lines"),
+        stream_epoch=graphene.String(description="Resubscribe: the streamEpoch of the line afterSeq came from"),
+        description="Subscribe to live logs from specific gateway! Lines are delivered in batches."
+    )
+
+    all_gateways_system_info = graphene.Field(
+        FleetSystemInfoType,
+        is_active=graphene.Boolean(description="Is active?"),
+        description="Subscribe to the system info of every gateway: a full snapshot, then only what changed"
     )
 
-    def resolve_gateway_system_info(self, info, gateway_id):
+    def resolve_gateway_system_info(root, info, gateway_id):
+        # over WebSocket, root is an event yielded by subscribe_gateway_system_info
+        if root is not None:
+            return root
+
+        # over HTTP the subscription is a one-off snapshot
         logger.info(f"resolve_gateway_system_info called with gateway_id: {gateway_id}")
-        
         try:
-            try:
-                gateway = Gateway.objects.get(id=gateway_id)
-                logger.info(f"Found gateway: {gateway.name} at {gateway.address}:{gateway.port}")
-            except Gateway.DoesNotExist:
-                logger.error(f"Gateway {gateway_id} not found")
-                raise Exception(f"Gateway {gateway_id} not found")
-            
-            context = info.context
-            
-            if hasattr(context, 'get'):
-                # WebSocket context (dictionary)
-                consumer = context.get('consumer')
-                subscription_id = context.get('subscription_id')
-                logger.info(f"WebSocket context - Consumer: {consumer}, Subscription ID: {subscription_id}")
-            elif hasattr(context, 'META'):
-                # HTTP context (ASGIRequest)
-                consumer = None
-                subscription_id = None
-                logger.info("Subscription called via HTTP - WebSocket features disabled")
-            else:
-                # Unknown context
-                consumer = None
-                subscription_id = None
-                logger.warning(f"Unknown context type: {type(context)}")
-
-            if consumer:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                try:
-                    loop.run_until_complete(consumer.join_gateway_group(gateway_id))
-                    logger.info(f"Successfully joined gateway group for gateway {gateway_id}")
-                finally:
-                    loop.close()
-            else:
-                logger.info("No WebSocket consumer - skipping group join")
-
-            logger.info(f"Getting initial system info for gateway {gateway.address}:{gateway.port}")
-            client = grpc_manager.get_client(gateway.address, gateway.port)
-            system_info = client.get_system_info()
-            
-            logger.info(f"Raw system info received: {system_info}")
-            
-            cpu_percent = parse_cpu_usage(system_info.get('cpu_usage'))
-            memory_percent = parse_memory_usage(system_info.get('memory_usage'))
-            uptime_formatted = parse_uptime(system_info.get('uptime'))
-            
-            logger.info(f"Parsed data - CPU: {cpu_percent}%, Memory: {memory_percent}%, Uptime: {uptime_formatted}")
-            
-            if consumer and subscription_id:
-                self._start_background_monitoring(gateway, consumer, subscription_id)
-            else:
-                logger.info("No WebSocket consumer - skipping background monitoring")
-            
-            result = SystemInfoType(
-                gateway_id=gateway.id,
-                gateway_address=system_info['gateway_address'],
-                gateway_port=system_info['gateway_port'],
-                uptime=uptime_formatted,
-                cpu_usage=f"{cpu_percent}%" if cpu_percent is not None else None,
-                memory_usage=f"{memory_percent}%" if memory_percent is not None else None,
-                status=system_info['status'],
-                timestamp=system_info['timestamp'],
-                error=system_info.get('error')
-            )
-            
-            logger.info(f"Returning initial result: {result}")
-            return result
-        
+            gateway = _get_gateway(gateway_id)
+            system_info = grpc_manager.get_system_info(gateway.address, gateway.port)
+            return _system_info_result(gateway, system_info)
+
         except Exception as e:
             logger.error(f"Error in resolve_gateway_system_info: {e}", exc_info=True)
-            return SystemInfoType(
-                gateway_id=gateway_id,
-                gateway_address="",
-                gateway_port=0,
-                uptime=None,
-                cpu_usage=None,
-                memory_usage=None,
-                status="error",
-                timestamp=0,
-                error=str(e)
-            )
-   
-    def resolve_gateway_live_logs(self, info, gateway_id, log_type=2, line_count=100):
-        logger.info(f"resolve_gateway_live_logs called with gateway_id: {gateway_id}")
-        print("1")
+            return _system_info_error(gateway_id, e)
+
+    async def subscribe_gateway_system_info(root, info, gateway_id):
+        consumer, subscription_id = _socket_context(info)
+        logger.info(f"subscribe_gateway_system_info called with gateway_id: {gateway_id}")
+        try:
+            gateway = await _aget_gateway(gateway_id)
+        except Exception as e:
+            logger.error(f"Error in subscribe_gateway_system_info: {e}", exc_info=True)
+            yield _system_info_error(gateway_id, e)
+            return
+
+        events = consumer.bind_subscription(subscription_id, 'gateway_system_info', gateway_id)
+
+        # published samples arrive on the poller thread and are queued on this loop
+        loop = asyncio.get_running_loop()
+
+        def deliver(data):
+            try:
+                loop.call_soon_threadsafe(events.put_nowait, data)
+            except RuntimeError:
+                # the loop is gone along with the socket
+                pass
+
+        subscriber = (consumer.channel_name, subscription_id)
+        task = task_registry.register(
+            consumer.channel_name,
+            subscription_id,
+            f"system_info_{gateway.id}_{subscription_id}"
+        )
+        polling_scheduler.subscribe(gateway, subscriber, deliver)
+        task.add_cancel_callback(lambda: _stop_polling(gateway.id, subscriber))
+
         try:
             try:
-                gateway = Gateway.objects.get(id=gateway_id)
-                logger.info(f"Found gateway for logs: {gateway.name}")
-            except Gateway.DoesNotExist:
-                logger.error(f"Gateway {gateway_id} not found")
-                raise Exception(f"Gateway {gateway_id} not found")
-
-            context = info.context
-            if hasattr(context, 'get'):
-                consumer = context.get('consumer')
-                subscription_id = context.get('subscription_id')
-            elif hasattr(context, 'META'):
-                consumer = None
-                subscription_id = None
-                logger.info("Live logs called via HTTP - WebSocket features disabled")
-            else:
-                consumer = None
-                subscription_id = None
-
-            if consumer:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                try:
-                    loop.run_until_complete(consumer.join_gateway_group(gateway_id))
-                finally:
-                    loop.close()
-
-            if consumer and subscription_id:
-                self._start_log_streaming(gateway, consumer, subscription_id, log_type, line_count)
-
-            return LiveLogType(
-                gateway_id=gateway.id,
-                timestamp="",
-                log_level="INFO",
-                service_type="SYSTEM",
-                message="Live logs streaming started...",
-                line_number=0
-            )
-        
+                # awaited on the loop (grpc.aio), from the snapshot cache when a poller fetched it moments ago
+                system_info = await async_grpc_manager.get_system_info(gateway.address, gateway.port)
+                snapshot = _system_info_result(gateway, system_info)
+            except Exception as e:
+                logger.error(f"Error getting initial system info for gateway {gateway_id}: {e}", exc_info=True)
+                snapshot = _system_info_error(gateway_id, e)
+            yield snapshot
+
+            while True:
+                yield SystemInfoType(**await events.get())
+        finally:
+            await _release_task_off_loop(task)
+
+    def resolve_gateway_live_logs(root, info, gateway_id, log_type=2, line_count=100,
+                                  min_level=None, contains=None, regex=None,
+                                  max_lines_per_second=None, sample_every=None,
+                                  traffic_log_index="", after_seq=None, stream_epoch=None):
+        # over WebSocket, root is a batch yielded by subscribe_gateway_live_logs
+        if root is not None:
+            return root
+
+        logger.info("Live logs called via HTTP - WebSocket features disabled")
+        try:
+            build_log_filter(min_level, contains, regex)
+            gateway = _get_gateway(gateway_id)
+            return [_live_logs_started(gateway.id)]
+
         except Exception as e:
             logger.error(f"Error in resolve_gateway_live_logs: {e}", exc_info=True)
-            return LiveLogType(
-                gateway_id=gateway_id,
-                timestamp="",
-                log_level="ERROR",
-                service_type="SYSTEM",
-                message=f"Error: {str(e)}",
-                line_number=0
-            )
-    
-    def _start_background_monitoring(self, gateway, consumer, subscription_id):
-        def monitor():
-            logger.info(f"Background monitoring thread started for gateway {gateway.id}")
-            
-            channel_layer = get_channel_layer()
-            if not channel_layer:
-                logger.error("Channel layer not found")
-                return
-            
-            import time
-            while True:
-                try:
-                    time.sleep(5) 
-                    
-                    client = grpc_manager.get_client(gateway.address, gateway.port)
-                    system_info = client.get_system_info()
-
-                    cpu_percent = parse_cpu_usage(system_info.get('cpu_usage'))
-                    memory_percent = parse_memory_usage(system_info.get('memory_usage'))
-                    uptime_formatted = parse_uptime(system_info.get('uptime'))
-
-                    async def send_update():
-                        await channel_layer.group_send(
-                            f"gateway_{gateway.id}_monitoring",
-                            {
-                                'type': 'gateway_system_info',
-                                'subscription_id': subscription_id,
-                                'data': {
-                                    'gatewaySystemInfo': {
-                                        'gatewayId': str(gateway.id),
-                                        'gatewayAddress': system_info['gateway_address'],
-                                        'gatewayPort': system_info['gateway_port'],
-                                        'uptime': uptime_formatted,
-                                        'cpuUsage': f"{cpu_percent}%" if cpu_percent is not None else None,
-                                        'memoryUsage': f"{memory_percent}%" if memory_percent is not None else None,
-                                        'status': system_info['status'],
-                                        'timestamp': system_info['timestamp'],
-                                        'error': system_info.get('error')
-                                    }
-                                }
-                            }
-                        )
-                    
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    try:
-                        loop.run_until_complete(send_update())
-                        logger.debug(f"Sent system info update for gateway {gateway.id}")
-                    finally:
-                        loop.close()
-                        
-                except Exception as e:
-                    logger.error(f"Error in monitoring thread for gateway {gateway.id}: {e}")
-                    time.sleep(5) 
-
-        monitor_thread = threading.Thread(
-            target=monitor,
-            daemon=True,
-            name=f"monitor_gateway_{gateway.id}_{subscription_id}"
+            return [_live_logs_error(gateway_id, e)]
+
+    async def subscribe_gateway_live_logs(root, info, gateway_id, log_type=2, line_count=100,
+                                          min_level=None, contains=None, regex=None,
+                                          max_lines_per_second=None, sample_every=None,
+                                          traffic_log_index="", after_seq=None, stream_epoch=None):
+        consumer, subscription_id = _socket_context(info)
+        logger.info(f"subscribe_gateway_live_logs called with gateway_id: {gateway_id}")
+        try:
+            # compiled once per subscriber, fails before anything is started
+            log_filter = build_log_filter(min_level, contains, regex)
+            rate_limiter = _build_rate_limiter(max_lines_per_second, sample_every)
+            gateway = await _aget_gateway(gateway_id)
+        except Exception as e:
+            logger.error(f"Error in subscribe_gateway_live_logs: {e}", exc_info=True)
+            yield [_live_logs_error(gateway_id, e)]
+            return
+
+        batches = consumer.bind_subscription(subscription_id, 'gateway_live_logs', gateway_id)
+        yield [_live_logs_started(gateway.id)]
+
+        # unfiltered batches are flushed on the streaming threads and queued on this loop, in order
+        loop = asyncio.get_running_loop()
+
+        def deliver(entries):
+            try:
+                loop.call_soon_threadsafe(batches.put_nowait, entries)
+            except RuntimeError:
+                # the loop is gone along with the socket
+                pass
+
+        task = task_registry.register(
+            consumer.channel_name,
+            subscription_id,
+            f"logs_{gateway.id}_{subscription_id}"
         )
-        monitor_thread.start()
-        logger.info(f"Started monitoring thread for gateway {gateway.id}")
-    
-
-    def _start_log_streaming(self, gateway, consumer, subscription_id, log_type, line_count):
-        def stream_logs():
-            logger.info(f"Log streaming thread started for gateway {gateway.id}")
-            channel_layer = get_channel_layer()
-            if not channel_layer:
-                logger.error("Channel layer not found")
-                return
-            
-            stream_id = f"logs_{gateway.id}_{subscription_id}"
-            
+        # replaying the backlog flushes batches synchronously: off the loop
+        started = asyncio.ensure_future(_start_log_streaming_off_loop(
+            gateway, task, deliver, log_type, line_count,
+            traffic_log_index=traffic_log_index, after_seq=after_seq, stream_epoch=stream_epoch
+        ))
+        try:
+            await asyncio.shield(started)
+            while True:
+                batch = await batches.get()
+                if log_filter is None and rate_limiter is None:
+                    lines = [_live_log_fields(gateway.id, entry) for entry in batch]
+                else:
+                    # off the shared upstream thread and this loop: a slow regex only holds back its own subscription
+                    lines = await _filter_log_batch_off_loop(gateway.id, batch, log_filter, rate_limiter)
+                    if not lines:
+                        continue
+                yield [LiveLogType(**line) for line in lines]
+        finally:
+            # a stop during start-up must not leave the stream registered behind us
+            if not started.done():
+                await asyncio.wait([started])
+            await _release_task_off_loop(task)
+
+    def resolve_all_gateways_system_info(root, info, is_active=None):
+        # over WebSocket, root is an update yielded by subscribe_all_gateways_system_info
+        if root is not None:
+            return root
+
+        snapshot = fleet_poller.poll(is_active)
+        return _fleet_result(snapshot.timestamp, fleet_delta(None, snapshot.gateways), full_snapshot=True)
+
+    async def subscribe_all_gateways_system_info(root, info, is_active=None):
+        consumer, subscription_id = _socket_context(info)
+        logger.info(f"subscribe_all_gateways_system_info called with is_active: {is_active}")
+        snapshots = consumer.bind_subscription(subscription_id, 'all_gateways_system_info')
+
+        # only the newest snapshot waits here: each update is diffed against the last one sent
+        loop = asyncio.get_running_loop()
+
+        def deliver(snapshot):
             try:
-                logger.info(f"Attempting to start log stream: {gateway.address}:{gateway.port}")
-            
-                log_generator = grpc_manager.start_live_logs_stream(
-                    gateway.address,
-                    gateway.port,
-                    stream_id,
-                    log_type,
-                    "",
-                    line_count
-                )
-
-
-                logger.info(f"Log generator created: {log_generator}")
-                line_number = 1
-                for log_line in log_generator:
-                    logger.info(f"Received log line: {log_line}")
-                    try:
-                        async def send_log():
-                            await channel_layer.group_send(
-                                f"gateway_{gateway.id}_monitoring",
-                                {
-                                    'type': 'gateway_live_logs',
-                                    'subscription_id': subscription_id,
-                                    'data': {
-                                        'gatewayLiveLogs': {
-                                            'gatewayId': str(gateway.id),
-                                            'timestamp': "",
-                                            'logLevel': "INFO",
-                                            'serviceType': "AGENT",
-                                            'message': log_line,
-                                            'lineNumber': line_number
-                                        }
-                                    }
-                                }
-                            )
-                        
-                        loop = asyncio.new_event_loop()
-                        asyncio.set_event_loop(loop)
-                        try:
-                            loop.run_until_complete(send_log())
-                        finally:
-                            loop.close()
-                            
-                        line_number += 1
-                        
-                    except Exception as e:
-                        logger.error(f"Error sending log line: {e}")
-                        break
-            
-            except Exception as e:
-                logger.error(f"Error in log streaming thread for gateway {gateway.id}: {e}")
-            
-            finally:
-                grpc_manager.stop_live_logs_stream(gateway.address, gateway.port, stream_id)
-        
-        stream_thread = threading.Thread(
-            target=stream_logs,
-            daemon=True,
-            name=f"logs_gateway_{gateway.id}_{subscription_id}"
+                loop.call_soon_threadsafe(_put_latest, snapshots, snapshot)
+            except RuntimeError:
+                # the loop is gone along with the socket
+                pass
+
+        subscriber = (consumer.channel_name, subscription_id)
+        task = task_registry.register(
+            consumer.channel_name,
+            subscription_id,
+            f"fleet_{subscription_id}"
         )
-        stream_thread.start()
-        logger.info(f"Started log streaming thread for gateway {gateway.id}")
\ No newline at end of file
+        latest = fleet_poller.subscribe(subscriber, deliver, is_active)
+        task.add_cancel_callback(lambda: fleet_poller.unsubscribe(subscriber))
+        if latest is not None:
+            _put_latest(snapshots, latest)
+
+        try:
+            previous = None
+            while True:
+                snapshot = await snapshots.get()
+                delta = fleet_delta(previous, snapshot.gateways)
+                if previous is None or delta.changed or delta.removed:
+                    yield _fleet_result(snapshot.timestamp, delta, full_snapshot=previous is None)
+                previous = snapshot.gateways
+        finally:
+            await _release_task_off_loop(task)
+
+
+def _put_latest(queue, item):
+    while not queue.empty():
+        queue.get_nowait()
+    queue.put_nowait(item)
+
+
+def _fleet_result(timestamp, delta, full_snapshot):
+    gateways = []
+    for gateway_id, fields in delta.changed.items():
+        changed = delta.changed_fields[gateway_id]
+        values = fields if full_snapshot else {name: fields[name] for name in changed}
+        gateways.append(FleetGatewayInfoType(
+            **dict(values, gateway_id=gateway_id, timestamp=fields['timestamp']),
+            changed_fields=[to_camel_case(name) for name in changed]
+        ))
+
+    return FleetSystemInfoType(
+        full_snapshot=full_snapshot,
+        gateways=gateways,
+        removed_gateway_ids=delta.removed,
+        timestamp=timestamp
+    )
+
+
+def _socket_context(info):
+    context = info.context
+    if hasattr(context, 'get'):
+        # WebSocket context (dictionary)
+        return context.get('consumer'), context.get('subscription_id')
+    return None, None
+
+
+def _get_gateway(gateway_id):
+    try:
+        gateway = Gateway.objects.get(id=gateway_id)
+    except Gateway.DoesNotExist:
+        logger.error(f"Gateway {gateway_id} not found")
+        raise Exception(f"Gateway {gateway_id} not found")
+    logger.info(f"Found gateway: {gateway.name} at {gateway.address}:{gateway.port}")
+    return gateway
+
+
+async def _aget_gateway(gateway_id):
+    try:
+        gateway = await Gateway.objects.aget(id=gateway_id)
+    except Gateway.DoesNotExist:
+        logger.error(f"Gateway {gateway_id} not found")
+        raise Exception(f"Gateway {gateway_id} not found")
+    logger.info(f"Found gateway: {gateway.name} at {gateway.address}:{gateway.port}")
+    return gateway
+
+
+def _system_info_result(gateway, system_info):
+    return SystemInfoType(**_system_info_fields(gateway.id, system_info))
+
+
+def _system_info_error(gateway_id, error):
+    return SystemInfoType(
+        gateway_id=gateway_id,
+        gateway_address="",
+        gateway_port=0,
+        uptime=None,
+        cpu_usage=None,
+        memory_usage=None,
+        status="error",
+        timestamp=0,
+        error=str(error)
+    )
+
+
+def _live_logs_started(gateway_id):
+    return LiveLogType(
+        gateway_id=gateway_id,
+        timestamp="",
+        log_level="INFO",
+        service_type="SYSTEM",
+        message="Live logs streaming started...",
+        line_number=0
+    )
+
+
+def _live_logs_error(gateway_id, error):
+    return LiveLogType(
+        gateway_id=gateway_id,
+        timestamp="",
+        log_level="ERROR",
+        service_type="SYSTEM",
+        message=f"Error: {str(error)}",
+        line_number=0
+    )
+
+
+def _start_log_streaming(gateway, task, deliver, log_type, line_count,
+                         traffic_log_index="", after_seq=None, stream_epoch=None):
+    subscriber = task.key
+
+    # one batch of lines per delivery: log lines are filtered and limited
+    # per subscriber, so there is no group to share
+    batcher = LogBatcher(
+        deliver,
+        max_lines=get_setting('LIVE_LOGS_BATCH_MAX_LINES', 100),
+        max_delay=get_setting('LIVE_LOGS_BATCH_MAX_DELAY_MS', 100) / 1000
+    )
+
+    # runs on the shared upstream thread, once per line for this subscriber: only queues the line
+    stream_key = log_multiplexer.subscribe(
+        gateway, subscriber, batcher.add, log_type, traffic_log_index, line_count, after_seq, stream_epoch
+    )
+    task.add_cancel_callback(lambda: log_multiplexer.unsubscribe(stream_key, subscriber))
+    task.add_cancel_callback(batcher.close)
+    logger.info(f"Subscribed {subscriber[1]} to shared log stream {stream_key}")
+
+
+def _filter_log_batch(gateway_id, entries, log_filter=None, rate_limiter=None):
+    """The lines of one batch of stream entries this subscriber's filter and rate limit let through."""
+    kept = []
+    for entry in entries:
+        if entry.get('restarted'):
+            # never filtered or limited: the client must know its seqs are stale
+            kept.append(entry)
+            continue
+        if log_filter is not None and not log_filter(entry):
+            continue
+        if rate_limiter is not None:
+            allowed = rate_limiter.allow()
+            # the marker's count is read once the whole batch is through
+            if rate_limiter.report_due():
+                kept.append(DROPPED_MARKER)
+            if not allowed:
+                continue
+        kept.append(entry)
+    return [
+        _dropped_marker(gateway_id, rate_limiter.take_dropped()) if entry is DROPPED_MARKER
+        else _live_log_fields(gateway_id, entry)
+        for entry in kept
+    ]
+
+
+def _live_log_fields(gateway_id, entry):
+    if entry.get('restarted'):
+        return _restarted_marker(gateway_id, entry)
+    return {
+        'gateway_id': str(gateway_id),
+        'timestamp': entry['timestamp'],
+        'log_level': entry['log_level'],
+        'service_type': entry['service_type'],
+        'message': entry['line'],
+        'line_number': entry['seq'],
+        'seq': entry['seq'],
+        'stream_epoch': entry['epoch']
+    }
+
+
+_start_log_streaming_off_loop = sync_to_async(_start_log_streaming, thread_sensitive=False)
+_filter_log_batch_off_loop = sync_to_async(_filter_log_batch, thread_sensitive=False)
+# cancel callbacks close gRPC channels and stop pollers, which can block: never on the socket's loop.
+# A generator releases its own task: its finally can run after the id was reused by a new operation
+_release_task_off_loop = sync_to_async(task_registry.release, thread_sensitive=False)
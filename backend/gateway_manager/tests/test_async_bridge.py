@@ -0,0 +1,51 @@
+import asyncio
+import threading
+import unittest
+
+from gateway_manager.services.async_bridge import AsyncBridge
+
+
+class TestAsyncBridge(unittest.TestCase):
+
+    def setUp(self):
+        self.bridge = AsyncBridge(name="test_bridge")
+
+    def tearDown(self):
+        self.bridge.stop()
+
+    def test_run_returns_coroutine_result(self):
+        async def add(a, b):
+            await asyncio.sleep(0)
+            return a + b
+
+        self.assertEqual(self.bridge.run(add(1, 2), timeout=5), 3)
+
+    def test_coroutines_share_one_loop_thread(self):
+        async def current():
+            return threading.current_thread(), asyncio.get_running_loop()
+
+        first = self.bridge.run(current(), timeout=5)
+        second = self.bridge.run(current(), timeout=5)
+
+        self.assertEqual(first, second)
+        self.assertIsNot(first[0], threading.current_thread())
+
+    def test_run_from_bridge_thread_raises(self):
+        async def nested():
+            return self.bridge.run(asyncio.sleep(0))
+
+        with self.assertRaises(RuntimeError):
+            self.bridge.run(nested(), timeout=5)
+
+    def test_stop_allows_restart(self):
+        async def value():
+            return 1
+
+        self.bridge.run(value(), timeout=5)
+        self.bridge.stop()
+
+        self.assertEqual(self.bridge.run(value(), timeout=5), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
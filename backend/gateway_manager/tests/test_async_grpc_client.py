@@ -0,0 +1,153 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, Mock, patch
+import grpc
+
+from gateway_manager.services.async_grpc_client import AsyncGatewayGRPCClient, AsyncGatewayGRPCManager
+from gateway_manager.services.grpc_client import SystemInfoCache
+from gateway_manager.protobuf import gateway_agent_pb2 as pb2
+from gateway_manager.protobuf import gateway_agent_pb2_grpc as pb2_grpc
+
+
+# In-process async gateway agent
+class FakeGatewayAgent(pb2_grpc.GatewayAgentServicer):
+    async def Uptime(self, request, context):
+        return pb2.UptimeResponse(uptime="1d 2h 3m")
+
+    async def CpuUsage(self, request, context):
+        await context.abort(grpc.StatusCode.UNAVAILABLE, "cpu probe failed")
+
+    async def MemoryUsage(self, request, context):
+        return pb2.MemoryUsageResponse(memory_usage="40.0%")
+
+    async def ReadLiveLogs(self, request, context):
+        for i in range(request.line_count):
+            yield pb2.LiveLogsResponse(log=f"Log line {i + 1}")
+
+
+class TestAsyncGatewayGRPCClient(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.server = grpc.aio.server()
+        pb2_grpc.add_GatewayAgentServicer_to_server(FakeGatewayAgent(), self.server)
+        self.port = self.server.add_insecure_port("127.0.0.1:0")
+        await self.server.start()
+        self.client = AsyncGatewayGRPCClient("127.0.0.1", self.port, timeout=5)
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.server.stop(None)
+
+    async def test_get_uptime(self):
+        self.assertEqual(await self.client.get_uptime(), "1d 2h 3m")
+
+    async def test_get_system_info_partial(self):
+        info = await self.client.get_system_info(deadline=5)
+
+        self.assertEqual(info['status'], 'online')
+        self.assertEqual(info['uptime'], '1d 2h 3m')
+        self.assertEqual(info['memory_usage'], '40.0%')
+        self.assertIsNone(info['cpu_usage'])
+        self.assertEqual(info['errors'], {'cpu_usage': 'cpu probe failed'})
+
+    async def test_read_live_logs_stream(self):
+        logs = [line async for line in self.client.read_live_logs_stream(line_count=3)]
+
+        self.assertEqual(logs, ["Log line 1", "Log line 2", "Log line 3"])
+
+    async def test_unreachable_gateway(self):
+        await self.server.stop(None)
+
+        info = await self.client.get_system_info(deadline=0.5)
+
+        self.assertEqual(info['status'], 'offline')
+        self.assertIsNotNone(info['error'])
+
+    async def test_connect_timeout_keeps_shared_channel(self):
+        await self.server.stop(None)
+
+        with self.assertRaises(asyncio.TimeoutError):
+            await self.client.get_channel(timeout=0.2)
+        channel = self.client._channels[asyncio.get_running_loop()]
+        with self.assertRaises(asyncio.TimeoutError):
+            await self.client.get_channel(timeout=0.2)
+
+        self.assertIs(self.client._channels[asyncio.get_running_loop()], channel)
+
+
+class TestAsyncGatewayGRPCManager(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.server = grpc.aio.server()
+        pb2_grpc.add_GatewayAgentServicer_to_server(FakeGatewayAgent(), self.server)
+        self.port = self.server.add_insecure_port("127.0.0.1:0")
+        await self.server.start()
+        self.manager = AsyncGatewayGRPCManager(max_concurrency=2)
+
+    async def asyncTearDown(self):
+        await self.manager.cleanup()
+        await self.server.stop(None)
+
+    def test_get_client_returns_existing(self):
+        client = self.manager.get_client("1.2.3.4", 50051)
+
+        self.assertIs(self.manager.get_client("1.2.3.4", 50051), client)
+
+    async def test_get_all_gateways_info(self):
+        gateways = [Mock(id=i, address="127.0.0.1", port=self.port) for i in range(1, 4)]
+
+        results = await self.manager.get_all_gateways_info(gateways, deadline=5)
+
+        self.assertEqual(set(results), {"1", "2", "3"})
+        self.assertEqual(results["2"]['uptime'], '1d 2h 3m')
+
+    async def test_get_all_gateways_info_keeps_failed_gateways(self):
+        gateways = [Mock(id=1, address="127.0.0.1", port=self.port), Mock(id=2, address="10.0.0.2", port=1)]
+        info = {'status': 'online'}
+
+        async def get_system_info(address, port, deadline=None):
+            if address == "10.0.0.2":
+                raise ConnectionError("unreachable")
+            return info
+
+        with patch.object(self.manager, 'get_system_info', side_effect=get_system_info):
+            results = await self.manager.get_all_gateways_info(gateways, deadline=5)
+
+        self.assertEqual(results["1"], info)
+        self.assertEqual((results["2"]['status'], results["2"]['error']), ('offline', 'unreachable'))
+
+    async def test_unreachable_gateways_do_not_hold_back_healthy_ones(self):
+        gateways = [Mock(id=i, address=f"10.0.0.{i}", port=1) for i in range(1, 41)]
+
+        async def get_system_info(address, port, deadline=None):
+            if int(address.rsplit(".", 1)[1]) <= 35:
+                await asyncio.sleep(deadline)
+                raise ConnectionError("Deadline exceeded")
+            return {'status': 'online'}
+
+        manager = AsyncGatewayGRPCManager(max_concurrency=500)
+        with patch.object(manager, 'get_system_info', side_effect=get_system_info):
+            started = asyncio.get_running_loop().time()
+            results = await manager.get_all_gateways_info(gateways, deadline=0.2)
+
+        self.assertLess(asyncio.get_running_loop().time() - started, 1)
+        self.assertEqual([results[str(i)]['status'] for i in range(36, 41)], ['online'] * 5)
+        self.assertEqual(results["1"]['status'], 'offline')
+
+    async def test_concurrent_misses_share_one_load_and_fill_cache(self):
+        cache = SystemInfoCache(ttl=60)
+        manager = AsyncGatewayGRPCManager(cache=cache)
+        client = manager.get_client("127.0.0.1", self.port)
+        client.get_system_info = AsyncMock(return_value={'status': 'online'})
+
+        results = await asyncio.gather(*(manager.get_system_info("127.0.0.1", self.port) for _ in range(3)))
+
+        self.assertEqual(results, [{'status': 'online'}] * 3)
+        client.get_system_info.assert_awaited_once()
+        self.assertEqual(cache.peek(f"127.0.0.1:{self.port}"), {'status': 'online'})
+        self.assertEqual(await manager.get_system_info("127.0.0.1", self.port), {'status': 'online'})
+        client.get_system_info.assert_awaited_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import queue
+import unittest
+
+from gateway_manager.services.batching import LogBatcher
+
+
+class TestLogBatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.batches = queue.Queue()
+
+    def test_flushes_when_full(self):
+        batcher = LogBatcher(self.batches.put, max_lines=3, max_delay=60)
+        for i in range(7):
+            batcher.add(i)
+
+        self.assertEqual(self.batches.get(timeout=1), [0, 1, 2])
+        self.assertEqual(self.batches.get(timeout=1), [3, 4, 5])
+        self.assertTrue(self.batches.empty())
+
+    def test_flushes_after_delay(self):
+        batcher = LogBatcher(self.batches.put, max_lines=100, max_delay=0.01)
+        batcher.add("a")
+        batcher.add("b")
+
+        self.assertEqual(self.batches.get(timeout=1), ["a", "b"])
+
+    def test_close_drops_pending_items(self):
+        batcher = LogBatcher(self.batches.put, max_lines=100, max_delay=0.01)
+        batcher.add("a")
+        batcher.close()
+        batcher.add("b")
+
+        with self.assertRaises(queue.Empty):
+            self.batches.get(timeout=0.05)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,249 @@
+import asyncio
+import os
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gateway_project.settings')
+django.setup()
+
+from django.test import override_settings  # noqa: E402
+
+try:
+    from channels.testing import WebsocketCommunicator  # noqa: E402
+except ImportError:
+    # channels.testing also loads its live server test case, which needs daphne
+    WebsocketCommunicator = None
+
+from gateway_manager import subscriptions  # noqa: E402
+from gateway_manager.consumers import (  # noqa: E402
+    CLOSE_SUBSCRIBER_EXISTS, CLOSE_TOO_MANY_INIT_REQUESTS, CLOSE_UNAUTHORIZED,
+    GRAPHQL_TRANSPORT_WS, GRAPHQL_WS, GraphQLWebSocketConsumer
+)
+from gateway_manager.services.task_registry import task_registry  # noqa: E402
+
+SYSTEM_INFO_QUERY = 'subscription { gatewaySystemInfo(gatewayId: "7") { gatewayId cpuUsage status } }'
+SYSTEM_INFO = {
+    'gateway_address': "127.0.0.1",
+    'gateway_port': 50051,
+    'uptime': "1h",
+    'cpu_usage': "12.5",
+    'memory_usage': "40.0",
+    'status': "online",
+    'timestamp': 1.0
+}
+IN_MEMORY_CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+@unittest.skipIf(WebsocketCommunicator is None, "channels.testing needs daphne")
+class ConsumerTestCase(unittest.IsolatedAsyncioTestCase):
+    protocol = GRAPHQL_TRANSPORT_WS
+
+    async def asyncSetUp(self):
+        self.enterContext(override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS))
+        gateway = SimpleNamespace(id=7, name="gateway", address="127.0.0.1", port=50051)
+        self.enterContext(patch.object(subscriptions.Gateway.objects, 'aget', AsyncMock(return_value=gateway)))
+        self.enterContext(patch.object(
+            subscriptions.async_grpc_manager, 'get_system_info',
+            AsyncMock(return_value=SYSTEM_INFO)
+        ))
+        # no poller threads: the tests only look at who is subscribed
+        self.polling_scheduler = self.enterContext(patch.object(subscriptions, 'polling_scheduler'))
+        self.polling_scheduler.subscriber_count.return_value = 0
+
+        self.communicator = WebsocketCommunicator(
+            GraphQLWebSocketConsumer.as_asgi(), "/graphql/subscriptions/", subprotocols=[self.protocol]
+        )
+        connected, subprotocol = await self.communicator.connect()
+        self.assertTrue(connected)
+        self.assertEqual(subprotocol, self.protocol)
+
+    async def asyncTearDown(self):
+        await self.communicator.disconnect()
+
+    @property
+    def start_type(self):
+        return 'subscribe' if self.protocol == GRAPHQL_TRANSPORT_WS else 'start'
+
+    @property
+    def stop_type(self):
+        return 'complete' if self.protocol == GRAPHQL_TRANSPORT_WS else 'stop'
+
+    @property
+    def data_type(self):
+        return 'next' if self.protocol == GRAPHQL_TRANSPORT_WS else 'data'
+
+    async def init(self):
+        await self.communicator.send_json_to({'type': 'connection_init'})
+        self.assertEqual(await self.communicator.receive_json_from(timeout=1), {'type': 'connection_ack'})
+
+    async def start(self, subscription_id, query=SYSTEM_INFO_QUERY):
+        await self.communicator.send_json_to({'id': subscription_id, 'type': self.start_type, 'payload': {'query': query}})
+
+    async def receive_closed(self):
+        message = await self.communicator.receive_output(timeout=1)
+        self.assertEqual(message['type'], 'websocket.close')
+        return message.get('code')
+
+    async def subscribed(self, subscription_id):
+        await self.start(subscription_id)
+        message = await self.communicator.receive_json_from(timeout=1)
+        self.assertEqual((message['type'], message['id']), (self.data_type, subscription_id))
+        self.assertEqual(message['payload']['data']['gatewaySystemInfo']['cpuUsage'], "12.5%")
+        # (channel_name, subscription_id) the poller was subscribed with
+        gateway, subscriber, _ = self.polling_scheduler.subscribe.call_args[0]
+        self.assertEqual((gateway.id, subscriber[1]), (7, subscription_id))
+        return subscriber
+
+    async def test_init_is_acknowledged(self):
+        await self.init()
+        self.assertTrue(await self.communicator.receive_nothing())
+
+    async def test_published_samples_reach_the_subscription(self):
+        await self.init()
+        await self.subscribed("1")
+        deliver = self.polling_scheduler.subscribe.call_args[0][2]
+
+        # from the poller thread
+        threading.Thread(target=deliver, args=(dict(subscriptions._system_info_fields(7, SYSTEM_INFO), cpu_usage="50%"),)).start()
+
+        message = await self.communicator.receive_json_from(timeout=1)
+        self.assertEqual(message['payload']['data']['gatewaySystemInfo']['cpuUsage'], "50%")
+
+    async def test_log_filter_runs_off_the_stream_thread(self):
+        multiplexer = self.enterContext(patch.object(subscriptions, 'log_multiplexer'))
+        filtered_on = []
+
+        def log_filter(entry):
+            filtered_on.append(threading.current_thread())
+            return "error" in entry['line']
+
+        self.enterContext(patch.object(subscriptions, 'build_log_filter', return_value=log_filter))
+        await self.init()
+        await self.start("1", 'subscription { gatewayLiveLogs(gatewayId: "7", regex: "error") { message } }')
+        started = await self.communicator.receive_json_from(timeout=1)
+        self.assertEqual(started['payload']['data']['gatewayLiveLogs'][0]['message'], "Live logs streaming started...")
+        # the stream is started off the loop
+        while not multiplexer.subscribe.called:
+            await asyncio.sleep(0.01)
+        sink = multiplexer.subscribe.call_args[0][2]
+
+        entries = [
+            {'timestamp': "", 'log_level': "INFO", 'service_type': "AGENT", 'line': line, 'seq': seq, 'epoch': "e"}
+            for seq, line in enumerate(["ok", "disk error"], 1)
+        ]
+        stream = threading.Thread(target=lambda: [sink(entry) for entry in entries], name="logs_test")
+        stream.start()
+        stream.join()
+
+        message = await self.communicator.receive_json_from(timeout=1)
+        self.assertEqual(message['payload']['data']['gatewayLiveLogs'], [{'message': "disk error"}])
+        self.assertEqual(len(filtered_on), 2)
+        self.assertNotIn(stream, filtered_on)
+        self.assertNotIn(threading.main_thread(), filtered_on)
+
+    async def test_stop_cancels_the_subscription(self):
+        await self.init()
+        channel_name, _ = await self.subscribed("1")
+
+        await self.communicator.send_json_to({'id': "1", 'type': self.stop_type})
+        await self.communicator.receive_nothing()
+
+        self.polling_scheduler.unsubscribe.assert_called_once_with(7, (channel_name, "1"))
+        self.assertIsNone(task_registry.get(channel_name, "1"))
+
+    async def test_disconnect_stops_every_subscription(self):
+        await self.init()
+        first = await self.subscribed("1")
+        second = await self.subscribed("2")
+
+        await self.communicator.disconnect()
+
+        self.assertEqual(
+            [call.args for call in self.polling_scheduler.unsubscribe.call_args_list],
+            [(7, first), (7, second)]
+        )
+        self.assertIsNone(task_registry.get(*first))
+        self.assertIsNone(task_registry.get(*second))
+
+
+class TestGraphQLTransportWS(ConsumerTestCase):
+    protocol = GRAPHQL_TRANSPORT_WS
+
+    async def test_subscribe_before_init_closes_unauthorized(self):
+        await self.start("1")
+
+        self.assertEqual(await self.receive_closed(), CLOSE_UNAUTHORIZED)
+        self.polling_scheduler.subscribe.assert_not_called()
+
+    async def test_duplicate_id_closes(self):
+        await self.init()
+        await self.subscribed("1")
+
+        await self.start("1")
+
+        self.assertEqual(await self.receive_closed(), CLOSE_SUBSCRIBER_EXISTS)
+
+    async def test_second_init_closes(self):
+        await self.init()
+
+        await self.communicator.send_json_to({'type': 'connection_init'})
+
+        self.assertEqual(await self.receive_closed(), CLOSE_TOO_MANY_INIT_REQUESTS)
+
+    async def test_ping_is_answered(self):
+        await self.init()
+
+        await self.communicator.send_json_to({'type': 'ping', 'payload': {'n': 1}})
+
+        self.assertEqual(await self.communicator.receive_json_from(timeout=1), {'type': 'pong', 'payload': {'n': 1}})
+
+    async def test_slow_cancel_does_not_block_other_sockets(self):
+        other = WebsocketCommunicator(
+            GraphQLWebSocketConsumer.as_asgi(), "/graphql/subscriptions/", subprotocols=[self.protocol]
+        )
+        await other.connect()
+        self.addAsyncCleanup(other.disconnect)
+        await other.send_json_to({'type': 'connection_init'})
+        await other.receive_json_from(timeout=1)
+        await self.init()
+        await self.subscribed("1")
+        # closing the gRPC stream of an unreachable gateway
+        self.polling_scheduler.unsubscribe.side_effect = lambda *args: time.sleep(0.5)
+
+        started = time.monotonic()
+        await self.communicator.send_json_to({'id': "1", 'type': self.stop_type})
+        await asyncio.sleep(0.05)
+        await other.send_json_to({'type': 'ping'})
+
+        self.assertEqual(await other.receive_json_from(timeout=1), {'type': 'pong'})
+        self.assertLess(time.monotonic() - started, 0.3)
+        await self.communicator.receive_nothing(timeout=0.6)
+
+
+class TestGraphQLWS(ConsumerTestCase):
+    protocol = GRAPHQL_WS
+
+    async def test_start_without_init_is_allowed(self):
+        await self.subscribed("1")
+
+    async def test_duplicate_id_restarts_the_operation(self):
+        await self.init()
+        first = await self.subscribed("1")
+
+        second = await self.subscribed("1")
+
+        self.assertEqual(first, second)
+        self.polling_scheduler.unsubscribe.assert_called_once_with(7, first)
+        self.assertEqual(self.polling_scheduler.subscribe.call_count, 2)
+
+
+del ConsumerTestCase  # only its protocol specific subclasses run
+
+
+if __name__ == '__main__':
+    unittest.main()
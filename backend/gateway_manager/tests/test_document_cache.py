@@ -0,0 +1,78 @@
+import unittest
+from unittest.mock import patch
+
+from graphql import build_schema
+
+from gateway_manager.services import document_cache as document_cache_module
+from gateway_manager.services.document_cache import DocumentCache
+
+SCHEMA = build_schema("""
+    type Query {
+        gateway(id: ID!): String
+    }
+""")
+
+QUERY = '{ gateway(id: "1") }'
+
+
+class TestDocumentCache(unittest.TestCase):
+
+    def test_valid_document_is_parsed_once(self):
+        cache = DocumentCache(max_size=10)
+
+        with patch.object(document_cache_module, 'parse', wraps=document_cache_module.parse) as parse, \
+                patch.object(document_cache_module, 'validate', wraps=document_cache_module.validate) as validate:
+            first, first_errors = cache.get(SCHEMA, QUERY)
+            second, second_errors = cache.get(SCHEMA, QUERY)
+
+        self.assertIs(first, second)
+        self.assertEqual(first_errors, [])
+        self.assertEqual(second_errors, [])
+        self.assertEqual(parse.call_count, 1)
+        self.assertEqual(validate.call_count, 1)
+        self.assertEqual(cache.stats(), {'size': 1, 'hits': 1, 'misses': 1})
+
+    def test_syntax_error_returns_no_document(self):
+        cache = DocumentCache(max_size=10)
+
+        document, errors = cache.get(SCHEMA, '{ gateway(')
+
+        self.assertIsNone(document)
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(cache.stats()['size'], 0)
+
+    def test_invalid_document_is_not_cached(self):
+        cache = DocumentCache(max_size=10)
+
+        document, errors = cache.get(SCHEMA, '{ unknown }')
+        cache.get(SCHEMA, '{ unknown }')
+
+        self.assertIsNotNone(document)
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(cache.stats(), {'size': 0, 'hits': 0, 'misses': 2})
+
+    def test_least_recently_used_is_evicted(self):
+        cache = DocumentCache(max_size=2)
+        queries = ['{ gateway(id: "%d") }' % i for i in range(3)]
+
+        first, _ = cache.get(SCHEMA, queries[0])
+        cache.get(SCHEMA, queries[1])
+        cache.get(SCHEMA, queries[0])
+        cache.get(SCHEMA, queries[2])
+
+        self.assertIs(cache.get(SCHEMA, queries[0])[0], first)
+        self.assertEqual(cache.stats()['size'], 2)
+        cache.get(SCHEMA, queries[1])
+        self.assertEqual(cache.stats()['misses'], 4)
+
+    def test_zero_size_disables_caching(self):
+        cache = DocumentCache(max_size=0)
+
+        cache.get(SCHEMA, QUERY)
+        cache.get(SCHEMA, QUERY)
+
+        self.assertEqual(cache.stats(), {'size': 0, 'hits': 0, 'misses': 2})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import threading
+import unittest
+from types import SimpleNamespace
+
+from gateway_manager.services.fleet import FleetPoller, fleet_delta
+
+
+def _fields(cpu, status='online', is_active=True, timestamp=1.0):
+    return {'cpu_usage': cpu, 'status': status, 'is_active': is_active, 'timestamp': timestamp}
+
+
+class TestFleetDelta(unittest.TestCase):
+
+    def test_without_previous_everything_changed(self):
+        current = {'1': _fields(10), '2': _fields(20)}
+
+        delta = fleet_delta(None, current)
+
+        self.assertEqual(delta.changed, current)
+        self.assertEqual(delta.changed_fields['1'], ['cpu_usage', 'status', 'is_active'])
+        self.assertEqual(delta.removed, [])
+
+    def test_only_changed_gateways_and_fields(self):
+        previous = {'1': _fields(10), '2': _fields(20), '3': _fields(30)}
+        current = {'1': _fields(10, timestamp=2.0), '2': _fields(25, timestamp=2.0), '4': _fields(40)}
+
+        delta = fleet_delta(previous, current)
+
+        self.assertEqual(set(delta.changed), {'2', '4'})
+        self.assertEqual(delta.changed_fields['2'], ['cpu_usage'])
+        self.assertEqual(delta.removed, ['3'])
+
+    def test_no_change_is_empty(self):
+        previous = {'1': _fields(10)}
+
+        delta = fleet_delta(previous, {'1': _fields(10, timestamp=5.0)})
+
+        self.assertEqual((delta.changed, delta.removed), ({}, []))
+
+
+class TestFleetPoller(unittest.TestCase):
+
+    def setUp(self):
+        self.gateways = [
+            SimpleNamespace(id=1, is_active=True),
+            SimpleNamespace(id=2, is_active=False),
+        ]
+        self.loads = []
+        self.poller = FleetPoller(
+            load_gateways=self._load,
+            fetch_all=lambda gateways: {str(g.id): {'cpu_usage': g.id * 10} for g in gateways},
+            describe=lambda gateway, info: dict(info, is_active=gateway.is_active),
+            unreachable=lambda gateway: {'status': 'offline'},
+            interval=0.01
+        )
+
+    def tearDown(self):
+        self.poller.unsubscribe('a')
+        self.poller.unsubscribe('b')
+
+    def _load(self, is_active):
+        self.loads.append(is_active)
+        return [g for g in self.gateways if is_active is None or g.is_active == is_active]
+
+    def _wait_for_snapshot(self, subscriber, is_active=None):
+        received = []
+        ready = threading.Event()
+
+        def sink(snapshot):
+            received.append(snapshot)
+            ready.set()
+
+        self.poller.subscribe(subscriber, sink, is_active)
+        self.assertTrue(ready.wait(timeout=2))
+        return received
+
+    def test_poll_builds_snapshot(self):
+        snapshot = self.poller.poll()
+
+        self.assertEqual(snapshot.gateways, {
+            '1': {'cpu_usage': 10, 'is_active': True},
+            '2': {'cpu_usage': 20, 'is_active': False},
+        })
+
+    def test_gateway_without_info_stays_in_snapshot(self):
+        self.poller.fetch_all = lambda gateways: {'1': {'cpu_usage': 10}}
+
+        snapshot = self.poller.poll()
+
+        self.assertEqual(snapshot.gateways['2'], {'status': 'offline', 'is_active': False})
+
+    def test_subscribers_get_their_filter(self):
+        active = self._wait_for_snapshot('a', is_active=True)
+        everything = self._wait_for_snapshot('b')
+
+        self.assertEqual(set(active[-1].gateways), {'1'})
+        self.assertEqual(set(everything[-1].gateways), {'1', '2'})
+
+    def test_latest_snapshot_is_returned_on_subscribe(self):
+        self._wait_for_snapshot('a')
+
+        latest = self.poller.subscribe('b', lambda snapshot: None, is_active=False)
+
+        self.assertEqual(set(latest.gateways), {'2'})
+
+    def test_narrower_snapshot_is_not_returned_on_subscribe(self):
+        self._wait_for_snapshot('a', is_active=True)
+
+        self.assertIsNone(self.poller.subscribe('b', lambda snapshot: None))
+
+    def test_stops_with_last_subscriber(self):
+        self._wait_for_snapshot('a')
+
+        self.poller.unsubscribe('a')
+
+        self.assertEqual(self.poller.subscriber_count(), 0)
+        self.assertIsNone(self.poller.latest)
+
+
+if __name__ == '__main__':
+    unittest.main()
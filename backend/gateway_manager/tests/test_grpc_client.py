@@ -1,9 +1,11 @@
+import threading
+import time
 import unittest
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import Mock, patch, MagicMock, ANY
 from concurrent.futures import Future
 import grpc
 
-from gateway_manager.services.grpc_client import GatewayGRPCClient, GatewayGRPCManager
+from gateway_manager.services.grpc_client import GatewayGRPCClient, GatewayGRPCManager, GatewayChannelPool, SystemInfoCache
 from gateway_manager.protobuf import gateway_agent_pb2 as pb2
 from gateway_manager.protobuf import gateway_agent_pb2_grpc as pb2_grpc
 
@@ -25,6 +27,23 @@ class MockGatewayAgentStub:
         yield pb2.LiveLogsResponse(log="Log line 3")
 
 
+def _future_call(value=None, error=None):
+    future = Future()
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(value)
+    return Mock(return_value=future)
+
+
+# Mock GatewayAgentStub with the `.future()` call style used by concurrent snapshots
+class MockFutureGatewayAgentStub:
+    def __init__(self, cpu_error=None):
+        self.Uptime = Mock(future=_future_call(pb2.UptimeResponse(uptime="1d 2h 3m")))
+        self.CpuUsage = Mock(future=_future_call(pb2.CpuUsageResponse(cpu_usage="25.5%"), cpu_error))
+        self.MemoryUsage = Mock(future=_future_call(pb2.MemoryUsageResponse(memory_usage="40.0%")))
+
+
 class TestGatewayGRPCClient(unittest.TestCase):
 
     def setUp(self):
@@ -101,6 +120,231 @@ class TestGatewayGRPCClient(unittest.TestCase):
         self.assertEqual(system_info['gateway_address'], 'localhost')
         self.assertEqual(system_info['gateway_port'], 50051)
 
+    @patch('gateway_manager.services.grpc_client.grpc.channel_ready_future')
+    @patch('gateway_manager.services.grpc_client.grpc.insecure_channel')
+    @patch('gateway_manager.services.grpc_client.gateway_agent_pb2_grpc.GatewayAgentStub')
+    def test_get_system_info_concurrent(self, MockStub, MockChannel, MockChannelReady):
+        mock_stub_instance = MockFutureGatewayAgentStub()
+        MockStub.return_value = mock_stub_instance
+
+        system_info = self.client.get_system_info(concurrent=True, deadline=5)
+
+        self.assertEqual(system_info['status'], 'online')
+        self.assertEqual(system_info['uptime'], '1d 2h 3m')
+        self.assertEqual(system_info['cpu_usage'], '25.5%')
+        self.assertEqual(system_info['memory_usage'], '40.0%')
+        self.assertEqual(system_info['errors'], {})
+        mock_stub_instance.Uptime.future.assert_called_once()
+        mock_stub_instance.CpuUsage.future.assert_called_once()
+        mock_stub_instance.MemoryUsage.future.assert_called_once()
+
+    @patch('gateway_manager.services.grpc_client.grpc.channel_ready_future')
+    @patch('gateway_manager.services.grpc_client.grpc.insecure_channel')
+    @patch('gateway_manager.services.grpc_client.gateway_agent_pb2_grpc.GatewayAgentStub')
+    def test_get_system_info_concurrent_partial(self, MockStub, MockChannel, MockChannelReady):
+        MockStub.return_value = MockFutureGatewayAgentStub(cpu_error=grpc.RpcError("CPU probe failed"))
+
+        system_info = self.client.get_system_info(concurrent=True, deadline=5)
+
+        self.assertEqual(system_info['status'], 'online')
+        self.assertIsNone(system_info['cpu_usage'])
+        self.assertEqual(system_info['memory_usage'], '40.0%')
+        self.assertIn('cpu_usage', system_info['errors'])
+        self.assertIsNone(system_info['error'])
+
+    @patch('gateway_manager.services.grpc_client.grpc.channel_ready_future')
+    @patch('gateway_manager.services.grpc_client.grpc.insecure_channel')
+    def test_get_system_info_concurrent_unreachable(self, MockChannel, MockChannelReady):
+        MockChannelReady.return_value.result.side_effect = grpc.FutureTimeoutError()
+
+        system_info = self.client.get_system_info(concurrent=True, deadline=1)
+
+        self.assertEqual(system_info['status'], 'offline')
+        self.assertIsNotNone(system_info['error'])
+
+
+    def test_closing_a_stream_aborts_its_connect_without_blocking(self):
+        # nothing listens on port 1: the channel never becomes ready
+        client = GatewayGRPCClient("127.0.0.1", 1, timeout=5)
+        results = []
+        connecting = threading.Thread(target=lambda: results.append(client.create_streaming_connection("s1")))
+        connecting.start()
+        time.sleep(0.2)
+
+        started = time.monotonic()
+        client.close_streaming_connection("s1")
+        self.assertLess(time.monotonic() - started, 0.5)
+
+        connecting.join(timeout=2)
+        self.assertFalse(connecting.is_alive())
+        self.assertEqual(results, [None])
+        self.assertEqual(client._streaming_connections, {})
+
+
+class TestGatewayChannelPool(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = GatewayChannelPool(idle_timeout=60)
+
+    @patch('gateway_manager.services.grpc_client.grpc.channel_ready_future')
+    @patch('gateway_manager.services.grpc_client.grpc.insecure_channel')
+    def test_channel_reused_per_connection_string(self, MockChannel, MockChannelReady):
+        MockChannel.side_effect = lambda *args, **kwargs: MagicMock()
+
+        first = self.pool.acquire("1.1.1.1:50051", timeout=1)
+        second = self.pool.acquire("1.1.1.1:50051", timeout=1)
+        other = self.pool.acquire("2.2.2.2:50051", timeout=1)
+
+        self.assertIs(first, second)
+        self.assertIsNot(first, other)
+        self.assertEqual(MockChannel.call_count, 2)
+        MockChannel.assert_any_call("1.1.1.1:50051", options=ANY)
+        stats = self.pool.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 2)
+        self.assertEqual(stats['size'], 2)
+
+    @patch('gateway_manager.services.grpc_client.grpc.channel_ready_future')
+    @patch('gateway_manager.services.grpc_client.grpc.insecure_channel')
+    def test_failed_channel_is_dropped(self, MockChannel, MockChannelReady):
+        mock_channel = MagicMock()
+        MockChannel.return_value = mock_channel
+        MockChannelReady.return_value.result.side_effect = grpc.FutureTimeoutError()
+
+        with self.assertRaises(grpc.FutureTimeoutError):
+            self.pool.acquire("1.1.1.1:50051", timeout=1)
+
+        mock_channel.close.assert_called_once()
+        self.assertEqual(self.pool.stats()['size'], 0)
+
+    @patch('gateway_manager.services.grpc_client.grpc.channel_ready_future')
+    @patch('gateway_manager.services.grpc_client.grpc.insecure_channel')
+    def test_only_new_channels_are_waited_for(self, MockChannel, MockChannelReady):
+        mock_channel = MagicMock()
+        MockChannel.return_value = mock_channel
+
+        self.pool.acquire("1.1.1.1:50051", timeout=1)
+        self.pool.acquire("1.1.1.1:50051", timeout=1)
+
+        MockChannelReady.assert_called_once()
+        # no connectivity watcher: grpc would poll it on a thread of its own
+        mock_channel.subscribe.assert_not_called()
+
+    @patch('gateway_manager.services.grpc_client.grpc.channel_ready_future')
+    @patch('gateway_manager.services.grpc_client.grpc.insecure_channel')
+    def test_unavailable_channel_is_reopened(self, MockChannel, MockChannelReady):
+        MockChannel.side_effect = lambda *args, **kwargs: MagicMock()
+        unavailable = grpc.RpcError()
+        unavailable.code = lambda: grpc.StatusCode.UNAVAILABLE
+        other = grpc.RpcError()
+        other.code = lambda: grpc.StatusCode.INTERNAL
+
+        first = self.pool.acquire("1.1.1.1:50051", timeout=1)
+        self.pool.report_error("1.1.1.1:50051", first, other)
+        self.assertIs(self.pool.acquire("1.1.1.1:50051", timeout=1), first)
+        self.pool.report_error("1.1.1.1:50051", first, unavailable)
+        second = self.pool.acquire("1.1.1.1:50051", timeout=1)
+
+        self.assertIsNot(first, second)
+        first.close.assert_called_once()
+        self.assertEqual(self.pool.stats()['reconnects'], 1)
+
+    @patch('gateway_manager.services.grpc_client.grpc.channel_ready_future')
+    @patch('gateway_manager.services.grpc_client.grpc.insecure_channel')
+    @patch('gateway_manager.services.grpc_client.gateway_agent_pb2_grpc.GatewayAgentStub')
+    def test_unavailable_rpc_drops_client_channel(self, MockStub, MockChannel, MockChannelReady):
+        MockChannel.side_effect = lambda *args, **kwargs: MagicMock()
+        unavailable = grpc.RpcError()
+        unavailable.code = lambda: grpc.StatusCode.UNAVAILABLE
+        MockStub.return_value.Uptime.side_effect = unavailable
+        client = GatewayGRPCClient("1.1.1.1", 50051, channel_pool=self.pool)
+
+        self.assertIsNone(client.get_uptime())
+
+        self.assertEqual(self.pool.stats()['size'], 0)
+
+    @patch('gateway_manager.services.grpc_client.grpc.channel_ready_future')
+    @patch('gateway_manager.services.grpc_client.grpc.insecure_channel')
+    def test_idle_channels_are_evicted(self, MockChannel, MockChannelReady):
+        mock_channel = MagicMock()
+        MockChannel.return_value = mock_channel
+        self.pool.idle_timeout = 0
+
+        self.pool.acquire("1.1.1.1:50051", timeout=1)
+        self.pool.evict_idle()
+
+        mock_channel.close.assert_called_once()
+        self.assertEqual(self.pool.stats()['evictions'], 1)
+
+
+class TestSystemInfoCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = SystemInfoCache(ttl=60)
+
+    def test_hit_within_ttl(self):
+        loader = Mock(return_value={"status": "online"})
+
+        first = self.cache.get("1.1.1.1:50051", loader)
+        second = self.cache.get("1.1.1.1:50051", loader)
+
+        self.assertEqual(first, second)
+        loader.assert_called_once()
+        self.assertEqual(self.cache.stats()['hits'], 1)
+        self.assertEqual(self.cache.stats()['misses'], 1)
+
+    def test_callers_cannot_change_cached_snapshot(self):
+        loader = Mock(return_value={"status": "online", "errors": {}})
+
+        first = self.cache.get("1.1.1.1:50051", loader)
+        first['errors']['cpu_usage'] = "boom"
+        second = self.cache.get("1.1.1.1:50051", loader)
+        second['errors']['memory_usage'] = "boom"
+
+        self.assertEqual(self.cache.get("1.1.1.1:50051", loader)['errors'], {})
+        self.assertEqual(self.cache.peek("1.1.1.1:50051")['errors'], {})
+
+    def test_expired_entry_is_reloaded(self):
+        self.cache.ttl = 0
+        loader = Mock(return_value={"status": "online"})
+
+        self.cache.get("1.1.1.1:50051", loader)
+        self.cache.get("1.1.1.1:50051", loader)
+
+        self.assertEqual(loader.call_count, 2)
+
+    def test_concurrent_misses_are_coalesced(self):
+        release = threading.Event()
+        loader = Mock(side_effect=lambda: release.wait(1) and {"status": "online"})
+        results = []
+
+        def worker():
+            results.append(self.cache.get("1.1.1.1:50051", loader))
+
+        threads = [threading.Thread(target=worker) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for _ in range(1000):
+            if self.cache.stats()['coalesced'] == 4:
+                break
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join(1)
+
+        loader.assert_called_once()
+        self.assertEqual(results, [{"status": "online"}] * 5)
+
+    def test_loader_error_is_shared_and_not_cached(self):
+        loader = Mock(side_effect=RuntimeError("agent down"))
+
+        with self.assertRaises(RuntimeError):
+            self.cache.get("1.1.1.1:50051", loader)
+        loader.side_effect = None
+        loader.return_value = {"status": "online"}
+
+        self.assertEqual(self.cache.get("1.1.1.1:50051", loader), {"status": "online"})
+
 
 class TestGatewayGRPCManager(unittest.TestCase):
     def setUp(self):
@@ -114,7 +358,9 @@ class TestGatewayGRPCManager(unittest.TestCase):
         
         client = self.manager.get_client("1.2.3.4", 50051)
 
-        MockClient.assert_called_once_with(gateway_address="1.2.3.4", gateway_port=50051)
+        MockClient.assert_called_once_with(
+            gateway_address="1.2.3.4", gateway_port=50051, channel_pool=self.manager.channel_pool
+        )
         self.assertEqual(self.manager.clients.get("1.2.3.4:50051"), mock_client_instance) # dic?
         self.assertEqual(client, mock_client_instance)
 
@@ -156,6 +402,50 @@ class TestGatewayGRPCManager(unittest.TestCase):
             self.assertEqual(results["1"]["uptime"], "1d")
             self.assertEqual(results["2"]["uptime"], "2d")
 
+    def test_get_all_gateways_info_keeps_failed_gateways(self):
+        gateways = [Mock(id=i, address=f"{i}.{i}.{i}.{i}", port=50051) for i in (1, 2, 3)]
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def get_system_info(address, port):
+            if address == "2.2.2.2":
+                raise ConnectionError("unreachable")
+            if address == "3.3.3.3":
+                release.wait(5)
+            return {"status": "online", "uptime": "1d"}
+
+        with patch.object(self.manager, 'get_system_info', side_effect=get_system_info):
+            started = time.monotonic()
+            results = self.manager.get_all_gateways_info(gateways, timeout=0.2)
+
+        # one deadline for all of them, not one per gateway
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(results["1"]["status"], "online")
+        self.assertEqual((results["2"]["status"], results["2"]["error"]), ("offline", "unreachable"))
+        self.assertEqual(results["3"]["status"], "offline")
+        self.assertIn("Timed out", results["3"]["error"])
+
+    def test_get_system_info_uses_cache(self):
+        with patch.object(self.manager, 'get_client') as mock_get_client:
+            mock_get_client.return_value.get_system_info.return_value = {"status": "online"}
+
+            self.manager.get_system_info("1.1.1.1", 50051)
+            info = self.manager.get_system_info("1.1.1.1", 50051)
+
+            self.assertEqual(info, {"status": "online"})
+            mock_get_client.return_value.get_system_info.assert_called_once_with(concurrent=True)
+            self.assertEqual(self.manager.get_cache_stats()['hits'], 1)
+
+    def test_refresh_bypasses_and_fills_cache(self):
+        with patch.object(self.manager, 'get_client') as mock_get_client:
+            mock_get_client.return_value.get_system_info.side_effect = [{"cpu_usage": 1}, {"cpu_usage": 2}]
+
+            self.manager.get_system_info("1.1.1.1", 50051)
+            fresh = self.manager.refresh_system_info("1.1.1.1", 50051)
+
+            self.assertEqual(fresh, {"cpu_usage": 2})
+            self.assertEqual(self.manager.get_system_info("1.1.1.1", 50051), {"cpu_usage": 2})
+
     @patch('gateway_manager.services.grpc_client.GatewayGRPCClient')
     def test_test_gateway_connection_success(self, MockClient):
         mock_client_instance = Mock()
@@ -0,0 +1,108 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import Mock
+
+from gateway_manager.services.log_archive import INDEX_RECORD, LogArchive
+
+
+class TestLogArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        self.archive = LogArchive(directory=self.directory, segment_bytes=200, block_lines=3, block_delay=60,
+                                  retention_seconds=10 ** 12)
+
+    def _fill(self, gateway_id="1", log_type=2, count=10, start=1000.0):
+        for i in range(count):
+            self.archive.append(gateway_id, log_type, f"line {i}", received_at=start + i)
+        self.archive.flush()
+
+    def test_disabled_without_directory(self):
+        archive = LogArchive()
+        archive.append("1", 2, "line")
+
+        self.assertFalse(archive.enabled)
+        self.assertEqual(archive.read("1"), [])
+
+    def test_blocks_are_indexed_and_segments_rotate(self):
+        self._fill(count=30)
+        directory = os.path.join(self.directory, "1", "2")
+        segments = sorted(name for name in os.listdir(directory) if name.endswith(".seg"))
+        indexes = sorted(name for name in os.listdir(directory) if name.endswith(".idx"))
+
+        self.assertGreater(len(segments), 1)
+        self.assertEqual([name[:-4] for name in segments], [name[:-4] for name in indexes])
+        for name in indexes:
+            self.assertEqual(os.path.getsize(os.path.join(directory, name)) % INDEX_RECORD.size, 0)
+
+    def test_read_time_range(self):
+        self._fill(count=30)
+
+        lines = self.archive.read("1", start=1005, end=1020)
+
+        self.assertEqual([line for _, _, line in lines], [f"line {i}" for i in range(5, 21)])
+        self.assertEqual(lines[0], (1005.0, 2, "line 5"))
+
+    def test_read_limit_and_merge_log_types(self):
+        self._fill(log_type=0, count=5, start=1000.5)
+        self._fill(log_type=2, count=5, start=1000.0)
+
+        lines = self.archive.read("1", first=4)
+
+        self.assertEqual([(ts, log_type) for ts, log_type, _ in lines],
+                         [(1000.0, 2), (1000.5, 0), (1001.0, 2), (1001.5, 0)])
+        self.assertEqual(len(self.archive.read("1", log_type=0)), 5)
+
+    def test_retention_removes_expired_segments(self):
+        self._fill(count=30)
+        self.archive.retention_seconds = 10
+
+        removed = self.archive.enforce_retention(now=1035)
+
+        self.assertGreater(removed, 0)
+        remaining = [line for _, _, line in self.archive.read("1")]
+        self.assertNotIn("line 0", remaining)
+        self.assertIn("line 25", remaining)
+        self.assertEqual(remaining[-1], "line 29")
+
+    def test_blocks_are_written_on_the_archive_thread(self):
+        listener = Mock()
+        threads = []
+        listener.on_block.side_effect = lambda block, lines: threads.append(threading.current_thread().name)
+        self.archive.add_listener(listener)
+
+        self._fill(count=6)
+
+        self.assertEqual(set(threads), {"log_archive_writer"})
+
+    def test_partial_block_is_written_after_block_delay(self):
+        self.archive.block_delay = 0.05
+        written = threading.Event()
+        self.archive.add_listener(Mock(on_block=lambda block, lines: written.set()))
+
+        self.archive.append("1", 2, "lonely line", received_at=1000.0)
+
+        self.assertTrue(written.wait(1))
+        self.assertEqual([line for _, _, line in self.archive.read("1")], ["lonely line"])
+
+    def test_retention_runs_periodically_without_new_lines(self):
+        self.archive = LogArchive(directory=self.directory, segment_bytes=200, block_lines=3, block_delay=60,
+                                  retention_seconds=10 ** 12, retention_interval=0.05)
+        self._fill(count=30)
+        removed = threading.Event()
+        self.archive.add_listener(Mock(on_segment_removed=lambda segment_path: removed.set()))
+
+        # a quiet gateway: nothing rotates any more, the timer alone expires its segments
+        self.archive.retention_seconds = time.time() - 1020
+
+        self.assertTrue(removed.wait(1))
+        self.assertNotIn("line 0", [line for _, _, line in self.archive.read("1")])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import unittest
+
+from gateway_manager.constants import LogType
+from gateway_manager.utils.log_parser import LogLineParser, build_log_filter, normalize_log_level
+
+
+class TestLogLineParser(unittest.TestCase):
+
+    def test_parse_agent_line(self):
+        parser = LogLineParser(LogType.GATEWAY_AGENT)
+
+        entry = parser.parse("2161.10.09-04:48:17.482|W]: Disk space check: /var/log - 91% used\r")
+
+        self.assertEqual(entry, {
+            'timestamp': "2161.10.09-04:48:17.482",
+            'log_level': "WARNING",
+            'service_type': "AGENT",
+            'message': "Disk space check: /var/log - 91% used",
+        })
+        self.assertEqual(parser.detected_format.name, "agent")
+
+    def test_parse_iso_line_with_module(self):
+        parser = LogLineParser(LogType.SETTING)
+
+        entry = parser.parse("2025-01-31 10:15:42,123 [DEBUG] [NET] Cache size: 120 entries")
+
+        self.assertEqual(entry['timestamp'], "2025-01-31 10:15:42,123")
+        self.assertEqual(entry['log_level'], "DEBUG")
+        self.assertEqual(entry['service_type'], "NET")
+        self.assertEqual(entry['message'], "Cache size: 120 entries")
+
+    def test_parse_syslog_line_takes_level_from_text(self):
+        parser = LogLineParser(LogType.CONTROLLER)
+
+        entry = parser.parse("Jan 31 10:15:42 gw-01 controller[812]: ERROR route table sync failed")
+
+        self.assertEqual(entry['timestamp'], "Jan 31 10:15:42")
+        self.assertEqual(entry['log_level'], "ERROR")
+        self.assertEqual(entry['service_type'], "controller")
+
+    def test_detected_format_switches_when_stream_changes(self):
+        parser = LogLineParser(LogType.GATEWAY_AGENT)
+        parser.parse("2161.10.09-04:48:17.482|I]: started")
+
+        entry = parser.parse("2025-01-31T10:15:42Z ERROR lost controller")
+
+        self.assertEqual(parser.detected_format.name, "iso")
+        self.assertEqual(entry['log_level'], "ERROR")
+
+    def test_unstructured_line_keeps_defaults(self):
+        parser = LogLineParser(LogType.CONTROLLER)
+
+        entry = parser.parse("plain text without a prefix")
+
+        self.assertEqual(entry['timestamp'], "")
+        self.assertEqual(entry['log_level'], "INFO")
+        self.assertEqual(entry['service_type'], "CONTROLLER")
+        self.assertEqual(entry['message'], "plain text without a prefix")
+
+    def test_normalize_log_level(self):
+        self.assertEqual(normalize_log_level("e"), "ERROR")
+        self.assertEqual(normalize_log_level("WARN"), "WARNING")
+        self.assertEqual(normalize_log_level("unknown"), "INFO")
+        self.assertEqual(normalize_log_level(None), "INFO")
+
+
+
+class TestBuildLogFilter(unittest.TestCase):
+
+    def setUp(self):
+        self.parser = LogLineParser(LogType.GATEWAY_AGENT)
+
+    def _entry(self, line):
+        entry = self.parser.parse(line)
+        entry['line'] = line
+        return entry
+
+    def test_no_arguments_means_no_filter(self):
+        self.assertIsNone(build_log_filter())
+        self.assertIsNone(build_log_filter(min_level="TRACE"))
+
+    def test_min_level(self):
+        log_filter = build_log_filter(min_level="warn")
+
+        self.assertTrue(log_filter(self._entry("2161.10.09-04:48:17.482|E]: failed")))
+        self.assertTrue(log_filter(self._entry("2161.10.09-04:48:17.482|W]: slow")))
+        self.assertFalse(log_filter(self._entry("2161.10.09-04:48:17.482|I]: ok")))
+
+    def test_contains_and_regex_are_combined(self):
+        log_filter = build_log_filter(contains="controller", regex=r"\d+# tries")
+
+        self.assertTrue(log_filter(self._entry("Failed to connect to controller: 10.0.0.1 with 12# tries.")))
+        self.assertFalse(log_filter(self._entry("Failed to connect to controller: 10.0.0.1")))
+        self.assertFalse(log_filter(self._entry("Retry 12# tries")))
+
+    def test_invalid_arguments_raise(self):
+        with self.assertRaises(ValueError):
+            build_log_filter(min_level="LOUD")
+        with self.assertRaises(ValueError):
+            build_log_filter(regex="(unclosed")
+
+    def test_catastrophic_regexes_are_rejected(self):
+        for regex in [r"(a+)+$", r"(.*,)*x", r"(?:\w+\s?)*!", r"((ab)*c)+", r"(a)\1", "a" * 300,
+                      r"(a|a)*b", r"(a|ab)*c", r"(?:x|X)+y", r"(?P<x>a)(?P=x)", r"(?x)a+"]:
+            with self.subTest(regex=regex), self.assertRaises(ValueError):
+                build_log_filter(regex=regex)
+
+    def test_bounded_nesting_is_allowed(self):
+        for regex in [r"(\d{2}:)+", r"(?:error|warn)+", r"^\d+\.\d+ .*timeout", r"(a|b){1,3}x+",
+                      r"(a|a)?b", r"[(|]+x"]:
+            with self.subTest(regex=regex):
+                self.assertIsNotNone(build_log_filter(regex=regex))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import shutil
+import tempfile
+import unittest
+
+from gateway_manager.services.log_archive import LogArchive
+from gateway_manager.services.log_search import LogSearchIndex, tokenize
+
+
+class TestLogSearchIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        self.archive = LogArchive(directory=self.directory, segment_bytes=300, block_lines=2, block_delay=60,
+                                  retention_seconds=10 ** 12)
+        self.index = LogSearchIndex(self.archive)
+        self.addCleanup(self.index.stop)
+
+    def _archive(self, gateway_id, lines, start=1000.0):
+        for i, line in enumerate(lines):
+            self.archive.append(gateway_id, 2, line, received_at=start + i)
+        self.archive.flush()
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("Failed to connect: 10.0.0.1"), {"failed", "to", "connect", "10"})
+
+    def test_blocks_are_indexed_as_archived(self):
+        self._archive("1", ["link up", "link down", "controller lost", "controller back"])
+
+        hits, has_next_page = self.index.search("controller lost")
+
+        self.assertEqual([(hit.gateway_id, hit.line) for hit in hits], [("1", "controller lost")])
+        self.assertFalse(has_next_page)
+        self.assertEqual(len(self.index), 2)
+
+    def test_filters_by_gateway_and_time(self):
+        self._archive("1", ["ERROR disk full", "ok"], start=1000)
+        self._archive("2", ["ERROR disk full", "ok"], start=2000)
+
+        hits, _ = self.index.search("disk full", gateway_ids=["2"])
+        self.assertEqual([hit.gateway_id for hit in hits], ["2"])
+
+        hits, _ = self.index.search("disk full", start=500, end=1500)
+        self.assertEqual([hit.received_at for hit in hits], [1000])
+
+    def test_paging_newest_first(self):
+        self._archive("1", [f"retry {i}" for i in range(6)])
+
+        page, has_next_page = self.index.search("retry", first=2, offset=1)
+
+        self.assertEqual([hit.line for hit in page], ["retry 4", "retry 3"])
+        self.assertTrue(has_next_page)
+
+    def test_refresh_indexes_blocks_written_elsewhere_once(self):
+        self._archive("1", ["boot complete", "link up"])
+        # another process's index: it never saw these blocks being written
+        other = LogSearchIndex(LogArchive(directory=self.directory))
+
+        self.assertEqual(other.refresh(), 1)
+        self.assertEqual(other.refresh(), 0)
+
+        hits, _ = other.search("boot")
+        self.assertEqual(len(hits), 1)
+        self.assertEqual(len(other), 1)
+
+    def test_refresh_forgets_segments_removed_elsewhere(self):
+        self._archive("1", [f"heartbeat {i}" for i in range(20)])
+        other = LogSearchIndex(LogArchive(directory=self.directory))
+        other.refresh()
+        self.archive.retention_seconds = 5
+
+        self.archive.enforce_retention(now=1030)
+        other.refresh()
+
+        self.assertEqual(len(other), len(self.index))
+
+    def test_partial_words_match_like_substrings(self):
+        self._archive("1", ["connection refused", "disk error", "a: b", "reconnected"])
+
+        for query, expected in [
+            ("conn", ["reconnected", "connection refused"]),
+            ("rror", ["disk error"]),
+            ("k err", ["disk error"]),
+            ("ection ref", ["connection refused"]),
+            ("d", ["reconnected", "disk error", "connection refused"]),
+            (": b", ["a: b"]),
+            ("connection refusal", []),
+        ]:
+            with self.subTest(query=query):
+                hits, _ = self.index.search(query)
+                self.assertEqual([hit.line for hit in hits], expected)
+
+    def test_removed_segments_leave_the_index(self):
+        self._archive("1", [f"heartbeat {i}" for i in range(20)])
+        self.archive.retention_seconds = 5
+
+        self.archive.enforce_retention(now=1030)
+        hits, _ = self.index.search("heartbeat", first=100)
+
+        self.assertTrue(hits)
+        self.assertNotIn("heartbeat 0", [hit.line for hit in hits])
+        partial, _ = self.index.search("eartbea", first=100)
+        self.assertEqual(partial, hits)
+
+    def test_scan_without_index_terms_is_capped(self):
+        self._archive("1", ["a one", "a two", "a three", "a four", "a five", "a six"])
+        self.index.max_scan_blocks = 2
+
+        hits, has_next_page = self.index.search("a", first=100)
+
+        self.assertEqual([hit.line for hit in hits], ["a six", "a five", "a four", "a three"])
+        self.assertFalse(has_next_page)
+        # a word the index can look up is not capped
+        hits, _ = self.index.search("a one", first=100)
+        self.assertEqual([hit.line for hit in hits], ["a one"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,298 @@
+import queue
+import threading
+import unittest
+from unittest.mock import Mock, patch
+
+from gateway_manager.services.log_streams import (
+    LiveLogMultiplexer, LiveLogUpstream, LogRateLimiter, ReplayFilter
+)
+
+
+class FakeAgentStream:
+    """Blocking log generator fed by the test, ended by stop_live_logs_stream."""
+
+    def __init__(self):
+        self.lines = queue.Queue()
+        self.closed = threading.Event()
+
+    def generator(self, *args, **kwargs):
+        while not self.closed.is_set():
+            try:
+                yield self.lines.get(timeout=0.01)
+            except queue.Empty:
+                continue
+
+    def close(self, *args, **kwargs):
+        self.closed.set()
+
+
+class TestLiveLogMultiplexer(unittest.TestCase):
+
+    def setUp(self):
+        self.stream = FakeAgentStream()
+        patcher = patch('gateway_manager.services.log_streams.grpc_manager')
+        self.grpc_manager = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.grpc_manager.iter_live_logs_stream.side_effect = self.stream.generator
+        self.grpc_manager.stop_live_logs_stream.side_effect = self.stream.close
+
+        # stream threads must end before the patch goes away, or their cleanup hits the next test's mock
+        threads_before = set(threading.enumerate())
+        self.addCleanup(self._join_new_threads, threads_before)
+        self.multiplexer = LiveLogMultiplexer()
+        self.addCleanup(self.multiplexer.stop_all)
+        self.gateway = Mock(id=1, address="1.1.1.1", port=50051)
+
+    def _join_new_threads(self, threads_before):
+        for thread in set(threading.enumerate()) - threads_before:
+            if thread.name.startswith("logs_"):
+                thread.join(timeout=1)
+
+    def _collector(self):
+        received = queue.Queue()
+        return received, lambda entry: received.put(entry['line'])
+
+    def test_one_upstream_for_many_subscribers(self):
+        first, first_sink = self._collector()
+        second, second_sink = self._collector()
+
+        key = self.multiplexer.subscribe(self.gateway, "a", first_sink, log_type=2)
+        self.assertEqual(self.multiplexer.subscribe(self.gateway, "b", second_sink, log_type=2), key)
+        self.stream.lines.put("Log line 1")
+
+        self.assertEqual(first.get(timeout=1), "Log line 1")
+        self.assertEqual(second.get(timeout=1), "Log line 1")
+        self.grpc_manager.iter_live_logs_stream.assert_called_once()
+
+    def test_lines_are_parsed_once_for_all_subscribers(self):
+        first, second = queue.Queue(), queue.Queue()
+        self.multiplexer.subscribe(self.gateway, "a", first.put, log_type=2)
+        self.multiplexer.subscribe(self.gateway, "b", second.put, log_type=2)
+        self.stream.lines.put("2161.10.09-04:48:17.482|E]: Failed to connect\r")
+
+        entry = first.get(timeout=1)
+        self.assertIs(second.get(timeout=1), entry)
+        self.assertEqual(entry['log_level'], "ERROR")
+        self.assertEqual(entry['timestamp'], "2161.10.09-04:48:17.482")
+        self.assertEqual(entry['message'], "Failed to connect")
+
+    def test_late_subscriber_gets_backlog(self):
+        first, first_sink = self._collector()
+        key = self.multiplexer.subscribe(self.gateway, "a", first_sink, log_type=2, line_count=2)
+        for i in range(3):
+            self.stream.lines.put(f"Log line {i + 1}")
+        for _ in range(3):
+            first.get(timeout=1)
+
+        late, late_sink = self._collector()
+        self.multiplexer.subscribe(self.gateway, "b", late_sink, log_type=2, line_count=2)
+        # the backlog isn't sized by the first subscriber's line_count
+        everything, everything_sink = self._collector()
+        self.multiplexer.subscribe(self.gateway, "c", everything_sink, log_type=2)
+
+        self.assertEqual([late.get(timeout=1), late.get(timeout=1)], ["Log line 2", "Log line 3"])
+        self.assertTrue(late.empty())
+        self.assertEqual([everything.get(timeout=1) for _ in range(3)], ["Log line 1", "Log line 2", "Log line 3"])
+        self.assertIsNotNone(self.multiplexer.get_upstream(key))
+
+    def test_last_unsubscribe_closes_upstream(self):
+        key = self.multiplexer.subscribe(self.gateway, "a", Mock(), log_type=2)
+        self.multiplexer.subscribe(self.gateway, "b", Mock(), log_type=2)
+
+        self.multiplexer.unsubscribe(key, "a")
+        self.assertFalse(self.stream.closed.is_set())
+
+        self.multiplexer.unsubscribe(key, "b")
+        self.assertTrue(self.stream.closed.is_set())
+        self.assertIsNone(self.multiplexer.get_upstream(key))
+
+    def test_sequence_survives_a_new_upstream(self):
+        first, first_sink = self._collector()
+        key = self.multiplexer.subscribe(self.gateway, "a", first_sink, log_type=2)
+        self.stream.lines.put("Log line 1")
+        self.stream.lines.put("Log line 2")
+        first.get(timeout=1)
+        first.get(timeout=1)
+        self.multiplexer.unsubscribe(key, "a")
+
+        epoch = self.multiplexer._resume_states[key][0]
+
+        resumed = queue.Queue()
+        self.multiplexer.subscribe(self.gateway, "b", resumed.put, log_type=2, after_seq=1, epoch=epoch)
+
+        entry = resumed.get(timeout=1)
+        self.assertEqual((entry['seq'], entry['line'], entry['epoch']), (2, "Log line 2", epoch))
+        self.assertTrue(resumed.empty())
+
+    def test_after_seq_of_a_forgotten_stream_signals_restart(self):
+        received = queue.Queue()
+        self.multiplexer.subscribe(self.gateway, "a", received.put, log_type=2, after_seq=5)
+        self.stream.lines.put("Log line 1")
+
+        marker = received.get(timeout=1)
+        self.assertTrue(marker['restarted'])
+        self.assertEqual(marker['after_seq'], 5)
+        entry = received.get(timeout=1)
+        self.assertEqual((entry['seq'], entry['epoch']), (1, marker['epoch']))
+
+    def test_different_log_types_use_separate_streams(self):
+        first = self.multiplexer.subscribe(self.gateway, "a", Mock(), log_type=0)
+        second = self.multiplexer.subscribe(self.gateway, "a", Mock(), log_type=2)
+
+        self.assertNotEqual(first, second)
+
+
+class TestReplayFilter(unittest.TestCase):
+
+    def _feed(self, replay_filter, lines):
+        fresh = []
+        for line in lines:
+            fresh.extend(replay_filter.feed(line))
+        return fresh
+
+    def test_drops_replayed_suffix(self):
+        replay_filter = ReplayFilter(["a", "b", "c", "d"])
+
+        self.assertEqual(self._feed(replay_filter, ["c", "d", "e", "f"]), ["e", "f"])
+
+    def test_prefers_longest_overlap_with_repeated_lines(self):
+        replay_filter = ReplayFilter(["x", "ok", "ok"])
+
+        self.assertEqual(self._feed(replay_filter, ["x", "ok", "ok", "ok"]), ["ok"])
+
+    def test_no_overlap_keeps_everything(self):
+        replay_filter = ReplayFilter(["a", "b"])
+
+        self.assertEqual(self._feed(replay_filter, ["z", "b", "y"]), ["z", "b", "y"])
+        self.assertTrue(replay_filter.done)
+
+    def test_nothing_seen(self):
+        self.assertEqual(self._feed(ReplayFilter([]), ["a"]), ["a"])
+
+
+class TestLiveLogUpstreamAfterSeq(unittest.TestCase):
+
+    def setUp(self):
+        self.upstream = LiveLogUpstream(("1", 2, ""), "1.1.1.1", 50051, line_count=2, on_finished=Mock(),
+                                        backlog_lines=3)
+        for line in ["a", "b", "c", "d"]:
+            self.upstream.publish(line)
+
+    def _subscribe(self, **kwargs):
+        received = []
+        self.upstream.add_subscriber("a", received.append, **kwargs)
+        return received
+
+    def test_resumes_within_backlog(self):
+        received = self._subscribe(after_seq=2, epoch=self.upstream.epoch)
+
+        self.assertEqual([e['line'] for e in received], ["c", "d"])
+
+    def test_other_epoch_signals_restart(self):
+        received = self._subscribe(after_seq=2, epoch="gone")
+
+        self.assertTrue(received[0]['restarted'])
+        self.assertEqual([e['line'] for e in received[1:]], ["c", "d"])
+
+    def test_lines_no_longer_in_backlog_signal_restart(self):
+        received = self._subscribe(after_seq=0, line_count=3)
+
+        self.assertEqual((received[0]['restarted'], received[0]['epoch']), (True, self.upstream.epoch))
+        self.assertEqual([e['line'] for e in received[1:]], ["b", "c", "d"])
+
+    def test_line_count_is_capped_by_backlog(self):
+        self.assertEqual(LiveLogUpstream(("1", 2, ""), "1.1.1.1", 50051, line_count=500, on_finished=Mock(),
+                                         backlog_lines=3).line_count, 3)
+
+    def test_stream_of_the_same_key_gets_its_own_id(self):
+        successor = LiveLogUpstream(("1", 2, ""), "1.1.1.1", 50051, line_count=2, on_finished=Mock(),
+                                    resume_from=self.upstream.resume_state())
+
+        self.assertEqual(successor.epoch, self.upstream.epoch)
+        self.assertNotEqual(successor.stream_id, self.upstream.stream_id)
+
+
+class TestLiveLogUpstreamResume(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch('gateway_manager.services.log_streams.grpc_manager')
+        self.grpc_manager = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.upstream = LiveLogUpstream(("1", 2, ""), "1.1.1.1", 50051, line_count=10, on_finished=Mock(),
+                                        reconnect_delay=0.01, resume_lines=2)
+        self.received = []
+        self.upstream.add_subscriber("a", self.received.append)
+
+    def test_reconnect_requests_overlap_and_skips_replay(self):
+        for line in ["a", "b", "c"]:
+            self.upstream.publish(line)
+        self.grpc_manager.iter_live_logs_stream.return_value = iter(["b", "c", "d"])
+
+        self.assertTrue(self.upstream._stream_once())
+
+        self.assertEqual([(e['seq'], e['line']) for e in self.received[3:]], [(4, "d")])
+        self.assertEqual(self.grpc_manager.iter_live_logs_stream.call_args[0][-1], 2)
+
+    def test_run_reconnects_after_errors(self):
+        def failing(*args, **kwargs):
+            raise RuntimeError("stream reset")
+            yield
+
+        def streaming(*args, **kwargs):
+            yield "x"
+            self.upstream.stop()
+
+        self.grpc_manager.iter_live_logs_stream.side_effect = [failing(), streaming()]
+
+        self.upstream._run()
+
+        self.assertEqual([e['line'] for e in self.received], ["x"])
+        self.assertEqual(self.upstream.reconnects, 1)
+        self.upstream.on_finished.assert_called_once_with(self.upstream)
+
+
+class TestLogRateLimiter(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 100.0
+
+    def _clock(self):
+        return self.now
+
+    def test_token_bucket_refills_over_time(self):
+        limiter = LogRateLimiter(max_per_second=2, burst=2, report_interval=1, clock=self._clock)
+
+        self.assertEqual([limiter.allow() for _ in range(4)], [True, True, False, False])
+        self.now += 0.5
+        self.assertTrue(limiter.allow())
+        self.assertFalse(limiter.allow())
+        self.assertEqual(limiter.dropped, 3)
+
+    def test_sampling_keeps_one_in_n(self):
+        limiter = LogRateLimiter(sample_every=3, clock=self._clock)
+
+        self.assertEqual([limiter.allow() for _ in range(6)], [False, False, True, False, False, True])
+        self.assertEqual(limiter.total_dropped, 4)
+
+    def test_one_report_in_flight_per_interval(self):
+        limiter = LogRateLimiter(max_per_second=1, burst=1, report_interval=1, clock=self._clock)
+        limiter.allow()
+        limiter.allow()
+
+        self.assertTrue(limiter.report_due())
+        limiter.allow()
+        self.assertFalse(limiter.report_due())
+        self.assertEqual(limiter.take_dropped(), 2)
+
+        limiter.allow()
+        self.assertFalse(limiter.report_due())
+        self.now += 1
+        self.assertTrue(limiter.report_due())
+
+    def test_unlimited(self):
+        self.assertTrue(LogRateLimiter().unlimited)
+        self.assertFalse(LogRateLimiter(sample_every=2).unlimited)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+
+from gateway_manager.services.metrics_history import MetricsRingBuffer, MetricsHistoryStore
+
+
+class TestMetricsRingBuffer(unittest.TestCase):
+
+    def test_keeps_latest_samples_in_order(self):
+        buffer = MetricsRingBuffer(capacity=3)
+        for i in range(5):
+            buffer.append(100.0 + i, float(i), float(i * 10))
+
+        self.assertEqual(len(buffer), 3)
+        self.assertEqual([row[0] for row in buffer.samples()], [102.0, 103.0, 104.0])
+
+    def test_same_or_older_sample_is_ignored(self):
+        buffer = MetricsRingBuffer(capacity=5)
+
+        self.assertTrue(buffer.append(100.0, 1.0, 1.0))
+        self.assertFalse(buffer.append(100.0, 1.0, 1.0))
+        self.assertFalse(buffer.append(99.0, 2.0, 2.0))
+
+        self.assertEqual(buffer.samples(), [(100.0, 1.0, 1.0)])
+
+    def test_since_filter(self):
+        buffer = MetricsRingBuffer(capacity=10)
+        for i in range(5):
+            buffer.append(100.0 + i, float(i), None)
+
+        history = buffer.downsample(since=103.0)
+
+        self.assertEqual(history['timestamps'], [103.0, 104.0])
+        self.assertEqual(history['cpu_usage'], [3.0, 4.0])
+        self.assertEqual(history['memory_usage'], [None, None])
+
+    def test_downsample_averages_buckets(self):
+        buffer = MetricsRingBuffer(capacity=10)
+        buffer.append(100.0, 10.0, 50.0)
+        buffer.append(105.0, 20.0, None)
+        buffer.append(110.0, 30.0, 70.0)
+
+        history = buffer.downsample(step=10)
+
+        self.assertEqual(history['timestamps'], [100.0, 110.0])
+        self.assertEqual(history['cpu_usage'], [15.0, 30.0])
+        self.assertEqual(history['memory_usage'], [50.0, 70.0])
+
+
+class TestMetricsHistoryStore(unittest.TestCase):
+
+    def test_record_parses_raw_system_info(self):
+        store = MetricsHistoryStore(capacity=5)
+        store.record(1, {'timestamp': 100.0, 'cpu_usage': "CPU Usage: 3%", 'memory_usage': "Memory Usage:44%"})
+
+        history = store.history("1")
+
+        self.assertEqual(history['timestamps'], [100.0])
+        self.assertEqual(history['cpu_usage'], [3.0])
+        self.assertEqual(history['memory_usage'], [44.0])
+
+    def test_unknown_gateway_has_empty_history(self):
+        store = MetricsHistoryStore(capacity=5)
+
+        self.assertEqual(store.history("42"), {'timestamps': [], 'cpu_usage': [], 'memory_usage': []})
+
+
+if __name__ == '__main__':
+    unittest.main()
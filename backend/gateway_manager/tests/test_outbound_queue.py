@@ -0,0 +1,116 @@
+import asyncio
+import unittest
+
+from gateway_manager.services.outbound_queue import CONTROL, DROP_OLDEST, IN_ORDER, LATEST, OutboundQueue
+
+
+class TestOutboundQueue(unittest.IsolatedAsyncioTestCase):
+
+    async def test_get_waits_for_a_message(self):
+        queue = OutboundQueue()
+        getter = asyncio.create_task(queue.get())
+        await asyncio.sleep(0)
+        self.assertFalse(getter.done())
+
+        queue.put({'type': 'connection_ack'})
+        item = await asyncio.wait_for(getter, timeout=1)
+
+        self.assertEqual(item.message, {'type': 'connection_ack'})
+        self.assertEqual(item.policy, CONTROL)
+
+    async def test_latest_replaces_unsent_message_in_place(self):
+        queue = OutboundQueue()
+        queue.put({'cpu': 1}, LATEST, key='1')
+        queue.put({'type': 'pong'})
+        queue.put({'cpu': 2}, LATEST, key='1')
+        queue.put({'cpu': 9}, LATEST, key='2')
+
+        self.assertEqual([item.message for item in queue.pop_all()], [{'cpu': 2}, {'type': 'pong'}, {'cpu': 9}])
+        self.assertEqual(queue.replaced, 1)
+
+    async def test_latest_after_send_is_queued_again(self):
+        queue = OutboundQueue()
+        queue.put({'cpu': 1}, LATEST, key='1')
+        await queue.get()
+        queue.put({'cpu': 2}, LATEST, key='1')
+
+        self.assertEqual((await queue.get()).message, {'cpu': 2})
+
+    async def test_drop_oldest_keeps_newest_and_counts_weight(self):
+        queue = OutboundQueue(max_pending=2)
+        for i in range(5):
+            queue.put({'batch': i}, DROP_OLDEST, key='logs', weight=10)
+
+        items = queue.pop_all()
+
+        self.assertEqual([item.message for item in items], [{'batch': 3}, {'batch': 4}])
+        self.assertEqual(items[0].dropped, 30)
+        self.assertEqual(items[1].dropped, 0)
+        self.assertEqual(queue.dropped, 3)
+
+    async def test_control_messages_are_never_dropped(self):
+        queue = OutboundQueue(max_pending=1)
+        queue.put({'type': 'connection_ack'})
+        queue.put({'batch': 0}, DROP_OLDEST, key='logs')
+        queue.put({'type': 'complete', 'id': '2'})
+        queue.put({'batch': 1}, DROP_OLDEST, key='logs')
+
+        self.assertEqual(
+            [item.message for item in queue.pop_all()],
+            [{'type': 'connection_ack'}, {'type': 'complete', 'id': '2'}, {'batch': 1}]
+        )
+
+    async def test_dropped_count_is_per_key(self):
+        queue = OutboundQueue(max_pending=1)
+        queue.put({'batch': 0}, DROP_OLDEST, key='a', weight=4)
+        queue.put({'batch': 1}, DROP_OLDEST, key='b', weight=1)
+        queue.put({'batch': 2}, DROP_OLDEST, key='a', weight=1)
+
+        item = queue.pop_all()[0]
+
+        self.assertEqual((item.key, item.dropped), ('a', 4))
+
+    async def test_discard_removes_pending_data_of_a_key(self):
+        queue = OutboundQueue()
+        queue.put({'cpu': 1}, LATEST, key='1')
+        queue.put({'batch': 0}, DROP_OLDEST, key='1')
+        queue.put({'batch': 1}, DROP_OLDEST, key='2')
+        queue.put({'type': 'complete', 'id': '1'}, CONTROL, key='1')
+
+        self.assertEqual(queue.discard('1'), 2)
+        self.assertEqual(
+            [item.message for item in queue.pop_all()],
+            [{'batch': 1}, {'type': 'complete', 'id': '1'}]
+        )
+
+        queue.put({'cpu': 2}, LATEST, key='1')
+        self.assertEqual(len(queue), 1)
+
+    async def test_in_order_waits_for_previous_message(self):
+        queue = OutboundQueue(max_pending=1)
+        await queue.wait_sent('fleet')
+        queue.put({'delta': 0}, IN_ORDER, key='fleet')
+        queue.put({'batch': 0}, DROP_OLDEST, key='logs')
+        queue.put({'batch': 1}, DROP_OLDEST, key='logs')
+
+        waiter = asyncio.create_task(queue.wait_sent('fleet'))
+        await asyncio.sleep(0)
+        self.assertFalse(waiter.done())
+
+        self.assertEqual((await queue.get()).message, {'delta': 0})
+        await asyncio.wait_for(waiter, timeout=1)
+
+    async def test_discard_releases_in_order_waiters(self):
+        queue = OutboundQueue()
+        queue.put({'delta': 0}, IN_ORDER, key='fleet')
+        waiter = asyncio.create_task(queue.wait_sent('fleet'))
+        await asyncio.sleep(0)
+
+        queue.discard('fleet')
+
+        await asyncio.wait_for(waiter, timeout=1)
+        self.assertEqual(len(queue), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
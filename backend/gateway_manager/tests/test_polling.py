@@ -0,0 +1,195 @@
+import threading
+import unittest
+from unittest.mock import Mock
+
+from gateway_manager.services.polling import AdaptiveInterval, Change, ChangeDetector, GatewayPollingScheduler
+
+
+class TestGatewayPollingScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.polled = threading.Event()
+        self.fetch = Mock(side_effect=self._fetch)
+        self.on_result = Mock()
+        self.scheduler = GatewayPollingScheduler(
+            on_result=self.on_result,
+            interval=0.01,
+            fetch=self.fetch
+        )
+        self.gateway = Mock(id=1, address="1.1.1.1", port=50051, poll_min_interval=None, poll_max_interval=None)
+
+    def tearDown(self):
+        self.scheduler.stop_all()
+
+    def _fetch(self, address, port):
+        self.polled.set()
+        return {'status': 'online', 'gateway_address': address, 'gateway_port': port}
+
+    def test_one_poller_per_gateway(self):
+        first = self.scheduler.subscribe(self.gateway, ("channel-1", "1"))
+        second = self.scheduler.subscribe(self.gateway, ("channel-2", "1"))
+
+        self.assertIs(first, second)
+        self.assertEqual(self.scheduler.subscriber_count(1), 2)
+        self.assertTrue(self.polled.wait(1))
+        self.fetch.assert_called_with("1.1.1.1", 50051)
+        self.on_result.assert_called_with("1", self.fetch.side_effect("1.1.1.1", 50051))
+
+    def test_poller_stops_with_last_subscriber(self):
+        poller = self.scheduler.subscribe(self.gateway, ("channel-1", "1"))
+        self.scheduler.subscribe(self.gateway, ("channel-2", "1"))
+
+        self.scheduler.unsubscribe(1, ("channel-1", "1"))
+        self.assertTrue(poller.is_running)
+
+        self.scheduler.unsubscribe(1, ("channel-2", "1"))
+        self.assertFalse(poller.is_running)
+        self.assertIsNone(self.scheduler.get_poller(1))
+
+    def test_sinks_of_a_gateway(self):
+        sink = Mock()
+        self.scheduler.subscribe(self.gateway, ("channel-1", "1"), sink)
+        self.scheduler.subscribe(self.gateway, ("channel-2", "1"))
+
+        self.assertEqual(self.scheduler.sinks(1), [sink])
+        self.scheduler.unsubscribe(1, ("channel-1", "1"))
+        self.assertEqual(self.scheduler.sinks(1), [])
+        self.assertEqual(self.scheduler.sinks(2), [])
+
+    def test_resubscribe_starts_new_poller(self):
+        poller = self.scheduler.subscribe(self.gateway, ("channel-1", "1"))
+        self.scheduler.unsubscribe(1, ("channel-1", "1"))
+
+        new_poller = self.scheduler.subscribe(self.gateway, ("channel-1", "2"))
+
+        self.assertIsNot(poller, new_poller)
+        self.assertTrue(new_poller.is_running)
+
+    def test_fetch_errors_keep_polling(self):
+        calls = []
+
+        def failing_fetch(address, port):
+            calls.append(1)
+            if len(calls) < 3:
+                raise RuntimeError("boom")
+            self.polled.set()
+            return {'status': 'online'}
+
+        self.scheduler.fetch = failing_fetch
+        self.scheduler.subscribe(self.gateway, ("channel-1", "1"))
+
+        self.assertTrue(self.polled.wait(1))
+        self.assertGreaterEqual(len(calls), 3)
+
+    def test_gateway_bounds_override_scheduler_bounds(self):
+        scheduler = GatewayPollingScheduler(on_result=Mock(), interval=5, min_interval=1, max_interval=30)
+        gateway = Mock(id=2, address="1.1.1.2", port=50051, poll_min_interval=10, poll_max_interval=None)
+
+        schedule = scheduler._schedule_for(gateway)
+
+        self.assertEqual((schedule.min_interval, schedule.max_interval), (10, 30))
+        self.assertEqual(schedule.interval, 10)
+
+
+class TestAdaptiveInterval(unittest.TestCase):
+
+    def _schedule(self, **kwargs):
+        kwargs.setdefault('rng', lambda: 0.5)  # no jitter
+        return AdaptiveInterval(4, min_interval=1, max_interval=16, max_backoff=60, **kwargs)
+
+    def test_without_bounds_interval_is_fixed(self):
+        schedule = AdaptiveInterval(5)
+
+        self.assertEqual(schedule.succeeded(True), 5)
+        self.assertEqual(schedule.succeeded(False), 5)
+
+    def test_changes_speed_up_within_min(self):
+        schedule = self._schedule()
+
+        self.assertEqual([schedule.succeeded(True) for _ in range(3)], [2, 1, 1])
+
+    def test_stable_samples_slow_down_within_max(self):
+        schedule = self._schedule()
+
+        self.assertEqual([schedule.succeeded(False) for _ in range(4)], [6, 9, 13.5, 16])
+
+    def test_failures_back_off_exponentially_up_to_max_backoff(self):
+        schedule = self._schedule()
+
+        self.assertEqual([schedule.failed() for _ in range(5)], [8, 16, 32, 60, 60])
+
+    def test_success_after_failures_resets_backoff(self):
+        schedule = self._schedule()
+        schedule.failed()
+        schedule.failed()
+
+        self.assertEqual(schedule.succeeded(False), 6)
+        self.assertEqual(schedule.failed(), 12)
+
+    def test_jitter_spreads_delay(self):
+        low = self._schedule(jitter=0.25, rng=lambda: 0.0)
+        high = self._schedule(jitter=0.25, rng=lambda: 1.0)
+
+        self.assertEqual(low.failed(), 6)
+        self.assertEqual(high.failed(), 10)
+
+
+class TestChangeDetector(unittest.TestCase):
+
+    def setUp(self):
+        self.detector = ChangeDetector(deadbands={'cpu_usage': 2.0, 'memory_usage': 5.0}, heartbeat=60)
+
+    def _sample(self, cpu=10.0, memory=40.0, status='online'):
+        return {'cpu_usage': cpu, 'memory_usage': memory, 'status': status}
+
+    def test_first_sample_is_published(self):
+        self.assertTrue(self.detector.changed('1', self._sample(), now=0))
+
+    def test_moves_within_deadband_are_suppressed(self):
+        self.detector.changed('1', self._sample(), now=0)
+
+        self.assertFalse(self.detector.changed('1', self._sample(cpu=11.5, memory=44.0), now=5))
+        self.assertFalse(self.detector.changed('1', self._sample(cpu=8.5), now=10))
+        self.assertEqual(self.detector.stats(), {'published': 1, 'suppressed': 2})
+
+    def test_compares_with_last_published_not_last_seen(self):
+        self.detector.changed('1', self._sample(cpu=10.0), now=0)
+        self.detector.changed('1', self._sample(cpu=11.5), now=5)
+
+        self.assertTrue(self.detector.changed('1', self._sample(cpu=13.0), now=10))
+
+    def test_status_flip_is_published(self):
+        self.detector.changed('1', self._sample(), now=0)
+
+        self.assertTrue(self.detector.changed('1', self._sample(status='offline'), now=5))
+
+    def test_metric_appearing_or_vanishing_is_published(self):
+        self.detector.changed('1', self._sample(), now=0)
+
+        self.assertTrue(self.detector.changed('1', self._sample(cpu=None), now=5))
+        self.assertTrue(self.detector.changed('1', self._sample(cpu=10.0), now=10))
+
+    def test_heartbeat_publishes_unchanged_sample(self):
+        self.detector.changed('1', self._sample(), now=0)
+
+        self.assertFalse(self.detector.changed('1', self._sample(), now=59))
+        self.assertTrue(self.detector.changed('1', self._sample(), now=60))
+        self.assertFalse(self.detector.changed('1', self._sample(), now=65))
+
+    def test_only_real_changes_differ(self):
+        self.assertEqual(self.detector.check('1', self._sample(), now=0), Change(publish=True, differs=False))
+        self.assertEqual(self.detector.check('1', self._sample(), now=60), Change(publish=True, differs=False))
+        self.assertEqual(self.detector.check('1', self._sample(cpu=13.0), now=65), Change(publish=True, differs=True))
+        self.assertEqual(self.detector.check('1', self._sample(cpu=13.0, status='offline'), now=70),
+                         Change(publish=True, differs=True))
+
+    def test_keys_are_independent_and_forgettable(self):
+        self.detector.changed('1', self._sample(), now=0)
+
+        self.assertTrue(self.detector.changed('2', self._sample(), now=1))
+        self.detector.forget('1')
+        self.assertTrue(self.detector.changed('1', self._sample(), now=2))
+
+
+if __name__ == '__main__':
+    unittest.main()
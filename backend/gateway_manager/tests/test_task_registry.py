@@ -0,0 +1,102 @@
+import threading
+import unittest
+from unittest.mock import Mock, patch
+
+from gateway_manager.services.task_registry import SubscriptionTaskRegistry
+
+
+class TestSubscriptionTaskRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = SubscriptionTaskRegistry(orphan_timeout=60)
+
+    def tearDown(self):
+        self.registry.stop()
+
+    def test_cancel_runs_callbacks_once(self):
+        task = self.registry.register("channel-1", "1", "logs_1_1")
+        callback = Mock()
+        task.add_cancel_callback(callback)
+
+        self.assertTrue(self.registry.cancel("channel-1", "1"))
+        task.cancel()
+
+        self.assertTrue(task.cancelled)
+        callback.assert_called_once()
+        self.assertEqual(len(self.registry), 0)
+        self.assertFalse(self.registry.cancel("channel-1", "1"))
+
+    def test_callback_added_after_cancel_runs_immediately(self):
+        task = self.registry.register("channel-1", "1", "logs_1_1")
+        task.cancel()
+        callback = Mock()
+
+        task.add_cancel_callback(callback)
+
+        callback.assert_called_once()
+
+    def test_cancel_channel_only_touches_its_tasks(self):
+        first = self.registry.register("channel-1", "1", "a")
+        second = self.registry.register("channel-1", "2", "b")
+        other = self.registry.register("channel-2", "1", "c")
+
+        self.assertEqual(self.registry.cancel_channel("channel-1"), 2)
+
+        self.assertTrue(first.cancelled)
+        self.assertTrue(second.cancelled)
+        self.assertFalse(other.cancelled)
+        self.assertIs(self.registry.get("channel-2", "1"), other)
+
+    def test_restarted_subscription_replaces_worker(self):
+        old = self.registry.register("channel-1", "1", "a")
+        new = self.registry.register("channel-1", "1", "a")
+
+        self.assertTrue(old.cancelled)
+        self.assertFalse(new.cancelled)
+        self.assertIs(self.registry.get("channel-1", "1"), new)
+
+    def test_unregister_finished_worker(self):
+        task = self.registry.register("channel-1", "1", "a")
+        self.registry.unregister(task)
+
+        self.assertIsNone(self.registry.get("channel-1", "1"))
+        self.assertFalse(task.cancelled)
+
+    def test_release_spares_the_worker_that_reused_its_id(self):
+        old = self.registry.register("channel-1", "1", "a")
+        new = self.registry.register("channel-1", "1", "a")
+
+        self.registry.release(old)
+
+        self.assertTrue(old.cancelled)
+        self.assertFalse(new.cancelled)
+        self.assertIs(self.registry.get("channel-1", "1"), new)
+
+    @patch('gateway_manager.services.task_registry.time.monotonic')
+    def test_orphans_are_reclaimed(self, mock_monotonic):
+        mock_monotonic.return_value = 1000.0
+        alive = self.registry.register("channel-1", "1", "a")
+        orphan = self.registry.register("channel-2", "1", "b")
+
+        mock_monotonic.return_value = 1050.0
+        self.registry.touch("channel-1")
+        mock_monotonic.return_value = 1070.0
+
+        self.assertEqual(self.registry.reap_orphans(force=True), 1)
+        self.assertTrue(orphan.cancelled)
+        self.assertFalse(alive.cancelled)
+
+    def test_orphans_are_reclaimed_without_new_traffic(self):
+        registry = SubscriptionTaskRegistry(orphan_timeout=0.05, reap_interval=0.01)
+        self.addCleanup(registry.stop)
+        reclaimed = threading.Event()
+
+        task = registry.register("channel-1", "1", "a")
+        task.add_cancel_callback(reclaimed.set)
+
+        self.assertTrue(reclaimed.wait(1))
+        self.assertEqual(len(registry), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
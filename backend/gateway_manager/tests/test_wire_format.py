@@ -0,0 +1,81 @@
+import json
+import unittest
+
+import msgpack
+
+from gateway_manager.services.wire_format import (
+    JsonEncoder, KeyDictionaryEncoder, MsgpackEncoder, _short_key, create_encoder
+)
+
+MESSAGE = {
+    'type': 'next',
+    'id': '1',
+    'payload': {'data': {'gatewaySystemInfo': {'gatewayId': '7', 'cpuUsage': '12.5%', 'status': 'online'}}}
+}
+
+
+class KeyDictionaryDecoder:
+    """What a client does with json-keys frames."""
+
+    def __init__(self):
+        self.keys = []
+
+    def decode(self, frame):
+        frame = json.loads(frame)
+        self.keys.extend(frame.get('k', []))
+        return self._unpack(frame['d'])
+
+    def _unpack(self, value):
+        if isinstance(value, dict):
+            return {self.keys[int(key_id, 36)]: self._unpack(item) for key_id, item in value.items()}
+        if isinstance(value, list):
+            return [self._unpack(item) for item in value]
+        return value
+
+
+class TestWireFormat(unittest.TestCase):
+
+    def test_json_is_plain_text(self):
+        encoder = JsonEncoder()
+
+        self.assertFalse(encoder.binary)
+        self.assertEqual(json.loads(encoder.encode(MESSAGE)), MESSAGE)
+
+    def test_msgpack_round_trip(self):
+        encoder = MsgpackEncoder()
+
+        self.assertTrue(encoder.binary)
+        self.assertEqual(msgpack.unpackb(encoder.encode([MESSAGE, MESSAGE])), [MESSAGE, MESSAGE])
+
+    def test_key_dictionary_round_trip(self):
+        encoder = KeyDictionaryEncoder()
+        decoder = KeyDictionaryDecoder()
+        second = dict(MESSAGE, id='2')
+
+        self.assertEqual(decoder.decode(encoder.encode(MESSAGE)), MESSAGE)
+        self.assertEqual(decoder.decode(encoder.encode([second, MESSAGE])), [second, MESSAGE])
+
+    def test_key_dictionary_sends_each_key_once(self):
+        encoder = KeyDictionaryEncoder()
+
+        first = json.loads(encoder.encode(MESSAGE))
+        second = encoder.encode(MESSAGE)
+
+        self.assertEqual(first['k'][:3], ['type', 'id', 'payload'])
+        self.assertNotIn('"k"', second)
+        self.assertLess(len(second), len(json.dumps(MESSAGE)))
+
+    def test_short_keys_are_base36(self):
+        self.assertEqual([_short_key(i) for i in (0, 9, 10, 35, 36)], ['0', '9', 'a', 'z', '10'])
+
+    def test_create_encoder(self):
+        self.assertIsInstance(create_encoder('msgpack'), MsgpackEncoder)
+        self.assertIsInstance(create_encoder('json-keys'), KeyDictionaryEncoder)
+        self.assertIsNone(create_encoder('xml'))
+        self.assertIsNone(create_encoder(None))
+        # key tables are per connection
+        self.assertIsNot(create_encoder('json-keys'), create_encoder('json-keys'))
+
+
+if __name__ == '__main__':
+    unittest.main()
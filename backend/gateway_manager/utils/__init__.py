@@ -8,10 +8,14 @@ from .parsers import (
     parse_uptime,
     get_clean_system_info
 )
+from .log_parser import LogLineParser, build_log_filter, normalize_log_level
 
 __all__ = [
     'parse_cpu_usage',
     'parse_memory_usage',
     'parse_uptime', 
-    'get_clean_system_info'
+    'get_clean_system_info',
+    'LogLineParser',
+    'build_log_filter',
+    'normalize_log_level'
 ]
\ No newline at end of file
@@ -0,0 +1,307 @@
+"""
+Parser for live log lines streamed by gateway agents
+"""
+import re
+import logging
+from typing import Callable, Dict, NamedTuple, Optional, Pattern, Tuple
+
+from ..constants import LogType
+
+logger = logging.getLogger(__name__)
+
+# client regexes run on every line their subscription receives
+MAX_FILTER_REGEX_LENGTH = 256
+_QUANTIFIER = re.compile(r'\{(\d*)(,?)(\d*)\}|[*+?]')
+_REGEX_SPECIAL = set('.^$*+?{}[]\\|()')
+
+
+class LogFormat(NamedTuple):
+    name: str
+    pattern: Pattern
+
+
+# 2161.10.09-04:48:17.482|E]: message
+AGENT_FORMAT = LogFormat('agent', re.compile(
+    r'^(?P<timestamp>\d{4}[.\-/]\d{2}[.\-/]\d{2}[-T ]\d{2}:\d{2}:\d{2}(?:\.\d+)?)'
+    r'\|(?P<level>[A-Za-z]+)\]:\s?(?P<message>.*)$'
+))
+
+# 2025-01-31 10:15:42,123 [WARN] [NET] message
+ISO_FORMAT = LogFormat('iso', re.compile(
+    r'^\[?(?P<timestamp>\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?)\]?'
+    r'\s+\[?(?P<level>TRACE|DEBUG|INFO|WARN(?:ING)?|ERROR|FATAL|CRITICAL)\]?'
+    r'\s*(?:\[(?P<service>[^\]]+)\])?\s*[:\-]?\s*(?P<message>.*)$'
+))
+
+# Jan 31 10:15:42 host controller[123]: message
+SYSLOG_FORMAT = LogFormat('syslog', re.compile(
+    r'^(?P<timestamp>[A-Z][a-z]{2}\s+\d{1,2}\s\d{2}:\d{2}:\d{2})'
+    r'\s\S+\s(?P<service>[\w.\-/]+)(?:\[\d+\])?:\s(?P<message>.*)$'
+))
+
+# Formats tried for each log type, most likely first
+LOG_FORMATS: Dict[int, Tuple[LogFormat, ...]] = {
+    LogType.CONTROLLER: (AGENT_FORMAT, SYSLOG_FORMAT, ISO_FORMAT),
+    LogType.SETTING: (AGENT_FORMAT, ISO_FORMAT),
+    LogType.GATEWAY_AGENT: (AGENT_FORMAT, ISO_FORMAT),
+}
+
+SERVICE_TYPES = {
+    LogType.CONTROLLER: "CONTROLLER",
+    LogType.SETTING: "SETTING",
+    LogType.GATEWAY_AGENT: "AGENT",
+}
+
+LOG_LEVELS = {
+    'T': 'TRACE', 'TRACE': 'TRACE',
+    'D': 'DEBUG', 'DEBUG': 'DEBUG',
+    'I': 'INFO', 'INFO': 'INFO',
+    'W': 'WARNING', 'WARN': 'WARNING', 'WARNING': 'WARNING',
+    'E': 'ERROR', 'ERR': 'ERROR', 'ERROR': 'ERROR',
+    'F': 'FATAL', 'FATAL': 'FATAL',
+    'C': 'CRITICAL', 'CRIT': 'CRITICAL', 'CRITICAL': 'CRITICAL',
+}
+
+DEFAULT_LOG_LEVEL = 'INFO'
+
+LOG_LEVEL_SEVERITY = {
+    'TRACE': 0,
+    'DEBUG': 10,
+    'INFO': 20,
+    'WARNING': 30,
+    'ERROR': 40,
+    'CRITICAL': 50,
+    'FATAL': 50,
+}
+
+# used when a format carries no level of its own
+LEVEL_KEYWORD = re.compile(r'\b(TRACE|DEBUG|WARN(?:ING)?|ERROR|FATAL|CRITICAL)\b')
+
+
+def normalize_log_level(level: Optional[str]) -> str:
+    if not level:
+        return DEFAULT_LOG_LEVEL
+    return LOG_LEVELS.get(level.upper(), DEFAULT_LOG_LEVEL)
+
+
+class LogLineParser:
+    """
+    Parses the lines of one log stream into timestamp, level, service and
+    message. The format that matched last is tried first, so a stream that
+    sticks to one format costs a single regex match per line.
+    """
+
+    def __init__(self, log_type: int = LogType.GATEWAY_AGENT):
+        self.log_type = log_type
+        self.formats = LOG_FORMATS.get(log_type, (AGENT_FORMAT, ISO_FORMAT))
+        self.service_type = SERVICE_TYPES.get(log_type, "AGENT")
+        self.detected_format: Optional[LogFormat] = None
+
+    def parse(self, line: str) -> Dict[str, str]:
+        line = line.rstrip('\r\n')
+
+        match = None
+        if self.detected_format is not None:
+            match = self.detected_format.pattern.match(line)
+
+        if match is None:
+            for log_format in self.formats:
+                if log_format is self.detected_format:
+                    continue
+                match = log_format.pattern.match(line)
+                if match is not None:
+                    if self.detected_format is not log_format:
+                        logger.debug(f"Detected '{log_format.name}' log format for log type {self.log_type}")
+                    self.detected_format = log_format
+                    break
+
+        if match is None:
+            return self._unstructured(line)
+
+        fields = match.groupdict()
+        level = fields.get('level')
+        message = fields['message']
+        return {
+            'timestamp': fields['timestamp'],
+            'log_level': normalize_log_level(level) if level else self._level_from_text(message),
+            'service_type': fields.get('service') or self.service_type,
+            'message': message,
+        }
+
+    def _unstructured(self, line: str) -> Dict[str, str]:
+        return {
+            'timestamp': "",
+            'log_level': self._level_from_text(line),
+            'service_type': self.service_type,
+            'message': line,
+        }
+
+    def _level_from_text(self, text: str) -> str:
+        keyword = LEVEL_KEYWORD.search(text)
+        return normalize_log_level(keyword.group(1)) if keyword else DEFAULT_LOG_LEVEL
+
+
+def build_log_filter(
+    min_level: Optional[str] = None,
+    contains: Optional[str] = None,
+    regex: Optional[str] = None
+) -> Optional[Callable[[Dict[str, str]], bool]]:
+    """
+    Build a predicate over parsed log entries (see LogLineParser.parse plus
+    the raw 'line'). Returns None when nothing is filtered.
+    Raises ValueError for an unknown level or an invalid regex.
+    """
+    checks = []
+
+    if min_level:
+        level = LOG_LEVELS.get(min_level.upper())
+        if level is None:
+            raise ValueError(f"Unknown log level '{min_level}'")
+        threshold = LOG_LEVEL_SEVERITY[level]
+        if threshold > 0:
+            checks.append(lambda entry: LOG_LEVEL_SEVERITY.get(entry['log_level'], 0) >= threshold)
+
+    if contains:
+        checks.append(lambda entry: contains in entry['line'])
+
+    if regex:
+        if len(regex) > MAX_FILTER_REGEX_LENGTH:
+            raise ValueError(f"Log filter regex is longer than {MAX_FILTER_REGEX_LENGTH} characters")
+        try:
+            pattern = re.compile(regex)
+        except re.error as e:
+            raise ValueError(f"Invalid log filter regex '{regex}': {e}")
+        if pattern.flags & re.VERBOSE:
+            raise ValueError(f"Log filter regex '{regex}' can't use verbose mode")
+        if _backtracks_exponentially(regex):
+            raise ValueError(
+                f"Log filter regex '{regex}' repeats a group holding repeats or overlapping "
+                f"alternatives, or uses backreferences, which can take exponential time"
+            )
+        checks.append(lambda entry: pattern.search(entry['line']) is not None)
+
+    if not checks:
+        return None
+    if len(checks) == 1:
+        return checks[0]
+    return lambda entry: all(check(entry) for check in checks)
+
+
+class _Group:
+    """What the scan of a regex group has seen so far (see _backtracks_exponentially)."""
+
+    def __init__(self):
+        self.loose = False      # holds a repeat of no fixed count
+        self.ambiguous = False  # holds alternatives that can start alike
+        self.firsts = []        # first literal of each closed branch, None when unknown
+        self.atoms = 0          # atoms in the open branch
+        self.first = None       # first literal of the open branch
+
+    def close_branch(self):
+        self.firsts.append(self.first if self.atoms else None)
+        self.atoms, self.first = 0, None
+
+    def close(self) -> '_Group':
+        self.close_branch()
+        if len(self.firsts) > 1 and (None in self.firsts or len(set(self.firsts)) < len(self.firsts)):
+            self.ambiguous = True
+        return self
+
+
+def _backtracks_exponentially(regex: str) -> bool:
+    """
+    Catastrophic backtracking shapes in a (valid, non-verbose) regex: a
+    group repeated more than once that holds a repeat of no fixed count,
+    like (a+)+ or (.*,)*, or alternatives that can start with the same
+    character, like (a|a)*b, plus backreferences. Scanned by hand so no
+    private `re` module is needed; unsure cases count as risky.
+    """
+    groups = [_Group()]
+    last_group = None  # the group just closed, when it is the atom a quantifier applies to
+    i = 0
+    while i < len(regex):
+        char = regex[i]
+        group = groups[-1]
+        quantifier = _QUANTIFIER.match(regex, i)
+        if quantifier and (char != '{' or quantifier.group(1) or quantifier.group(3)):
+            if char == '{':
+                low = int(quantifier.group(1) or 0)
+                high = low if not quantifier.group(2) else int(quantifier.group(3) or 0) or None
+            else:
+                low, high = {'*': (0, None), '+': (1, None), '?': (0, 1)}[char]
+            if low != high:
+                group.loose = True
+            if last_group is not None and (high is None or high > 1) and (last_group.loose or last_group.ambiguous):
+                return True
+            if group.atoms == 1 and low == 0:
+                # the branch may as well start with what follows
+                group.first = None
+            i = quantifier.end()
+            # lazy and possessive modifiers
+            if i < len(regex) and regex[i] in '?+':
+                i += 1
+            last_group = None
+            continue
+
+        last_group = None
+        if char == '(':
+            i += 1
+            if regex.startswith('?#', i):
+                i = regex.index(')', i) + 1
+                continue
+            if regex.startswith(('?P=', '?('), i):
+                return True
+            if regex.startswith(('?P<', '?<'), i) and not regex.startswith(('?<=', '?<!'), i):
+                i = regex.index('>', i) + 1
+            elif regex.startswith('?', i):
+                end = i + 1
+                while regex[end] not in ':)=!<>':
+                    end += 1
+                if regex[end] == ')':
+                    # inline flags, no group
+                    i = end + 1
+                    continue
+                i = end + (2 if regex[end] == '<' else 1)
+            _add_atom(group, None)
+            groups.append(_Group())
+            continue
+        if char == ')':
+            closed = groups.pop().close()
+            parent = groups[-1]
+            parent.loose |= closed.loose
+            parent.ambiguous |= closed.ambiguous
+            last_group = closed
+            i += 1
+            continue
+        if char == '|':
+            group.close_branch()
+            i += 1
+            continue
+        if char == '[':
+            end = i + 1
+            if regex.startswith('^', end):
+                end += 1
+            if regex.startswith(']', end):
+                end += 1
+            while regex[end] != ']':
+                end += 2 if regex[end] == '\\' else 1
+            _add_atom(group, None)
+            i = end + 1
+            continue
+        if char == '\\':
+            escaped = regex[i + 1]
+            if escaped in '123456789':
+                return True
+            _add_atom(group, None if escaped.isalnum() else escaped)
+            i += 2
+            continue
+        _add_atom(group, None if char in _REGEX_SPECIAL else char.lower())
+        i += 1
+
+    return False
+
+
+def _add_atom(group: _Group, literal: Optional[str]):
+    if not group.atoms:
+        group.first = literal
+    group.atoms += 1
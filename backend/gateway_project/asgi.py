@@ -9,6 +9,10 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gateway_project.settings')
 
 django_asgi_app = get_asgi_application()
 
+# index the log archive in the background now, not inside the first search request
+from gateway_manager.services.log_search import log_search_index
+log_search_index.start()
+
 def get_websocket_application():
     from gateway_manager.consumers import GraphQLWebSocketConsumer
     return URLRouter([
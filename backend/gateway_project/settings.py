@@ -40,6 +40,70 @@ CHANNEL_LAYERS = {
     },
 }
 
+### gRPC Settings
+# pooled channels to gateway agents are closed after this many idle seconds
+GRPC_CHANNEL_IDLE_TIMEOUT = config('GRPC_CHANNEL_IDLE_TIMEOUT', default=300, cast=int)
+# max in-flight gateway snapshots for the asyncio (grpc.aio) manager
+GRPC_ASYNC_MAX_CONCURRENCY = config('GRPC_ASYNC_MAX_CONCURRENCY', default=500, cast=int)
+
+### Monitoring Settings
+# seconds between two system info polls of a watched gateway, to begin with
+GATEWAY_POLL_INTERVAL = config('GATEWAY_POLL_INTERVAL', default=5, cast=float)
+# the period then halves while samples change and grows 1.5x while they don't, within these bounds
+# (a gateway's poll_min_interval / poll_max_interval override them)
+GATEWAY_POLL_MIN_INTERVAL = config('GATEWAY_POLL_MIN_INTERVAL', default=1, cast=float)
+GATEWAY_POLL_MAX_INTERVAL = config('GATEWAY_POLL_MAX_INTERVAL', default=30, cast=float)
+# offline gateways are retried after 2x, 4x, 8x ... the period, up to this many seconds
+GATEWAY_POLL_MAX_BACKOFF = config('GATEWAY_POLL_MAX_BACKOFF', default=300, cast=float)
+# every poll delay is spread by +-this fraction so pollers don't line up
+GATEWAY_POLL_JITTER = config('GATEWAY_POLL_JITTER', default=0.2, cast=float)
+# seconds each gateway of a fleet-wide poll gets; all of them are fetched at once
+GATEWAY_FLEET_FETCH_DEADLINE = config('GATEWAY_FLEET_FETCH_DEADLINE', default=5, cast=float)
+# polled system info is only published when cpu/memory moved by more than N percentage points,
+# the status or error changed, or nothing was published for the heartbeat seconds
+GATEWAY_CPU_DEADBAND = config('GATEWAY_CPU_DEADBAND', default=2.0, cast=float)
+GATEWAY_MEMORY_DEADBAND = config('GATEWAY_MEMORY_DEADBAND', default=2.0, cast=float)
+GATEWAY_PUBLISH_HEARTBEAT = config('GATEWAY_PUBLISH_HEARTBEAT', default=60, cast=float)
+# system info snapshots younger than this are served from cache
+GATEWAY_SYSTEM_INFO_CACHE_TTL = config('GATEWAY_SYSTEM_INFO_CACHE_TTL', default=2, cast=float)
+# background workers of a socket that stopped heartbeating for this long are cancelled
+SUBSCRIPTION_ORPHAN_TIMEOUT = config('SUBSCRIPTION_ORPHAN_TIMEOUT', default=300, cast=int)
+# cpu/memory samples kept per gateway for chart backfill; one per poll, so 720 cover
+# 12 minutes to 6 hours depending on where the adaptive poll interval (1-30s) settles
+GATEWAY_METRICS_HISTORY_SIZE = config('GATEWAY_METRICS_HISTORY_SIZE', default=720, cast=int)
+# live log lines are sent in batches of up to N lines or after M milliseconds
+LIVE_LOGS_BATCH_MAX_LINES = config('LIVE_LOGS_BATCH_MAX_LINES', default=100, cast=int)
+LIVE_LOGS_BATCH_MAX_DELAY_MS = config('LIVE_LOGS_BATCH_MAX_DELAY_MS', default=100, cast=int)
+# upper bound of delivered lines per second for each live log subscription (0 = unlimited)
+LIVE_LOGS_MAX_LINES_PER_SECOND = config('LIVE_LOGS_MAX_LINES_PER_SECOND', default=200, cast=float)
+# seconds between two "lines dropped" markers of one subscription
+LIVE_LOGS_DROPPED_REPORT_INTERVAL = config('LIVE_LOGS_DROPPED_REPORT_INTERVAL', default=1, cast=float)
+# dropped log streams are reopened after 1s, 2s, 4s ... up to the max delay
+LIVE_LOGS_RECONNECT_DELAY = config('LIVE_LOGS_RECONNECT_DELAY', default=1, cast=float)
+LIVE_LOGS_MAX_RECONNECT_DELAY = config('LIVE_LOGS_MAX_RECONNECT_DELAY', default=30, cast=float)
+# lines requested from the agent on reconnect to find where the stream left off
+LIVE_LOGS_RESUME_LINES = config('LIVE_LOGS_RESUME_LINES', default=100, cast=int)
+# recent lines kept per shared log stream for late subscribers and afterSeq resumes (caps lineCount)
+LIVE_LOGS_BACKLOG_LINES = config('LIVE_LOGS_BACKLOG_LINES', default=1000, cast=int)
+# directory for the on-disk archive of streamed log lines (empty = archive disabled)
+LOG_ARCHIVE_DIR = config('LOG_ARCHIVE_DIR', default='')
+LOG_ARCHIVE_SEGMENT_MB = config('LOG_ARCHIVE_SEGMENT_MB', default=64, cast=int)
+LOG_ARCHIVE_BLOCK_LINES = config('LOG_ARCHIVE_BLOCK_LINES', default=500, cast=int)
+LOG_ARCHIVE_RETENTION_DAYS = config('LOG_ARCHIVE_RETENTION_DAYS', default=7, cast=float)
+# seconds between two scans of the archive's .idx files for blocks written by other processes
+LOG_SEARCH_REFRESH_INTERVAL = config('LOG_SEARCH_REFRESH_INTERVAL', default=30, cast=float)
+# archive blocks a log search reads at most when its query has no word the index can look up
+LOG_SEARCH_MAX_SCAN_BLOCKS = config('LOG_SEARCH_MAX_SCAN_BLOCKS', default=200, cast=int)
+# seconds between two sweeps for expired archive segments (they also run when a segment rotates)
+LOG_ARCHIVE_RETENTION_CHECK_INTERVAL = config('LOG_ARCHIVE_RETENTION_CHECK_INTERVAL', default=3600, cast=float)
+# parsed and validated GraphQL documents kept for reuse (0 = no cache)
+GRAPHQL_DOCUMENT_CACHE_SIZE = config('GRAPHQL_DOCUMENT_CACHE_SIZE', default=256, cast=int)
+# log batches waiting for a slow WebSocket client before the oldest are dropped
+# (metrics only ever keep their latest unsent update)
+WS_OUTBOUND_QUEUE_SIZE = config('WS_OUTBOUND_QUEUE_SIZE', default=256, cast=int)
+# clients that opt into coalescing get everything queued within one tick in a single frame
+WS_COALESCE_TICK_MS = config('WS_COALESCE_TICK_MS', default=50, cast=int)
+
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
@@ -87,7 +87,8 @@ export function useMonitoringComposable(options = {}) {
     // Watch for new logs from subscription
     const unwatchResult = watch(result, (newResult) => {
       if (newResult?.gatewayLiveLogs) {
-        addLogToPanel(panelId, newResult.gatewayLiveLogs)
+        // lines arrive in batches
+        [].concat(newResult.gatewayLiveLogs).forEach((logEntry) => addLogToPanel(panelId, logEntry))
       }
     })
 